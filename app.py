@@ -5,18 +5,18 @@ import json
 from typing import Any, Optional, Callable
 from queue import Queue
 from threading import Thread
-from dotenv import load_dotenv
+from utils.env import ensure_env
 from flask_socketio import SocketIO, emit
 import logging
 
 # Import the core debate logic functions with aliases
 from debate_v3 import run_debate_logic as run_debate_logic_v3
-from debate_v4 import run_debate_logic as run_debate_logic_v4
+from debate_v4 import run_debate_logic as run_debate_logic_v4, get_progress_payload
 
 # Global reference to the human feedback queue for the current debate
 # feedback_queue: Optional[Queue] = None # No longer needed with Socket.IO
 
-load_dotenv()
+ensure_env()
 
 app = Flask(__name__)
 socketio = SocketIO(app, async_mode='threading') # Use threading for background tasks
@@ -37,6 +37,14 @@ def index():
 #    ...
 #    return ('No active debate', 400)
 
+@app.route('/progress_payload/<int:ref>', methods=['GET'])
+def progress_payload_route(ref):
+    # Full text for a progress event field that was sent as a preview (see utils.progress.report_progress)
+    text = get_progress_payload(ref)
+    if text is None:
+        return jsonify({'error': 'Payload not found'}), 404
+    return jsonify({'text': text})
+
 @app.route('/start_debate', methods=['POST'])
 def start_debate_route():
     data = request.get_json()
@@ -1,7 +1,8 @@
 import asyncio
+import functools
 import re
 import json # <-- Added import
-from typing import List, Dict, Optional, Any, Callable
+from typing import List, Dict, Optional, Any, Callable, Sequence
 from rich.console import Console # Use Rich for printing
 from rich.progress import Progress, SpinnerColumn, TextColumn # Added import
 import logging
@@ -10,7 +11,8 @@ import logging
 # from llm_clients.gemini_client import query_gemini
 # from llm_clients.grok_client import query_grok # Keep commented out for now
 from utils.models import Factor, AgentResponse
-from utils.prompts import CRITIQUE_PROMPT_TEMPLATE
+from utils import json_utils
+from utils.prompts import FACTOR_LIST_RESPONSE_FORMAT, render_baseline_batch_prompt, render_critique_prompt
 # import typer # <---- Remove this commented import
 
 # Setup logger for this module
@@ -28,13 +30,64 @@ AGENT_QUERY_FUNCTIONS = {
 
 AGENT_NAMES = list(AGENT_QUERY_FUNCTIONS.keys())
 
+# Per-agent kwargs asking each provider for JSON factor output (structured outputs / JSON mode)
+FACTOR_JSON_KWARGS = {
+    "O4-mini": {"response_format": FACTOR_LIST_RESPONSE_FORMAT},
+    "Gemini-2.5": {"json_mode": True},
+}
+
+def _factors_from_items(items: List[Any]) -> List[Factor]:
+    """Builds Factors from parsed JSON factor objects, skipping/clamping malformed entries."""
+    factors = []
+    for item in items:
+        if not isinstance(item, dict):
+            logger.warning(f"Skipping non-dictionary item in JSON array: {item}")
+            continue
+
+        name = item.get('factor_name')
+        justification = item.get('justification')
+        confidence_raw = item.get('confidence')
+
+        if not name or not justification or confidence_raw is None:
+            logger.warning(f"Skipping factor with missing fields: {item}")
+            continue
+
+        try:
+            confidence = float(confidence_raw)
+            if not 1 <= confidence <= 5:
+                 logger.warning(f"Clamping confidence {confidence} to range [1, 5] for factor '{name}'")
+                 confidence = max(1.0, min(5.0, confidence))
+        except (ValueError, TypeError):
+             logger.warning(f"Could not parse confidence '{confidence_raw}' as number for factor '{name}'. Skipping.")
+             continue
+        
+        factors.append(Factor(
+            name=str(name), # Ensure name is string
+            justification=str(justification), # Ensure justification is string
+            confidence=confidence
+        ))
+    return factors
+
 def _parse_factor_list(text: str) -> List[Factor]:
-    """Parses the raw LLM output expecting a JSON array into a list of Factor objects."""
+    """
+    Parses the raw LLM output into a list of Factor objects. Expects the structured-output
+    shape {"factors": [...]}, or a bare JSON array (possibly wrapped in prose) from older prompts.
+    """
     factors = []
     raw_text = text # Keep original for logging if needed
 
-    # Attempt to find the first JSON array block `[...]` using a non-greedy match.
-    # This is more robust to surrounding text or markdown markers.
+    # Structured output first: parsing the whole reply keeps brackets inside strings intact
+    try:
+        data = json_utils.loads_lenient(raw_text)
+    except json.JSONDecodeError:
+        data = None
+    if isinstance(data, dict) and isinstance(data.get("factors"), list):
+        return _factors_from_items(data["factors"])
+    if isinstance(data, list):
+        return _factors_from_items(data)
+
+    # Fallback for bare-array or prose-wrapped replies: find the first JSON array block `[...]`
+    # using a non-greedy match. This is more robust to surrounding text or markdown markers.
     match = re.search(r'(\[.*?\])', raw_text, re.DOTALL)
     
     if match:
@@ -44,37 +97,11 @@ def _parse_factor_list(text: str) -> List[Factor]:
         return []
 
     try:
-        data = json.loads(json_str)
+        data = json_utils.loads_lenient(json_str)
         if not isinstance(data, list):
             raise TypeError("Parsed JSON is not a list.")
 
-        for item in data:
-            if not isinstance(item, dict):
-                logger.warning(f"Skipping non-dictionary item in JSON array: {item}")
-                continue
-
-            name = item.get('factor_name')
-            justification = item.get('justification')
-            confidence_raw = item.get('confidence')
-
-            if not name or not justification or confidence_raw is None:
-                logger.warning(f"Skipping factor with missing fields: {item}")
-                continue
-
-            try:
-                confidence = float(confidence_raw)
-                if not 1 <= confidence <= 5:
-                     logger.warning(f"Clamping confidence {confidence} to range [1, 5] for factor '{name}'")
-                     confidence = max(1.0, min(5.0, confidence))
-            except (ValueError, TypeError):
-                 logger.warning(f"Could not parse confidence '{confidence_raw}' as number for factor '{name}'. Skipping.")
-                 continue
-            
-            factors.append(Factor(
-                name=str(name), # Ensure name is string
-                justification=str(justification), # Ensure justification is string
-                confidence=confidence
-            ))
+        factors = _factors_from_items(data)
 
     except json.JSONDecodeError as e:
         logger.error(f"Failed to decode JSON response: {e}\nRaw JSON string attempted: {json_str[:500]}...")
@@ -85,8 +112,71 @@ def _parse_factor_list(text: str) -> List[Factor]:
 
     return factors
 
+def _parse_factor_batch(text: str, batch_size: int) -> List[List[Factor]]:
+    """
+    Parses a BASELINE_BATCH_PROMPT_TEMPLATE response ({"Q1": [...], "Q2": [...]}) into one factor
+    list per question, in order. Missing or malformed entries come back as empty lists.
+    """
+    match = re.search(r'(\{.*\})', text, re.DOTALL) # Outermost object, tolerating surrounding text
+    data = None
+    if match:
+        try:
+            data = json_utils.loads_lenient(match.group(1))
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to decode batched baseline JSON: {e}\nRaw response: {text[:500]}...")
+    if not isinstance(data, dict):
+        logger.warning(f"Batched baseline response is not a JSON object: {text[:200]}...")
+        return [[] for _ in range(batch_size)]
+
+    results = []
+    for i in range(1, batch_size + 1):
+        items = data.get(f"Q{i}")
+        if not isinstance(items, list):
+            logger.warning(f"Batched baseline response has no factor array for Q{i}")
+            items = []
+        results.append(_factors_from_items(items))
+    return results
+
+async def run_baseline_batch(
+    questions: Sequence[str],
+    top_k: int,
+    batch_size: int = 8,
+    concurrency: int = 4,
+    query_func: Optional[Callable[[str], Any]] = None
+) -> List[List[Factor]]:
+    """
+    Baseline factors for many questions, `batch_size` questions per LLM request (at most
+    `concurrency` requests in flight). Returns one factor list per question, in input order;
+    questions whose batch failed get an empty list. query_func defaults to O4 in JSON mode.
+    """
+    if query_func is None:
+        from llm_clients.o4_client import query_o4
+        query_func = functools.partial(query_o4, response_format={"type": "json_object"})
+    batches = [questions[i:i + batch_size] for i in range(0, len(questions), batch_size)]
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _one(batch: Sequence[str]) -> List[List[Factor]]:
+        async with sem:
+            response = await query_func(render_baseline_batch_prompt(batch, top_k))
+        if response.startswith("Error:"):
+            logger.error(f"Batched baseline request failed: {response}")
+            return [[] for _ in batch]
+        return _parse_factor_batch(response, len(batch))
+
+    results = await asyncio.gather(*(_one(b) for b in batches), return_exceptions=True)
+    factor_lists: List[List[Factor]] = []
+    for batch, result in zip(batches, results):
+        if isinstance(result, BaseException):
+            logger.error("Batched baseline request raised", exc_info=result)
+            result = [[] for _ in batch]
+        factor_lists.extend(result)
+    return factor_lists
+
 def _format_factors_for_prompt(factors: List[Factor]) -> str:
-    """Formats a list of factors into a JSON string suitable for inclusion in a prompt."""
+    """
+    Formats a list of factors into a JSON string suitable for inclusion in a prompt.
+    Used for both {previous_factors} and each agent's block in {other_agents_factors}.
+    """
     if not factors:
         return "[]" # Return empty JSON array string
     
@@ -100,8 +190,8 @@ def _format_factors_for_prompt(factors: List[Factor]) -> str:
     ]
     
     try:
-        # Use compact separators for potentially shorter prompt context
-        return json.dumps(factor_list_of_dicts, separators=(',', ':'))
+        # Compact, key order fixed by the dict literal above, so repeated rounds render identically
+        return json_utils.dumps_compact(factor_list_of_dicts)
     except TypeError as e:
         logger.error(f"Failed to serialize factors to JSON: {e}")
         return "[]" # Return empty array on serialization error
@@ -197,7 +287,7 @@ async def run_debate_rounds(
             other_agents_factors_str = "\n\n".join(other_agents_factors_list) if other_agents_factors_list else "No other agent responses available."
 
             # Assemble the critique prompt
-            critique_prompt = CRITIQUE_PROMPT_TEMPLATE.format(
+            critique_prompt = render_critique_prompt(
                 question=question,
                 previous_factors=previous_factors_str,
                 other_agents_factors=other_agents_factors_str,
@@ -208,7 +298,7 @@ async def run_debate_rounds(
 
             # Get the query function for the agent
             query_func = _local_agent_query_functions[agent_name]
-            tasks.append(query_func(critique_prompt))
+            tasks.append(query_func(critique_prompt, **FACTOR_JSON_KWARGS.get(agent_name, {})))
 
         # Execute agent queries in parallel
         # typer.secho(f"Querying agents for round {round_num}...", fg=typer.colors.YELLOW) # <-- Remove this commented line
@@ -255,7 +345,7 @@ async def run_debate_rounds(
             serializable_responses = {
                 agent_name: {
                     "agent_name": resp.agent_name,
-                    "factors": [f.__dict__ for f in resp.factors],
+                    "factors": [f.to_dict() for f in resp.factors],
                     "critique": resp.critique,
                     "raw_response": resp.raw_response 
                 } for agent_name, resp in current_responses.items()
@@ -8,7 +8,8 @@ from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 
 # Import necessary prompts and client functions (adjust paths if needed)
-from utils.prompts import FREEFORM_CRITIQUE_PROMPT_TEMPLATE
+from utils.prompts import render_freeform_critique_prompt
+from utils.progress import report_progress
 from llm_clients.o4_client import query_o4
 from llm_clients.gemini_client import query_gemini
 
@@ -50,7 +51,7 @@ async def run_freeform_critique_round(
             if other_agent != agent_name:
                 other_baselines_formatted += f"--- Baseline from Agent: {other_agent} ---\n{baseline_text}\n--- End Baseline from Agent: {other_agent} ---\n\n"
         
-        critique_prompt = FREEFORM_CRITIQUE_PROMPT_TEMPLATE.format(
+        critique_prompt = render_freeform_critique_prompt(
             question=question,
             your_baseline=initial_baselines[agent_name],
             other_baselines_formatted=other_baselines_formatted.strip()
@@ -89,16 +90,3 @@ async def run_freeform_critique_round(
 
     report_progress(progress_callback, "status", "Free-form critique round complete.", use_console=True)
     return critique_results_map
-
-# Helper function (can be moved to a shared utility later)
-def report_progress(callback: Optional[Callable[[str, Any], None]], update_type: str, data: Any, use_console: bool = True):
-    """Safely calls the progress callback or prints to console."""
-    if callback:
-        try:
-            callback(update_type, data)
-        except Exception as e:
-            logger.error(f"Error in progress callback: {e}", exc_info=True)
-            if use_console:
-                console.print(f"[Callback Error] [{update_type.upper()}] {data}")
-    elif use_console:
-        console.print(f"[{update_type.upper()}] {data}") 
\ No newline at end of file
@@ -6,8 +6,9 @@ import statistics
 import logging
 
 from utils.models import Factor, AgentResponse
+from utils import json_utils
 # Import prompts from the central file
-from utils.prompts import MERGE_FACTORS_PROMPT, REFINE_PROMPT_TEMPLATE
+from utils.prompts import REFINE_PROMPT_TEMPLATE, render_merge_factors_prompt
 from rich.console import Console
 # Assuming LLMInterface is correctly importable from the root or adjusted path
 from llm_interface import LLMInterface
@@ -68,7 +69,7 @@ async def merge_factors(
     #       Using the default model configured in LLMInterface for now.
     merge_llm = LLMInterface() # Uses default model from env/config
 
-    prompt = MERGE_FACTORS_PROMPT.format(
+    prompt = render_merge_factors_prompt(
         question=question,
         top_k=top_k,
         formatted_factors=formatted_factors_text
@@ -90,9 +91,8 @@ async def merge_factors(
     # --- Step 3: Parse LLM Output --- 
     merged_factors: List[Factor] = []
     try:
-        # Basic parsing: Assume LLM returns just the JSON list
-        # More robust parsing might involve regex to find JSON block
-        parsed_json = json.loads(raw_llm_response)
+        # Tolerates fences, surrounding text and trailing commas, so the prompt doesn't have to beg for bare JSON
+        parsed_json = json_utils.loads_lenient(raw_llm_response)
         
         if not isinstance(parsed_json, list):
             raise ValueError("LLM response is not a JSON list.")
@@ -3,7 +3,7 @@ from typing import List
 import logging
 
 from utils.models import Factor
-from utils.prompts import SUMMARIZATION_PROMPT_TEMPLATE
+from utils.prompts import render_summarization_prompt
 # Use the default O4 client for summarization for now
 # We could make the summarizer model configurable later if needed
 from llm_clients.o4_client import query_o4
@@ -31,7 +31,7 @@ async def generate_summary(merged_factors: List[Factor]) -> str:
     consensus_details_lines = []
     all_justifications_lines = []
     for i, factor in enumerate(merged_factors):
-        endorsements = getattr(factor, 'endorsement_count', 'N/A')
+        endorsements = factor.endorsement_count if factor.endorsement_count is not None else 'N/A'
         consensus_details_lines.append(
             f"{i+1}. {factor.name} (Endorsements: {endorsements}, Mean Confidence: {factor.confidence:.2f})"
         )
@@ -41,7 +41,7 @@ async def generate_summary(merged_factors: List[Factor]) -> str:
     all_justifications = "\n".join(all_justifications_lines)
 
     # --- Assemble and call LLM --- 
-    prompt = SUMMARIZATION_PROMPT_TEMPLATE.format(
+    prompt = render_summarization_prompt(
         consensus_factors_details=consensus_factors_details,
         all_justifications=all_justifications
     )
@@ -71,11 +71,9 @@ async def generate_summary(merged_factors: List[Factor]) -> str:
 # Example (for testing structure)
 # async def main_test():
 #     factors = [
-#         Factor(name="A", justification="(Agent1): JA1\n(Agent2): JA2", confidence=4.5),
-#         Factor(name="B", justification="(Agent1): JB1\n(Agent2): JB2", confidence=4.0)
+#         Factor(name="A", justification="(Agent1): JA1\n(Agent2): JA2", confidence=4.5, endorsement_count=2),
+#         Factor(name="B", justification="(Agent1): JB1\n(Agent2): JB2", confidence=4.0, endorsement_count=2)
 #     ]
-#     setattr(factors[0], 'endorsement_count', 2)
-#     setattr(factors[1], 'endorsement_count', 2)
 #     summary = await generate_summary(factors)
 #     print("\nGenerated Summary:")
 #     print(summary)
@@ -1,21 +1,64 @@
 # core/synthesizer.py
 
 import asyncio
+import atexit
+import contextlib
 import logging
-from typing import Dict, List, Optional, Callable, Any
+import os
+import threading
+from typing import Dict, List, Optional, Callable, Any, Sequence, Union
 
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 
 # Import necessary prompts and LLM interface
-from utils.prompts import SYNTHESIS_PROMPT_TEMPLATE
+from utils.prompts import SYNTHESIS_SYSTEM_PROMPT, render_synthesis_user_prompt
 # Assuming a high-capability model like O4-mini or a dedicated judge model for synthesis
 # Using LLMInterface to handle client interaction and potential model selection via env vars
 from llm_interface import LLMInterface 
+from utils.prompt_cache import PromptCache, prompt_key
 
 console = Console()
 logger = logging.getLogger(__name__)
 
+# Synthesizer LLMInterfaces, one per model key, built on first use and reused across calls
+# so repeated syntheses share one client/connection pool instead of constructing it each time
+_LLM_CACHE: Dict[str, LLMInterface] = {}
+_llm_cache_lock = threading.Lock()
+
+def _get_llm(model_key: str) -> LLMInterface:
+    """Returns the cached LLMInterface for model_key, constructing it once (thread-safe)."""
+    llm = _LLM_CACHE.get(model_key)
+    if llm is None:
+        with _llm_cache_lock:
+            llm = _LLM_CACHE.get(model_key)
+            if llm is None:
+                llm = _LLM_CACHE[model_key] = LLMInterface(model_key=model_key)
+    return llm
+
+@atexit.register
+def _close_llms():
+    """Closes the pooled synthesizer clients at interpreter exit."""
+    for llm in _LLM_CACHE.values():
+        try:
+            llm.close()
+        except Exception as e:
+            logger.warning(f"Ignoring error during synthesizer LLM close: {e}")
+    _LLM_CACHE.clear()
+
+# Final answers cached by prompt hash (opt-in via SYNTHESIS_CACHE=1), so re-running the same
+# question/baselines/debate skips the synthesizer call
+_synthesis_cache: Optional[PromptCache] = None
+
+def _get_synthesis_cache() -> Optional[PromptCache]:
+    """Returns the shared synthesis cache if SYNTHESIS_CACHE=1, otherwise None."""
+    global _synthesis_cache
+    if os.getenv("SYNTHESIS_CACHE") != "1":
+        return None
+    if _synthesis_cache is None:
+        _synthesis_cache = PromptCache("synthesis")
+    return _synthesis_cache
+
 # Helper function (copied from debate_engine_v4, consider moving to shared utility)
 def report_progress(callback: Optional[Callable[[str, Any], None]], update_type: str, data: Any, use_console: bool = True):
     """Safely calls the progress callback or prints to console."""
@@ -31,27 +74,37 @@ def report_progress(callback: Optional[Callable[[str, Any], None]], update_type:
 
 def _format_dict_for_prompt(data: Dict[str, str], title_prefix: str) -> str:
     """Formats a dictionary of agent responses for inclusion in the synthesis prompt."""
-    formatted_text = ""
-    for agent, text in data.items():
-        formatted_text += f"--- {title_prefix} from Agent: {agent} ---\n{text}\n--- End {title_prefix} from Agent: {agent} ---\n\n"
-    return formatted_text.strip()
+    if len(data) == 2: # The usual two-agent debate: one f-string, no list/join
+        (agent1, text1), (agent2, text2) = data.items()
+        return (
+            f"--- {title_prefix} from Agent: {agent1} ---\n{text1}\n--- End {title_prefix} from Agent: {agent1} ---\n\n"
+            f"--- {title_prefix} from Agent: {agent2} ---\n{text2}\n--- End {title_prefix} from Agent: {agent2} ---"
+        )
+    # One join instead of += per agent (str.join materializes its input anyway, so pass a list)
+    return "\n\n".join([
+        f"--- {title_prefix} from Agent: {agent} ---\n{text}\n--- End {title_prefix} from Agent: {agent} ---"
+        for agent, text in data.items()
+    ])
+
+_ROUND_HEADER = "=== Debate Round {} ===\n\n".format
 
 def _format_debate_rounds_for_prompt(debate_rounds: List[Dict[str, Any]]) -> str:
     """Formats the list of debate round dictionaries for the synthesis prompt."""
-    formatted_text = ""
-    for round_data in debate_rounds:
-        round_num = round_data.get("round", "Unknown")
-        responses = round_data.get("responses", {})
-        formatted_text += f"=== Debate Round {round_num} ===\n\n"
-        formatted_text += _format_dict_for_prompt(responses, "Response")
-        formatted_text += "\n\n"
-    return formatted_text.strip()
+    blocks = [
+        _ROUND_HEADER(round_data.get("round", "Unknown")) + _format_dict_for_prompt(round_data.get("responses", {}), "Response")
+        for round_data in debate_rounds
+    ]
+    # rstrip only matters when the last round had no responses (it returns the same string otherwise)
+    if len(blocks) == 1:
+        return blocks[0].rstrip()
+    return "\n\n".join(blocks).rstrip()
 
 async def synthesize_final_answer(
     question: str,
     initial_baselines: Dict[str, str],
     debate_rounds: List[Dict[str, Any]], # Expects list like [{"round": 1, "responses": {...}}] 
-    progress_callback: Optional[Callable[[str, Any], None]]
+    progress_callback: Optional[Callable[[str, Any], None]],
+    show_spinner: bool = True
 ) -> str:
     """Synthesizes the final answer using an LLM based on all baselines and debate text."""
     
@@ -61,8 +114,8 @@ async def synthesize_final_answer(
     # Defaulting to a high-capability model like O4-mini for synthesis quality.
     synthesizer_model_key = "gpt-o4-mini" # Or read from os.getenv("SYNTHESIZER_MODEL_KEY", "gpt-o4-mini")
     try:
-        # Initialize LLMInterface specifically for the synthesizer model
-        synthesizer_llm = LLMInterface(model_key=synthesizer_model_key)
+        # Shared LLMInterface for the synthesizer model (created on first use)
+        synthesizer_llm = _get_llm(synthesizer_model_key)
     except ValueError as e:
         msg = f"Error initializing synthesizer LLM ({synthesizer_model_key}): {e}"
         report_progress(progress_callback, "error", msg, use_console=True)
@@ -77,7 +130,8 @@ async def synthesize_final_answer(
     initial_baselines_formatted = _format_dict_for_prompt(initial_baselines, "Baseline")
     critique_texts_formatted = _format_debate_rounds_for_prompt(debate_rounds)
 
-    synthesis_prompt = SYNTHESIS_PROMPT_TEMPLATE.format(
+    # Static instructions go in the system message; only the materials and question vary per call
+    synthesis_prompt = render_synthesis_user_prompt(
         question=question,
         initial_baselines_formatted=initial_baselines_formatted,
         critique_texts_formatted=critique_texts_formatted
@@ -86,29 +140,60 @@ async def synthesize_final_answer(
     logger.debug(f"Synthesizer Prompt prepared for model {synthesizer_llm.model_name}:")
     # logger.debug(synthesis_prompt) # Uncomment for full prompt debugging
 
+    cache = _get_synthesis_cache()
+    if cache is not None:
+        cache_key = prompt_key(f"{synthesizer_model_key}\x00{SYNTHESIS_SYSTEM_PROMPT}\x00{synthesis_prompt}")
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info("Synthesis cache hit (%s)", cache_key)
+            report_progress(progress_callback, "status", "Synthesis complete (cached).", use_console=True)
+            return cached
+
     final_answer = "Error: Synthesis failed."
     report_progress(progress_callback, "status", f"Querying synthesizer model ({synthesizer_llm.model_name})...", use_console=False)
-    with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console, transient=True) as progress:
-        task = progress.add_task("[yellow]Synthesizing final answer...", total=None)
+    # Rich allows one live display per console, so concurrent syntheses run without the spinner
+    spinner = Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console, transient=True) if show_spinner else contextlib.nullcontext()
+    with spinner as progress:
+        task = progress.add_task("[yellow]Synthesizing final answer...", total=None) if progress else None
         try:
-            # Use generate_response which handles system prompts appropriately if needed by the template in future
-            final_answer = await asyncio.to_thread( # Use to_thread for potentially long sync call within async context
-                synthesizer_llm.generate_response, 
-                prompt=synthesis_prompt, # Pass the whole formatted content as the main prompt
+            # Native async SDK call (no worker thread); the system prompt is folded into the
+            # user message for models without a system role
+            final_answer = await synthesizer_llm.agenerate_response(
+                prompt=synthesis_prompt,
+                system_prompt=SYNTHESIS_SYSTEM_PROMPT,
                 temperature=0.5 # Lower temp for more deterministic synthesis
             )
             report_progress(progress_callback, "status", "Synthesis complete.", use_console=True)
+            if cache is not None and not final_answer.startswith("Error:"): # Don't pin failures
+                cache.set(cache_key, final_answer)
         except Exception as e:
             msg = f"Error during synthesis call: {e}"
             report_progress(progress_callback, "error", msg, use_console=True)
             logger.error("Synthesizer LLM call failed", exc_info=True)
             final_answer = f"Error: Synthesis failed due to LLM error: {e}" # Update answer on error
         finally:
-            progress.update(task, completed=True, visible=False)
-            # Clean up LLM interface if needed (though current OpenAI client might not require it)
-            try:
-                synthesizer_llm.close()
-            except Exception as e:
-                logger.warning(f"Ignoring error during synthesizer LLM close: {e}")
-
-    return final_answer 
\ No newline at end of file
+            if progress:
+                progress.update(task, completed=True, visible=False)
+            # The pooled client stays open for the next synthesis; _close_llms closes it at exit
+
+    return final_answer
+
+async def synthesize_many(
+    items: Sequence[Dict[str, Any]],
+    concurrency: int = 8
+) -> List[Union[str, BaseException]]:
+    """
+    Runs synthesize_final_answer over many inputs concurrently (e.g. an evaluation sweep).
+
+    Each item holds synthesize_final_answer's keyword arguments (question, initial_baselines,
+    debate_rounds, optionally progress_callback). At most `concurrency` syntheses are in flight,
+    all sharing the pooled synthesizer client. Results come back in input order; an exception
+    for one item is returned in its slot instead of failing the batch.
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _one(kwargs: Dict[str, Any]):
+        async with sem:
+            return await synthesize_final_answer(**{"progress_callback": None, **kwargs}, show_spinner=False)
+
+    return await asyncio.gather(*(_one(item) for item in items), return_exceptions=True)
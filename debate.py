@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import os
 import sys
-from dotenv import load_dotenv
+from utils.env import ensure_env
 import typer
 import asyncio
 from typing import Dict, Any
@@ -14,7 +14,7 @@ import json
 # from llm_interface import LLMInterface
 
 # Load environment variables
-load_dotenv()
+ensure_env()
 
 # Import core engine and models/prompts
 from core.debate_engine import run_debate_rounds, _parse_factor_list
@@ -22,7 +22,7 @@ from core.merge_logic import merge_factors
 from core.summarizer import generate_summary
 from judge.judge_agent import judge_quality
 from utils.models import AgentResponse, Factor # For type hints and parsing
-from utils.prompts import BASELINE_PROMPT_TEMPLATE
+from utils.prompts import FACTOR_LIST_RESPONSE_FORMAT, render_baseline_prompt
 
 # Initialize Rich Console
 console = Console()
@@ -64,12 +64,13 @@ async def run_debate_logic(question: str, top_k: int, max_rounds: int, output: s
         has_grok = False
 
     # Build baseline prompt
-    baseline_prompt = BASELINE_PROMPT_TEMPLATE.format(question=question, top_k=top_k)
+    baseline_prompt = render_baseline_prompt(question=question, top_k=top_k)
     transcript_data["baseline_prompt"] = baseline_prompt
     console.print(f"\n[cyan]Baseline prompt:[/cyan]\n{baseline_prompt}") # Debug print
 
     # Query each agent in parallel
-    tasks = [query_o4(baseline_prompt), query_gemini(baseline_prompt)]
+    # Provider-enforced JSON output, so no format examples are needed in the prompt
+    tasks = [query_o4(baseline_prompt, response_format=FACTOR_LIST_RESPONSE_FORMAT), query_gemini(baseline_prompt, json_mode=True)]
     agent_names = ["O4-mini", "Gemini-2.5"]
     if has_grok:
         tasks.append(query_grok(baseline_prompt))
@@ -104,7 +105,7 @@ async def run_debate_logic(question: str, top_k: int, max_rounds: int, output: s
             # Now parse the baseline response using the same parser
             parsed_baseline_factors = _parse_factor_list(resp)
             agent_resp_obj.factors = parsed_baseline_factors # Store actual Factor objects
-            resp_data["factors"] = [f.__dict__ for f in parsed_baseline_factors] # Store dicts in transcript
+            resp_data["factors"] = [f.to_dict() for f in parsed_baseline_factors] # Store dicts in transcript
             console.print(f"[[bold blue]{name}[/bold blue]] Parsed Factors: {len(parsed_baseline_factors)} factors")
             # console.print(f"[[bold blue]{name}[/bold blue]] Raw: {resp[:100]}...") # Optionally hide raw if parsed ok
 
@@ -124,6 +125,7 @@ async def run_debate_logic(question: str, top_k: int, max_rounds: int, output: s
         initial_responses=initial_responses,
         question=question,
         max_rounds=max_rounds,
+        progress_callback=None, # No per-round result callback for the CLI
         human_feedback_callback=get_human_feedback # Pass the callback
     )
 
@@ -131,7 +133,7 @@ async def run_debate_logic(question: str, top_k: int, max_rounds: int, output: s
     transcript_data["debate_history"] = [
         {an: {
                 "agent_name": ar.agent_name,
-                "factors": [f.__dict__ for f in ar.factors], # Convert Factors
+                "factors": [f.to_dict() for f in ar.factors], # Convert Factors
                 "critique": ar.critique,
                 "raw_response": ar.raw_response
             } for an, ar in round_responses.items()} 
@@ -151,10 +153,10 @@ async def run_debate_logic(question: str, top_k: int, max_rounds: int, output: s
         console.print("\n[bold yellow][Merged Factors][/bold yellow]")
         if merged_factors:
             for factor in merged_factors:
-                endorsements = getattr(factor, 'endorsement_count', 'N/A')
+                endorsements = factor.endorsement_count if factor.endorsement_count is not None else 'N/A'
                 console.print(f"- [bold magenta]{factor.name}[/bold magenta] (Endorsements: {endorsements}, Mean Confidence: {factor.confidence:.2f})")
             # Store merged factors in transcript (Factor objects to dicts)
-            transcript_data["merged_factors"] = [f.__dict__ for f in merged_factors]
+            transcript_data["merged_factors"] = [f.to_dict() for f in merged_factors]
         else:
             console.print("[red]No factors met the merge criteria.[/red]")
     else:
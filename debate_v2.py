@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 import os
 import sys
-from dotenv import load_dotenv
+from utils.env import ensure_env
 import typer
 import asyncio
-from typing import Dict, Any
+from typing import Any, Callable, Dict, List
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 import logging
@@ -14,10 +14,10 @@ import json
 # from llm_interface import LLMInterface
 
 # Load environment variables
-load_dotenv()
+ensure_env()
 
 # Import core engine and models/prompts
-from core.debate_engine import run_debate_rounds, _parse_factor_list
+from core.debate_engine import FACTOR_JSON_KWARGS, run_debate_rounds, _parse_factor_list
 from core.merge_logic import merge_factors
 from core.summarizer import generate_summary
 from judge.judge_agent import judge_quality
@@ -26,7 +26,8 @@ from utils.models import AgentResponse, Factor # For type hints and parsing
 from utils.prompts import (
     BASELINE_PROMPT_TEMPLATE, # Keep for reference/comparison if needed
     PROSE_BASELINE_GENERATION_TEMPLATE, 
-    CRITIQUE_PROSE_BASELINE_TEMPLATE
+    CRITIQUE_PROSE_BASELINE_TEMPLATE,
+    CRITIQUE_AND_MERGE_PROSE_BASELINE_TEMPLATE
 )
 
 # Initialize Rich Console
@@ -34,79 +35,16 @@ console = Console()
 
 app = typer.Typer()
 
-async def run_debate_logic(question: str, top_k: int, max_rounds: int, output: str, verbose: bool):
-    """Core async logic for running the debate baseline and rounds."""
-    console.print(f"[bold magenta]Running debate for:[/bold magenta] {question}")
-
-    # --- Transcript Data --- 
-    transcript_data: Dict[str, Any] = {
-        "question": question,
-        "parameters": {
-            "max_rounds": max_rounds,
-            "top_k": top_k,
-            "verbose": verbose,
-            "output_file": output
-        },
-        "baseline_prompt": "",
-        "baseline_responses": [], # List of AgentResponse-like dicts
-        "debate_history": [], # List of round dicts, each mapping agent_name to AgentResponse-like dict
-        "merged_factors": [], # List of Factor-like dicts
-        "final_summary": "",
-        "judge_result": {},
-        "final_decision": "",
-        "final_answer": "",
-        "baseline_prose_summary": "",
-        "anchor_agent": "", # Track which agent was the anchor
-        "initial_prose_baseline": "" # Store the raw prose baseline
-    }
-
-    # --- V2: Determine Anchor Agent --- 
-    anchor_agent_name = os.getenv("ANCHOR_AGENT_NAME", "O4-mini") # Default to O4-mini
-    transcript_data["anchor_agent"] = anchor_agent_name
-    console.print(f"[bold cyan]Anchor Agent for V2:[/bold cyan] {anchor_agent_name}")
-
-    # --- V2: Step 1 - Generate High-Quality Prose Baseline --- 
-    from llm_clients.o4_client import query_o4
-    from llm_clients.gemini_client import query_gemini
-    # Map agent names to their query functions
-    # TODO: Consider moving this mapping to a shared utility or config
-    agent_query_functions = {
-        "O4-mini": query_o4,
-        "Gemini-2.5": query_gemini
-    }
-    try:
-        from llm_clients.grok_client import query_grok # type: ignore
-        agent_query_functions["Grok-3"] = query_grok
-    except ImportError:
-        pass # Grok is optional
-
-    if anchor_agent_name not in agent_query_functions:
-        console.print(f"[bold red]Error:[/bold red] Anchor agent '{anchor_agent_name}' not found in available clients. Exiting.")
-        sys.exit(1)
-    
-    anchor_query_func = agent_query_functions[anchor_agent_name]
-    prose_baseline_prompt = PROSE_BASELINE_GENERATION_TEMPLATE.format(question=question)
-    transcript_data["baseline_prompt"] = prose_baseline_prompt # Store the prompt used
-
-    prose_baseline = "Error: Failed to generate prose baseline."
-    with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console, transient=True) as progress:
-        baseline_task = progress.add_task(f"[yellow]Querying Anchor Agent ({anchor_agent_name}) for prose baseline...", total=None)
-        try:
-            prose_baseline = await anchor_query_func(prose_baseline_prompt)
-            transcript_data["initial_prose_baseline"] = prose_baseline
-            console.print(f"\n[bold green]Initial Prose Baseline from {anchor_agent_name}:[/bold green]")
-            console.print(prose_baseline)
-        except Exception as e:
-            console.print(f"\n[bold red]Error generating prose baseline from {anchor_agent_name}: {e}[/bold red]")
-            logging.error(f"Failed to generate prose baseline", exc_info=True)
-            transcript_data["initial_prose_baseline"] = f"Error: {e}"
-            # Decide if we should exit or try to continue without a baseline? Exit for now.
-            sys.exit(1)
-        finally:
-            progress.update(baseline_task, completed=True, visible=False)
-
-
-    # --- V2: Step 2 - Initiate Critique & Factor Generation (Round 1 Seed) --- #
+async def _critique_debate_and_merge(
+    agent_query_functions: Dict[str, Callable],
+    question: str,
+    prose_baseline: str,
+    max_rounds: int,
+    top_k: int,
+    transcript_data: Dict[str, Any]
+) -> List[Factor]:
+    """Every agent critiques the prose baseline, the critiques seed the debate rounds, and the final round is merged."""
+    # --- Initiate Critique & Factor Generation (Round 1 Seed) --- #
     critique_tasks = []
     critique_prompts = {}
     agent_names = list(agent_query_functions.keys())
@@ -147,7 +85,7 @@ async def run_debate_logic(question: str, top_k: int, max_rounds: int, output: s
             # Parse the JSON factor list from the critique response
             parsed_factors = _parse_factor_list(resp)
             agent_resp_obj.factors = parsed_factors
-            resp_data["factors"] = [f.__dict__ for f in parsed_factors]
+            resp_data["factors"] = [f.to_dict() for f in parsed_factors]
             console.print(f"[[bold blue]{name}[/bold blue]] Parsed Factors from Critique: {len(parsed_factors)} factors")
 
         initial_responses[name] = agent_resp_obj
@@ -167,6 +105,7 @@ async def run_debate_logic(question: str, top_k: int, max_rounds: int, output: s
         initial_responses=initial_responses,
         question=question,
         max_rounds=max_rounds,
+        progress_callback=None, # No per-round result callback for the CLI
         human_feedback_callback=get_human_feedback # Pass the callback
     )
 
@@ -174,7 +113,7 @@ async def run_debate_logic(question: str, top_k: int, max_rounds: int, output: s
     transcript_data["debate_history"] = [
         {an: {
                 "agent_name": ar.agent_name,
-                "factors": [f.__dict__ for f in ar.factors], # Convert Factors
+                "factors": [f.to_dict() for f in ar.factors], # Convert Factors
                 "critique": ar.critique,
                 "raw_response": ar.raw_response
             } for an, ar in round_responses.items()} 
@@ -193,15 +132,141 @@ async def run_debate_logic(question: str, top_k: int, max_rounds: int, output: s
         )
         # Store merged factors in transcript (Factor objects to dicts)
         if merged_factors:
-            transcript_data["merged_factors"] = [f.__dict__ for f in merged_factors]
+            transcript_data["merged_factors"] = [f.to_dict() for f in merged_factors]
         else:
             # Handle case where merge returns empty (e.g., LLM error)
             transcript_data["merged_factors"] = [] 
     else:
         console.print("\n[bold red]Error:[/bold red] Debate history is empty, cannot merge.")
-        # merged_factors already initialized to []
+        merged_factors = []
         transcript_data["merged_factors"] = []
 
+    return merged_factors
+
+async def _fused_critique_merge(
+    anchor_agent_name: str,
+    anchor_query_func: Callable,
+    question: str,
+    prose_baseline: str,
+    top_k: int,
+    transcript_data: Dict[str, Any]
+) -> List[Factor]:
+    """
+    Zero-round shortcut: the anchor agent critiques the prose baseline and returns the final
+    top-k factors in one call, instead of one critique call per agent plus a merge call.
+    """
+    prompt = CRITIQUE_AND_MERGE_PROSE_BASELINE_TEMPLATE.format(
+        question=question,
+        prose_baseline=prose_baseline,
+        top_k=top_k
+    )
+    resp_data = {"agent_name": anchor_agent_name, "raw_response": None, "error": None, "factors": [], "prompt_used": prompt}
+    transcript_data["baseline_responses"] = [resp_data]
+    transcript_data["merged_factors"] = []
+
+    with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console, transient=True) as progress:
+        fused_task = progress.add_task(f"[yellow]Querying {anchor_agent_name} for critique + merged factors...", total=None)
+        try:
+            # Same provider-enforced {"factors": [...]} output as the other factor-list calls
+            resp = await anchor_query_func(prompt, **FACTOR_JSON_KWARGS.get(anchor_agent_name, {}))
+        except Exception as e:
+            console.print(f"[bold red]Error during fused critique/merge: {e}[/bold red]")
+            logging.error("Fused critique/merge call failed", exc_info=True)
+            resp_data["error"] = str(e)
+            return []
+        finally:
+            progress.update(fused_task, completed=True, visible=False)
+
+    resp_data["raw_response"] = resp
+    merged_factors = _parse_factor_list(resp)[:top_k]
+    resp_data["factors"] = transcript_data["merged_factors"] = [f.to_dict() for f in merged_factors]
+    console.print(f"[[bold blue]{anchor_agent_name}[/bold blue]] Fused critique/merge returned {len(merged_factors)} factors")
+    return merged_factors
+
+async def run_debate_logic(question: str, top_k: int, max_rounds: int, output: str, verbose: bool, fuse_critique_merge: bool = False):
+    """Core async logic for running the debate baseline and rounds."""
+    console.print(f"[bold magenta]Running debate for:[/bold magenta] {question}")
+
+    # --- Transcript Data --- 
+    transcript_data: Dict[str, Any] = {
+        "question": question,
+        "parameters": {
+            "max_rounds": max_rounds,
+            "top_k": top_k,
+            "verbose": verbose,
+            "output_file": output
+        },
+        "baseline_prompt": "",
+        "baseline_responses": [], # List of AgentResponse-like dicts
+        "debate_history": [], # List of round dicts, each mapping agent_name to AgentResponse-like dict
+        "merged_factors": [], # List of Factor-like dicts
+        "final_summary": "",
+        "judge_result": {},
+        "final_decision": "",
+        "final_answer": "",
+        "baseline_prose_summary": "",
+        "anchor_agent": "", # Track which agent was the anchor
+        "initial_prose_baseline": "" # Store the raw prose baseline
+    }
+
+    # --- V2: Determine Anchor Agent --- 
+    anchor_agent_name = os.getenv("ANCHOR_AGENT_NAME", "O4-mini") # Default to O4-mini
+    transcript_data["anchor_agent"] = anchor_agent_name
+    console.print(f"[bold cyan]Anchor Agent for V2:[/bold cyan] {anchor_agent_name}")
+
+    # --- V2: Step 1 - Generate High-Quality Prose Baseline --- 
+    from llm_clients.o4_client import query_o4
+    from llm_clients.gemini_client import query_gemini
+    # Map agent names to their query functions
+    # TODO: Consider moving this mapping to a shared utility or config
+    agent_query_functions = {
+        "O4-mini": query_o4,
+        "Gemini-2.5": query_gemini
+    }
+    try:
+        from llm_clients.grok_client import query_grok # type: ignore
+        agent_query_functions["Grok-3"] = query_grok
+    except ImportError:
+        pass # Grok is optional
+
+    if anchor_agent_name not in agent_query_functions:
+        console.print(f"[bold red]Error:[/bold red] Anchor agent '{anchor_agent_name}' not found in available clients. Exiting.")
+        sys.exit(1)
+    
+    anchor_query_func = agent_query_functions[anchor_agent_name]
+    prose_baseline_prompt = PROSE_BASELINE_GENERATION_TEMPLATE.format(question=question)
+    transcript_data["baseline_prompt"] = prose_baseline_prompt # Store the prompt used
+
+    prose_baseline = "Error: Failed to generate prose baseline."
+    with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console, transient=True) as progress:
+        baseline_task = progress.add_task(f"[yellow]Querying Anchor Agent ({anchor_agent_name}) for prose baseline...", total=None)
+        try:
+            prose_baseline = await anchor_query_func(prose_baseline_prompt)
+            transcript_data["initial_prose_baseline"] = prose_baseline
+            console.print(f"\n[bold green]Initial Prose Baseline from {anchor_agent_name}:[/bold green]")
+            console.print(prose_baseline)
+        except Exception as e:
+            console.print(f"\n[bold red]Error generating prose baseline from {anchor_agent_name}: {e}[/bold red]")
+            logging.error(f"Failed to generate prose baseline", exc_info=True)
+            transcript_data["initial_prose_baseline"] = f"Error: {e}"
+            # Decide if we should exit or try to continue without a baseline? Exit for now.
+            sys.exit(1)
+        finally:
+            progress.update(baseline_task, completed=True, visible=False)
+
+
+    # --- V2: Step 2 - Critique, Debate Rounds and Merge --- #
+    if fuse_critique_merge and max_rounds > 0:
+        console.print("[yellow]--fuse-critique-merge only applies with --max-rounds 0; running the full debate.[/yellow]")
+    if fuse_critique_merge and max_rounds == 0:
+        merged_factors = await _fused_critique_merge(
+            anchor_agent_name, anchor_query_func, question, prose_baseline, top_k, transcript_data
+        )
+    else:
+        merged_factors = await _critique_debate_and_merge(
+            agent_query_functions, question, prose_baseline, max_rounds, top_k, transcript_data
+        )
+
     # --- Generate Summary --- #
     final_summary = "Summary could not be generated."
     if merged_factors:
@@ -265,7 +330,8 @@ def main(
     max_rounds: int = typer.Option(3, "--max-rounds", "-m", help="Maximum debate rounds"),
     top_k: int = typer.Option(5, "--top-k", "-k", help="Top K factors to merge"),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose output"),
-    output: str = typer.Option("transcript.json", "--output", "-o", help="Transcript file path")
+    output: str = typer.Option("transcript.json", "--output", "-o", help="Transcript file path"),
+    fuse_critique_merge: bool = typer.Option(False, "--fuse-critique-merge", help="With --max-rounds 0, critique and merge in a single anchor-agent call")
 ):
     """
     CLI entrypoint for the multi-LLM debate system.
@@ -288,7 +354,7 @@ def main(
     # llm = LLMInterface()
 
     # Run the core async logic
-    asyncio.run(run_debate_logic(question, top_k, max_rounds, output, verbose))
+    asyncio.run(run_debate_logic(question, top_k, max_rounds, output, verbose, fuse_critique_merge))
 
 if __name__ == "__main__":
     app() 
\ No newline at end of file
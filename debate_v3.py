@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import os
 import sys
-from dotenv import load_dotenv
+from utils.env import ensure_env
 import typer
 import asyncio
 from typing import Dict, Any, Callable, Optional
@@ -14,7 +14,7 @@ import json
 # from llm_interface import LLMInterface
 
 # Load environment variables
-load_dotenv()
+ensure_env()
 
 # Import core engine and models/prompts
 from core.debate_engine import run_debate_rounds, _parse_factor_list
@@ -179,8 +179,8 @@ async def run_debate_logic(
             # Parse the JSON factor list from the critique response
             parsed_factors = _parse_factor_list(resp)
             agent_resp_obj.factors = parsed_factors
-            resp_data["factors"] = [f.__dict__ for f in parsed_factors]
-            report_progress(progress_callback, "agent_result", {"name": name, "factors": [f.__dict__ for f in agent_resp_obj.factors]}, use_console=True)
+            resp_data["factors"] = [f.to_dict() for f in parsed_factors]
+            report_progress(progress_callback, "agent_result", {"name": name, "factors": [f.to_dict() for f in agent_resp_obj.factors]}, use_console=True)
 
         initial_responses[name] = agent_resp_obj
         transcript_data["baseline_responses"].append(resp_data)
@@ -221,7 +221,7 @@ async def run_debate_logic(
     transcript_data["debate_history"] = [
         {an: {
                 "agent_name": ar.agent_name,
-                "factors": [f.__dict__ for f in ar.factors], # Convert Factors
+                "factors": [f.to_dict() for f in ar.factors], # Convert Factors
                 "critique": ar.critique,
                 "raw_response": ar.raw_response
             } for an, ar in round_responses.items()} 
@@ -242,7 +242,7 @@ async def run_debate_logic(
             )
             # Store merged factors in transcript (Factor objects to dicts)
             if merged_factors:
-                transcript_data["merged_factors"] = [f.__dict__ for f in merged_factors]
+                transcript_data["merged_factors"] = [f.to_dict() for f in merged_factors]
                 report_progress(progress_callback, "merge_result", transcript_data["merged_factors"], use_console=True)
             else:
                 # Handle case where merge returns empty (e.g., LLM error)
@@ -1,34 +1,35 @@
 #!/usr/bin/env python3
 import os
 import sys
-from dotenv import load_dotenv
+from utils.env import ensure_env
 import typer
 import asyncio
 from typing import Dict, Any, Callable, Optional
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 import logging
+from functools import lru_cache
 from utils.logger import setup_logger
+from utils.progress import get_progress_payload, report_progress # get_progress_payload is served by app.py
 import json
 # LLM Interface is not directly used here anymore, but clients might use it
 from llm_interface import LLMInterface
 
 # Load environment variables
-load_dotenv()
+ensure_env()
 
 # Import core engine and models/prompts
 from core.debate_engine import run_debate_rounds, _parse_factor_list
 from core.merge_logic import merge_factors, refine_with_debate_summary
 from core.summarizer import generate_summary
 from judge.judge_agent import judge_quality
-from utils.models import AgentResponse, Factor # For type hints and parsing
+from utils.models import AgentResponse, Factor, Ok, Err, Result # For type hints and parsing
 # Update imports for V2 prompts
 from utils.prompts import (
     BASELINE_PROMPT_TEMPLATE, # Keep for reference/comparison if needed
     PROSE_BASELINE_GENERATION_TEMPLATE, 
     CRITIQUE_PROSE_BASELINE_TEMPLATE,
     FREEFORM_CRITIQUE_PROMPT_TEMPLATE,
-    SYNTHESIS_PROMPT_TEMPLATE,
     REFINE_PROMPT_TEMPLATE
 )
 from core.debate_engine_v4 import run_freeform_critique_round
@@ -36,20 +37,59 @@ from core.synthesizer import synthesize_final_answer
 
 # Initialize Rich Console
 console = Console()
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=1024)
+def _prose_baseline_prompt(question: str) -> str:
+    """Prose-baseline prompt for a question, memoized so repeated questions reuse the same prompt string."""
+    return PROSE_BASELINE_GENERATION_TEMPLATE.format(question=question)
+
+# Early exit: skip synthesis + judge when every critique mostly repeats the reference baseline
+EARLY_EXIT_OVERLAP_THRESHOLD = 0.9
+SHINGLE_SIZE = 5
+
+def _shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """Returns the set of word n-grams (shingles) in the text."""
+    tokens = text.lower().split()
+    return set(zip(*(tokens[i:] for i in range(size))))
+
+def _jaccard_shingle(a: str, b: str) -> float:
+    """Jaccard similarity of the word shingles of two texts (0.0 if either is too short)."""
+    shingles_a, shingles_b = _shingles(a), _shingles(b)
+    if not shingles_a or not shingles_b:
+        return 0.0
+    return len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+
+def _as_result(text: str) -> Result:
+    """Wraps text from a client or helper that still reports failures as "Error: ..." strings."""
+    if text.startswith("Error:"):
+        return Err(text[len("Error:"):].strip())
+    return Ok(text)
+
+def _result_text(result: Result) -> str:
+    """Projects a Result to text for the transcript and UI, keeping the "Error: ..." form for failures."""
+    return result.value if isinstance(result, Ok) else f"Error: {result.msg}"
 
 app = typer.Typer()
 
-# Helper to safely call the callback or print to console
-def report_progress(callback: Optional[Callable[[str, Any], None]], update_type: str, data: Any, use_console: bool = True):
-    if callback:
-        try:
-            callback(update_type, data)
-        except Exception as e:
-            logging.error(f"Error in progress callback: {e}", exc_info=True)
-            if use_console:
-                console.print(f"[Callback Error] [{update_type.upper()}] {data}") 
-    elif use_console:
-        console.print(f"[{update_type.upper()}] {data}")
+
+def _append_jsonl(path: str, line: bytes):
+    with open(path, "ab") as f:
+        f.write(line)
+
+async def append_transcript_phase(output: Optional[str], phase: str, data: Any):
+    """Appends one completed phase to <output>.jsonl so earlier phases survive a crash mid-run."""
+    if not output:
+        return
+    line = (json.dumps({"phase": phase, "data": data}) + "\n").encode("utf-8")
+    try:
+        await asyncio.to_thread(_append_jsonl, output + ".jsonl", line)
+    except Exception as e:
+        logger.warning("Failed to append phase '%s' to %s.jsonl: %s", phase, output, e)
+
+def _write_transcript(path: str, transcript_data: Dict[str, Any]):
+    with open(path, 'w') as f:
+        json.dump(transcript_data, f, indent=4)
 
 async def run_debate_logic(
     question: str, 
@@ -66,7 +106,7 @@ async def run_debate_logic(
     # --- Determine Synthesizer Type from Parameter --- #
     # Use the provided synthesizer_choice, default if None or invalid
     if synthesizer_choice not in ["v4_default", "v3_refine"]:
-        logging.warning(f"Invalid synthesizer_choice '{synthesizer_choice}' received. Defaulting to 'v4_default'.")
+        logger.warning("Invalid synthesizer_choice '%s' received. Defaulting to 'v4_default'.", synthesizer_choice)
         synthesizer_choice = "v4_default"
         
     synthesizer_type_log = "V3 Refine Style" if synthesizer_choice == "v3_refine" else "V4 Default Style"
@@ -104,9 +144,11 @@ async def run_debate_logic(
         pass # Grok is optional
     
     agent_names = list(agent_query_functions.keys())
-    prose_baseline_prompt = PROSE_BASELINE_GENERATION_TEMPLATE.format(question=question)
+    prose_baseline_prompt = _prose_baseline_prompt(question)
     # Log the common prompt used
     transcript_data["parameters"]["prose_baseline_prompt"] = prose_baseline_prompt 
+    # Marks the start of this run in the append-only <output>.jsonl
+    await append_transcript_phase(output, "start", {"question": question, "parameters": transcript_data["parameters"]})
 
     baseline_tasks = []
     report_progress(progress_callback, "status", f"Querying {len(agent_names)} agents for parallel prose baselines...", use_console=False)
@@ -120,24 +162,25 @@ async def run_debate_logic(
         progress.update(task, completed=True, visible=False)
         
     report_progress(progress_callback, "status", "Processing parallel baselines...", use_console=True)
-    initial_baselines: Dict[str, str] = {}
-    has_any_baseline_succeeded = False
+    baseline_results: Dict[str, Result] = {}
     for agent_name, result in zip(agent_names, baseline_results_list):
         if isinstance(result, Exception):
             error_msg = f"Error generating baseline from {agent_name}: {result}"
             report_progress(progress_callback, "agent_error", {"agent_name": agent_name, "error": error_msg}, use_console=True)
-            logging.error(f"Failed to generate baseline from {agent_name}", exc_info=result)
-            initial_baselines[agent_name] = f"Error: {result}" # Store error in dict
+            logger.error("Failed to generate baseline from %s", agent_name, exc_info=result)
+            baseline_results[agent_name] = Err(str(result)) # Store error in dict
         else:
             report_progress(progress_callback, "agent_status", f"Baseline received from {agent_name}.", use_console=True)
-            initial_baselines[agent_name] = result
-            has_any_baseline_succeeded = True
+            baseline_results[agent_name] = _as_result(result)
             # Send individual baseline results to UI
             report_progress(progress_callback, "parallel_baselines", {"agent_name": agent_name, "baseline_text": result}, use_console=False)
             
-    transcript_data["initial_prose_baselines"] = initial_baselines
+    transcript_data["initial_prose_baselines"] = {agent: _result_text(r) for agent, r in baseline_results.items()}
+    await append_transcript_phase(output, "initial_prose_baselines", transcript_data["initial_prose_baselines"])
+    # Only successful baselines are passed on to the critique round and synthesizer
+    initial_baselines: Dict[str, str] = {agent: r.value for agent, r in baseline_results.items() if isinstance(r, Ok)}
 
-    if not has_any_baseline_succeeded:
+    if not initial_baselines:
         msg = "Error: All agents failed to generate initial baselines. Cannot proceed."
         report_progress(progress_callback, "error", msg, use_console=True)
         return "Error: Failed initial baseline generation."
@@ -156,25 +199,44 @@ async def run_debate_logic(
         )
         # Store results in transcript
         transcript_data["debate_rounds"].append({"round": 1, "responses": critique_round_texts})
+        await append_transcript_phase(output, "debate_round", transcript_data["debate_rounds"][-1])
         report_progress(progress_callback, "status", "Completed free-form critique round (Round 1).", use_console=True)
 
     except Exception as e:
         msg = f"Error during free-form critique round: {e}"
         report_progress(progress_callback, "error", msg, use_console=True)
-        logging.error("Error executing run_freeform_critique_round", exc_info=True)
+        logger.error("Error executing run_freeform_critique_round", exc_info=True)
         # Store partial results if any
         if critique_round_texts:
              transcript_data["debate_rounds"].append({"round": 1, "responses": critique_round_texts, "error": str(e)})
+             await append_transcript_phase(output, "debate_round", transcript_data["debate_rounds"][-1])
         # Decide if we should stop or proceed to synthesis with partial data?
         # For now, let's stop if the critique round fails.
         return f"Error: Failed during critique round: {e}"
 
     # TODO: Implement logic for subsequent debate rounds if max_rounds > 1
 
+    # --- Optional Early Exit: Critiques add nothing beyond the reference baseline --- #
+    # Opt-in via DEBATE_EARLY_EXIT=1. If every critique overlaps the reference baseline above
+    # the threshold, the judge would almost certainly fall back to the baseline anyway.
+    early_exit = False
+    early_exit_agent = "O4-mini" # Same reference baseline the judge uses
+    early_exit_baseline = baseline_results.get(early_exit_agent)
+    if os.getenv("DEBATE_EARLY_EXIT", "0") == "1" and isinstance(early_exit_baseline, Ok):
+        critique_results = [_as_result(text) for text in critique_round_texts.values()]
+        valid_critiques = [r.value for r in critique_results if isinstance(r, Ok)]
+        if valid_critiques:
+            overlap = min(_jaccard_shingle(early_exit_baseline.value, text) for text in valid_critiques)
+            if overlap > EARLY_EXIT_OVERLAP_THRESHOLD:
+                early_exit = True
+                report_progress(progress_callback, "status", f"Critiques overlap the {early_exit_agent} baseline ({overlap:.2f}). Skipping synthesis and judge.", use_console=True)
+
     # --- V4 Step 3: Synthesize Final Answer (Conditional based on synthesizer_choice) --- #
-    final_synthesized_answer = "Error: Synthesis step was skipped or failed."
+    synthesis_result: Result = Err("Synthesis step was skipped or failed.")
     
-    if not transcript_data["debate_rounds"]: 
+    if early_exit:
+        synthesis_result = early_exit_baseline
+    elif not transcript_data["debate_rounds"]: 
         report_progress(progress_callback, "warning", "Skipping synthesis step because debate round data is missing.", use_console=True)
     else:
         debate_texts = transcript_data["debate_rounds"] # Assuming only 1 round for now
@@ -186,16 +248,17 @@ async def run_debate_logic(
             reference_baseline_agent = "O4-mini" # As decided for judge
             baseline_prose = initial_baselines.get(reference_baseline_agent)
 
-            if not baseline_prose or baseline_prose.startswith("Error:"):
+            if not baseline_prose:
                 msg = f"Cannot run V3 Refine synthesizer: Reference baseline from {reference_baseline_agent} missing or failed."
                 report_progress(progress_callback, "error", msg, use_console=True)
-                final_synthesized_answer = f"Error: {msg}"
+                synthesis_result = Err(msg)
             else:
                 # Format critique texts as a single 'debate_summary'
                 debate_summary_text = ""
                 for agent, text in critique_responses.items():
                     debate_summary_text += f"--- Critique from {agent} ---\n{text}\n\n"
                 
+                # Not memoized: baseline and debate text are unique per run, so a cache would only pin them
                 refine_prompt = REFINE_PROMPT_TEMPLATE.format(
                     question=question,
                     baseline_prose=baseline_prose,
@@ -210,39 +273,44 @@ async def run_debate_logic(
                     with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console, transient=True) as progress:
                         task = progress.add_task("[yellow]Running V3-style refinement...", total=None)
                         # Using generate_response from LLMInterface
-                        final_synthesized_answer = await asyncio.to_thread(
+                        refined_answer = await asyncio.to_thread(
                             refine_llm.generate_response, 
                             prompt=refine_prompt,
                             temperature=0.5 # Consistent temp
                         )
+                        synthesis_result = Ok(refined_answer)
                         progress.update(task, completed=True, visible=False)
                     report_progress(progress_callback, "status", "V3-style refinement complete.", use_console=True)
                     refine_llm.close() # Close interface if needed
                 except Exception as e:
                     msg = f"Error during V3-style refinement call: {e}"
                     report_progress(progress_callback, "error", msg, use_console=True)
-                    logging.error("V3 Refine Synthesizer LLM call failed", exc_info=True)
-                    final_synthesized_answer = f"Error: Synthesis (V3 Refine) failed due to LLM error: {e}" 
+                    logger.error("V3 Refine Synthesizer LLM call failed", exc_info=True)
+                    synthesis_result = Err(f"Synthesis (V3 Refine) failed due to LLM error: {e}")
         
         else:
             # --- Synthesizer 1: Default V4 Synthesis Logic --- 
             report_progress(progress_callback, "status", "Running Synthesizer 1 (V4 Default Style)...", use_console=True)
             try:
-                final_synthesized_answer = await synthesize_final_answer(
+                synthesized_text = await synthesize_final_answer(
                     question=question,
                     initial_baselines=initial_baselines,
                     debate_rounds=debate_texts, 
                     progress_callback=progress_callback
                 )
+                # synthesize_final_answer reports failures as "Error: ..." strings
+                synthesis_result = _as_result(synthesized_text)
                 # Progress reported internally by synthesize_final_answer
             except Exception as e:
                 msg = f"Error during V4 synthesis step call: {e}"
                 report_progress(progress_callback, "error", msg, use_console=True)
-                logging.error("Error calling synthesize_final_answer", exc_info=True)
-                final_synthesized_answer = f"Error: Failed during synthesis step: {e}"
+                logger.error("Error calling synthesize_final_answer", exc_info=True)
+                synthesis_result = Err(f"Failed during synthesis step: {e}")
 
     # Store the result regardless of which synthesizer ran
+    final_synthesized_answer = _result_text(synthesis_result)
     transcript_data["final_synthesized_answer"] = final_synthesized_answer
+    await append_transcript_phase(output, "final_synthesized_answer", final_synthesized_answer)
     # Report the result *before* the judge runs, so it's visible if judge fails
     report_progress(progress_callback, "synthesized_answer", final_synthesized_answer, use_console=True)
         
@@ -252,20 +320,26 @@ async def run_debate_logic(
     
     # Select the reference baseline (e.g., O4-mini)
     reference_baseline_agent = "O4-mini" # Make configurable later if needed
-    reference_baseline = initial_baselines.get(reference_baseline_agent)
+    reference_baseline = initial_baselines.get(reference_baseline_agent) # None if missing or failed
     
     final_decision_answer = f"Error: Could not determine final answer. Synthesized: {final_synthesized_answer[:100]}..." # Default error
     judge_decision = "Error"
     judge_ratings = {}
     judge_raw = ""
 
-    if not reference_baseline or reference_baseline.startswith("Error:"):
+    if early_exit:
+        msg = f"All critiques overlap the {reference_baseline_agent} baseline above {EARLY_EXIT_OVERLAP_THRESHOLD}. Using the baseline without judging."
+        judge_decision = "Skipped - Critiques Redundant"
+        final_decision_answer = reference_baseline
+        transcript_data["judge_result"] = {"decision": judge_decision, "reason": msg}
+        report_progress(progress_callback, "final_decision", f"Fallback to {reference_baseline_agent} Baseline (critiques redundant)", use_console=True)
+    elif not reference_baseline:
         msg = f"Reference baseline from {reference_baseline_agent} is missing or failed. Cannot run judge. Falling back to synthesized answer."
         report_progress(progress_callback, "warning", msg, use_console=True)
         judge_decision = "Skipped - No Reference Baseline"
         final_decision_answer = final_synthesized_answer # Use synthesized if no baseline to compare
         transcript_data["judge_result"] = {"decision": judge_decision, "reason": msg}
-    elif final_synthesized_answer.startswith("Error:"):
+    elif isinstance(synthesis_result, Err):
         msg = f"Synthesized answer failed. Cannot run judge. Falling back to reference baseline ({reference_baseline_agent})."
         report_progress(progress_callback, "warning", msg, use_console=True)
         judge_decision = "Skipped - Synthesis Failed"
@@ -292,7 +366,7 @@ async def run_debate_logic(
             judge_decision = "Error"
             judge_raw = msg
             report_progress(progress_callback, "error", judge_raw, use_console=True)
-            logging.error("Error executing judge_quality", exc_info=True)
+            logger.error("Error executing judge_quality", exc_info=True)
             transcript_data["judge_result"] = {"decision": judge_decision, "raw_output": judge_raw}
             # Fallback on judge error - use synthesized or baseline? Let's use synthesized.
             final_decision_answer = final_synthesized_answer 
@@ -310,6 +384,8 @@ async def run_debate_logic(
                 final_decision_answer = final_synthesized_answer # Fallback to synthesized if judge had parsing error
                 report_progress(progress_callback, "final_decision", f"Fallback to Synthesized (Judge: {judge_decision})", use_console=True)
         
+    await append_transcript_phase(output, "judge_result", transcript_data["judge_result"])
+
     # Ensure final_answer field in transcript is set
     transcript_data["final_decision"] = judge_decision # Store the outcome
     transcript_data["final_answer"] = final_decision_answer 
@@ -319,13 +395,13 @@ async def run_debate_logic(
     if output:
         report_progress(progress_callback, "status", f"Saving V4 transcript to {output}", use_console=False)
         try:
-            with open(output, 'w') as f:
-                json.dump(transcript_data, f, indent=4)
+            # Write off the event loop; the transcript can be large for long debates
+            await asyncio.to_thread(_write_transcript, output, transcript_data)
             console.print(f"\n[dim]V4 Transcript saved to {output}[/dim]")
         except Exception as e:
             msg = f"Error saving V4 transcript: {e}"
             report_progress(progress_callback, "error", msg, use_console=True)
-            logging.error(f"Failed to save V4 transcript to {output}", exc_info=True)
+            logger.error("Failed to save V4 transcript to %s", output, exc_info=True)
 
     report_progress(progress_callback, "status", "V4 Debate complete (partial implementation).", use_console=False)
     return final_decision_answer
@@ -340,8 +416,8 @@ def main(
     # --- Setup Logging --- 
     log_level = logging.DEBUG if verbose else logging.INFO
     setup_logger(level=log_level)
-    logging.info("Starting debate application.")
-    logging.debug(f"CLI Args - Question: {question}, Max Rounds: {max_rounds}, Verbose: {verbose}, Output: {output}")
+    logger.info("Starting debate application.")
+    logger.debug("CLI Args - Question: %s, Max Rounds: %s, Verbose: %s, Output: %s", question, max_rounds, verbose, output)
 
     # Prompt for question if not provided
     if not question:
@@ -393,6 +469,7 @@ def main(
         # Fallback for unhandled types (optional)
         # else:
         #     console.print(f"[{update_type.upper()}] {data}")
+    cli_progress_callback.full_payload = True # Printing locally, no need for payload refs
 
     # Define human feedback callback for CLI
     def get_cli_human_feedback():
@@ -417,7 +494,7 @@ def main(
 
     except Exception as e:
         console.print(f"\n[bold red]An unexpected error occurred:[/bold red] {e}")
-        logging.error("Unhandled exception in main execution", exc_info=True)
+        logger.error("Unhandled exception in main execution", exc_info=True)
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -1,11 +1,16 @@
 import asyncio
+import json
+import os
 import re
-from typing import Dict, Tuple
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 import logging
 
-from utils.prompts import JUDGE_PROMPT_TEMPLATE, JUDGE_V4_PROMPT_TEMPLATE
+from utils.prompts import render_judge_prompt, render_judge_v4_prompt, make_judge_renderer
 # Use the default O4 client for judging for now
-from llm_clients.o4_client import query_o4
+from llm_clients.o4_client import query_o4, query_o4_stream
+from utils.prompt_cache import PromptCache, prompt_key
 from rich.console import Console # Use Rich for printing
 
 JudgeRatings = Dict[str, str] # e.g., {"Completeness": "Better", "Correctness": "Equal", ...}
@@ -15,46 +20,135 @@ JudgeDecision = str # e.g., "Accept Merged", "Fallback to Baseline"
 logger = logging.getLogger(__name__)
 # Initialize Rich Console (or import)
 console = Console()
+# Console output from the judge is opt-in; logger.info/debug is the primary channel
+_VERBOSE = os.getenv("JUDGE_VERBOSE", "0") == "1"
+
+# Judge responses cached by prompt hash (opt-in via JUDGE_CACHE=1), so re-runs skip the LLM call
+_judge_cache: Optional[PromptCache] = None
+
+def _get_judge_cache() -> Optional[PromptCache]:
+    """Returns the shared judge cache if JUDGE_CACHE=1, otherwise None."""
+    global _judge_cache
+    if os.getenv("JUDGE_CACHE") != "1":
+        return None
+    if _judge_cache is None:
+        _judge_cache = PromptCache("judge")
+    return _judge_cache
+
+async def _stream_judge(prompt: str, is_complete: Callable[[str], bool]) -> str:
+    """
+    Streams the judge response and stops reading as soon as is_complete(text so far) holds,
+    so the tail of a verbose response isn't waited for. Falls back to query_o4 if streaming fails up front.
+    """
+    chunks = []
+    stream = query_o4_stream(prompt)
+    try:
+        async for chunk in stream:
+            chunks.append(chunk)
+            # Only whole lines can complete a match, so re-check when a line ends
+            if "\n" in chunk and is_complete("".join(chunks)):
+                logger.debug("Judge stream stopped early after %d chunks", len(chunks))
+                break
+    except Exception as e:
+        if chunks:
+            raise
+        logger.warning("Judge streaming unavailable (%s); falling back to a full request", e)
+        return await query_o4(prompt)
+    finally:
+        await stream.aclose()
+    return "".join(chunks)
+
+async def _query_judge(prompt: str, is_complete: Optional[Callable[[str], bool]] = None) -> str:
+    """
+    Queries the judge LLM, going through the prompt cache when enabled.
+    With JUDGE_STREAM=1 and an is_complete check, the response is streamed and cut off once parseable.
+    """
+    cache = _get_judge_cache()
+    if cache is not None:
+        key = prompt_key(prompt)
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info("Judge cache hit (%s)", key)
+            return cached
+    if is_complete is not None and os.getenv("JUDGE_STREAM") == "1":
+        response = await _stream_judge(prompt, is_complete)
+    else:
+        response = await query_o4(prompt)
+    if cache is not None and not response.startswith("Error:"): # Don't pin failures
+        cache.set(key, response)
+    return response
+
+_EXPECTED_DIMENSIONS = frozenset({"Completeness", "Correctness", "Clarity"})
+# Lowercase token -> canonical name, so normalization is a dict lookup
+_DIMENSION_NAMES = {"completeness": "Completeness", "correctness": "Correctness", "clarity": "Clarity"}
+_RATING_NAMES = {"better": "Better", "worse": "Worse", "equal": "Equal"}
+_RATING_NAMES_NO_WORSE = {"better": "Better", "equal": "Equal"}
+
+def _scan_judge_ratings(text: str) -> JudgeRatings:
+    """Collects the dimension ratings present in the judge output (no defaults filled in)."""
+    ratings = {}
+    lowered = text.lower()
+    # Common case is no "Worse" anywhere: then only Better/Equal need to be looked for per line
+    rating_names = _RATING_NAMES if "worse" in lowered else _RATING_NAMES_NO_WORSE
+    # Single pass over lowercased lines, no regex; same lines as the old anchored pattern
+    #   ^(\d+\.)? <dimension>: (rating: [?)? <better|worse|equal>
+    # e.g. "1. Completeness: Rating: [Better]", "clarity: rating: worse", "Correctness: Equal - reason"
+    for raw in lowered.splitlines():
+        line = raw.strip().lstrip("0123456789. ")
+        for key, dim in _DIMENSION_NAMES.items():
+            if line.startswith(key):
+                break
+        else:
+            continue
+        if dim in ratings or line[len(key):len(key) + 1] != ":":
+            continue # Colon must directly follow the dimension name
+        rest = line[len(key) + 1:].lstrip()
+        if rest.startswith("rating:"):
+            rest = rest[len("rating:"):].lstrip()
+            if rest.startswith("["):
+                rest = rest[1:]
+        # The rating word must come first in what's left
+        rating = next((name for word, name in rating_names.items() if rest.startswith(word)), None)
+        if rating:
+            ratings[dim] = rating
+            if len(ratings) == len(_DIMENSION_NAMES):
+                break # All dimensions found
+    return ratings
+
+def _ratings_complete(text: str) -> bool:
+    """True once every dimension has a rating on a finished line (streaming stop condition)."""
+    return len(_scan_judge_ratings(text[:text.rfind("\n") + 1])) == len(_DIMENSION_NAMES)
 
 def _parse_judge_ratings(text: str) -> JudgeRatings:
     """Parses the raw LLM judge output into a dictionary of ratings."""
-    ratings = {}
-    # More flexible regex to handle variations like numbering and rating placement
-    pattern = r"^\s*(?:\d+\.\s*)?(Completeness|Correctness|Clarity):\s*(?:Rating:\s*\[?)?(Better|Worse|Equal)\]?"
-    # Explanation:
-    # ^\s*             -> Start of line, optional whitespace
-    # (?:\d+\.\s*)?    -> Optional numbering (e.g., "1. ")
-    # (Completeness|...) -> Capture dimension name
-    # :\s*             -> Colon and optional whitespace
-    # (?:Rating:\s*\[?)? -> Optional "Rating: [" part
-    # (Better|Worse|Equal) -> Capture the rating
-    # \]?               -> Optional closing bracket
-    
-    matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
-    
-    expected_dimensions = {"Completeness", "Correctness", "Clarity"}
-    found_dimensions = set()
-    
-    for match in matches:
-        dimension, rating = match
-        dimension_normalized = dimension.capitalize()
-        if dimension_normalized in expected_dimensions:
-            ratings[dimension_normalized] = rating.capitalize()
-            found_dimensions.add(dimension_normalized)
+    ratings = _scan_judge_ratings(text)
+    if len(ratings) == len(_DIMENSION_NAMES):
+        return ratings # All dimensions found, nothing to fill in
             
+    found_dimensions = set(ratings)
     # Check if all expected dimensions were found
-    if found_dimensions != expected_dimensions:
-        logger.warning(f"Judge response missing dimensions. Found: {found_dimensions}. Response: {text[:300]}...")
+    if found_dimensions != _EXPECTED_DIMENSIONS:
+        logger.warning("Judge response missing dimensions. Found: %s. Response: %s...", found_dimensions, text[:300])
         # Fill missing with a default or handle error? Let's default to 'Equal' for now
-        for dim in expected_dimensions - found_dimensions:
+        for dim in _EXPECTED_DIMENSIONS - found_dimensions:
             ratings[dim] = "Equal" 
             
     return ratings
 
+def _decide(ratings: JudgeRatings) -> JudgeDecision:
+    """Any 'Worse' falls back to the baseline; unparsed dimensions are an error; otherwise accept."""
+    if any(rating == "Worse" for rating in ratings.values()):
+        return "Fallback to Baseline"
+    if "Error" in ratings.values():
+        return "Error during parsing"
+    return "Accept Merged"
+
 async def judge_quality(
     baseline_answer: str, 
     merged_answer: str, 
-    question: str
+    question: str,
+    verbose: Optional[bool] = None,
+    prompt: Optional[str] = None
 ) -> Tuple[JudgeDecision, JudgeRatings, str]:
     """
     Uses an LLM to compare the baseline and merged answers and decide which is better.
@@ -63,6 +157,8 @@ async def judge_quality(
         baseline_answer: The initial answer from the baseline model.
         merged_answer: The final answer produced after the debate and merge steps.
         question: The original user question.
+        verbose: Print progress to the console. Defaults to the JUDGE_VERBOSE env setting.
+        prompt: Already rendered judge prompt for these inputs (judge_quality_batch renders per question).
 
     Returns:
         A tuple containing:
@@ -72,23 +168,29 @@ async def judge_quality(
     """
     if not baseline_answer or not merged_answer:
         return "Error", {}, "Missing baseline or merged answer for judging."
+    if verbose is None:
+        verbose = _VERBOSE
         
-    prompt = JUDGE_PROMPT_TEMPLATE.format(
-        question=question,
-        baseline_answer=baseline_answer,
-        merged_answer=merged_answer
-    )
-    
-    # --- Added Print Statements ---
-    console.print("\n--- [bold purple]Baseline Factors Sent to Judge[/bold purple] ---")
-    console.print(baseline_answer)
-    console.print("--- End Baseline Factors for Judge ---")
-    console.print("\n--- [bold purple]Debate Factors Sent to Judge[/bold purple] ---")
-    console.print(merged_answer)
-    console.print("--- End Debate Factors for Judge ---")
-    # --- End Added Print Statements ---
-
-    logger.info("Calling Judge Agent...")
+    if prompt is None:
+        prompt = render_judge_prompt(question, baseline_answer, merged_answer)
+    # Start the LLM request now so the local printing below overlaps the network round-trip
+    judge_task = asyncio.create_task(_query_judge(prompt, _ratings_complete))
+    await asyncio.sleep(0) # Let the task send the request before we block on printing
+
+    try:
+        # Echo the (potentially KB-sized) inputs only when debugging
+        if verbose and logger.isEnabledFor(logging.DEBUG):
+            console.print("\n--- [bold purple]Baseline Factors Sent to Judge[/bold purple] ---")
+            console.print(baseline_answer)
+            console.print("--- End Baseline Factors for Judge ---")
+            console.print("\n--- [bold purple]Debate Factors Sent to Judge[/bold purple] ---")
+            console.print(merged_answer)
+            console.print("--- End Debate Factors for Judge ---")
+
+        logger.info("Calling Judge Agent...")
+    except BaseException:
+        judge_task.cancel() # Don't leave the request running with nobody to await it
+        raise
     # logger.debug(f"Judge Prompt:\n{prompt[:500]}...")
 
     raw_judge_response = "Error: Judge LLM query failed."
@@ -96,47 +198,123 @@ async def judge_quality(
     decision: JudgeDecision = "Error"
     
     try:
-        raw_judge_response = await query_o4(prompt)
-        logger.debug(f"Judge Agent Raw Response:\n{raw_judge_response}")
-        # Keep console print for user visibility
-        console.print("[bold white][Judge Agent Raw Response][/bold white]")
-        console.print(raw_judge_response)
+        raw_judge_response = await judge_task
+        logger.debug("Judge Agent Raw Response:\n%s", raw_judge_response)
         
         ratings = _parse_judge_ratings(raw_judge_response)
-        logger.info(f"Judge Agent Parsed Ratings: {ratings}")
-        # Keep console print for user visibility
-        console.print(f"[bold cyan][Judge Agent Parsed Ratings]:[/bold cyan] {ratings}")
+        logger.info("Judge Agent Parsed Ratings: %s", ratings)
+        if verbose:
+            console.print(f"[bold cyan][Judge Agent Parsed Ratings]:[/bold cyan] {ratings}")
 
         # Determine final decision
-        if any(rating == "Worse" for rating in ratings.values()):
-            decision = "Fallback to Baseline"
+        decision = _decide(ratings)
+        if decision == "Fallback to Baseline":
             logger.info("Judge Decision: Fallback to Baseline (found 'Worse' rating)")
-            # Keep console print
-            console.print("[red]Judge Decision: Fallback to Baseline (found 'Worse' rating)[/red]")
-        elif "Error" in ratings.values():
-             decision = "Error during parsing"
-             logger.warning(f"Judge Decision: Error during parsing. Ratings: {ratings}")
-             # Keep console print
-             console.print("[red]Judge Decision: Error during parsing[/red]")
+            if verbose:
+                console.print("[red]Judge Decision: Fallback to Baseline (found 'Worse' rating)[/red]")
+        elif decision == "Error during parsing":
+             logger.warning("Judge Decision: Error during parsing. Ratings: %s", ratings)
+             if verbose:
+                 console.print("[red]Judge Decision: Error during parsing[/red]")
         else:
-            decision = "Accept Merged"
             logger.info("Judge Decision: Accept Merged")
-            # Keep console print
-            console.print("[green]Judge Decision: Accept Merged[/green]")
+            if verbose:
+                console.print("[green]Judge Decision: Accept Merged[/green]")
             
     except Exception as e:
         logger.error("Error during judge query.", exc_info=True)
         raw_judge_response = f"Error: Failed to get judge response. {e}"
         decision = "Error"
-        
-    # --- Added Print Statement ---
-    console.print("\n--- [bold purple]Parsed Judge Ratings[/bold purple] ---")
-    console.print(ratings)
-    console.print("--- End Parsed Judge Ratings ---\n")
-    # --- End Added Print Statement ---
 
     return decision, ratings, raw_judge_response
 
+async def judge_quality_batch(
+    triples: Sequence[Tuple[str, str, str]],
+    concurrency: int = 8
+) -> List[Union[Tuple[JudgeDecision, JudgeRatings, str], BaseException]]:
+    """
+    Runs judge_quality over many (baseline_answer, merged_answer, question) triples concurrently.
+
+    At most `concurrency` judge requests are in flight at once. Results come back in input
+    order; an exception raised for one triple is returned in its slot instead of failing the batch.
+    Callers evaluating a dataset should collect triples and call this once rather than
+    awaiting judge_quality in a loop.
+    """
+    sem = asyncio.Semaphore(concurrency)
+    renderers: Dict[str, Callable[[str, str], str]] = {} # One partially evaluated template per distinct question
+
+    async def _one(triple: Tuple[str, str, str]):
+        baseline_answer, merged_answer, question = triple
+        prompt = None
+        if baseline_answer and merged_answer:
+            if question not in renderers:
+                renderers[question] = make_judge_renderer(question)
+            prompt = renderers[question](baseline_answer, merged_answer)
+        async with sem:
+            # Interleaved console output from concurrent judges is unreadable, so keep them quiet
+            return await judge_quality(baseline_answer, merged_answer, question, verbose=False, prompt=prompt)
+
+    return await asyncio.gather(*(_one(t) for t in triples), return_exceptions=True)
+
+# Integer rating codes, so post-processing a large batch runs over one flat int8 array instead of N dicts
+RATING_CODES = {"Better": 1, "Equal": 0, "Worse": -1, "Error": -2}
+DIMENSION_ORDER = ("Completeness", "Correctness", "Clarity")
+
+def encode_ratings(ratings_list: Iterable[JudgeRatings]) -> array:
+    """Flattens N ratings dicts into an int8 array of N * 3 codes, in DIMENSION_ORDER per judgment."""
+    codes = array("b")
+    for ratings in ratings_list:
+        codes.extend(RATING_CODES.get(ratings.get(dim, "Error"), RATING_CODES["Error"]) for dim in DIMENSION_ORDER)
+    return codes
+
+def accepted_flags(codes: array) -> array:
+    """Per judgment 1 if no dimension is Worse/Error (same rule as judge_quality's Accept Merged), else 0."""
+    width = len(DIMENSION_ORDER)
+    return array("b", (min(codes[i:i + width]) >= 0 for i in range(0, len(codes), width)))
+
+@dataclass
+class JudgeBatchResult:
+    """Struct-of-arrays view of a judge_quality_batch run: one int8 column per dimension plus the decisions."""
+    completeness: array = field(default_factory=lambda: array("b"))
+    correctness: array = field(default_factory=lambda: array("b"))
+    clarity: array = field(default_factory=lambda: array("b"))
+    decisions: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_results(cls, results: Sequence[Union[Tuple[JudgeDecision, JudgeRatings, str], BaseException]]) -> "JudgeBatchResult":
+        """Builds the columns from judge_quality_batch output; exceptions count as Error on every dimension."""
+        batch = cls()
+        error_code = RATING_CODES["Error"]
+        for result in results:
+            if isinstance(result, BaseException):
+                decision, ratings = "Error", {}
+            else:
+                decision, ratings, _ = result
+            batch.completeness.append(RATING_CODES.get(ratings.get("Completeness"), error_code))
+            batch.correctness.append(RATING_CODES.get(ratings.get("Correctness"), error_code))
+            batch.clarity.append(RATING_CODES.get(ratings.get("Clarity"), error_code))
+            batch.decisions.append(decision)
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.decisions)
+
+    def accept_rate(self) -> float:
+        """Fraction of judgments with no Worse/Error rating."""
+        if not self.decisions:
+            return 0.0
+        accepted = sum(min(row) >= 0 for row in zip(self.completeness, self.correctness, self.clarity))
+        return accepted / len(self.decisions)
+
+    def to_json(self) -> str:
+        """Compact checkpoint form: columns as lists of codes."""
+        return json.dumps({
+            "completeness": self.completeness.tolist(),
+            "correctness": self.correctness.tolist(),
+            "clarity": self.clarity.tolist(),
+            "decisions": self.decisions,
+        }, separators=(",", ":"))
+
 # Example (for testing structure)
 # async def main_test():
 #     q = "What is the best language?"
@@ -153,26 +331,53 @@ async def judge_quality(
 
 # --- V4 Judge Logic --- 
 
+# Compiled once at import. Decision and the (following) reasoning line come out of one search;
+# the optional group is greedy so it is tried before giving up on the reasoning.
+# Patterns are lowercase and matched against text.lower(), which avoids the IGNORECASE overhead.
+_V4_RE = re.compile(
+    r"overall decision:\s*\[?(?P<decision>accept|reject)\]?(?:.*?reasoning:\s*(?P<reason>[^\n]+))?",
+    re.DOTALL
+)
+_V4_REASON_RE = re.compile(r"reasoning:\s*(.*)") # When the reasoning isn't after the decision (or there's no decision)
+
+def _v4_complete(text: str) -> bool:
+    """
+    Streaming stop condition: an Accept is final once its line is done; a Reject also waits for
+    a finished Reasoning line, since that justification is what the caller shows.
+    """
+    match = _V4_RE.search(text[:text.rfind("\n") + 1].lower())
+    if not match:
+        return False
+    reason = match.group("reason")
+    return match.group("decision") == "accept" or bool(reason and reason.strip())
+
 def _parse_judge_v4_decision(text: str) -> Tuple[str, str]:
     """Parses the V4 judge output (Accept/Reject and optional reasoning)."""
     decision = "Error"
     reasoning = ""
-    decision_match = re.search(r"Overall Decision:\s*\[?(Accept|Reject)\]?", text, re.IGNORECASE | re.MULTILINE)
-    if decision_match:
-        decision = decision_match.group(1).capitalize()
+    lowered = text.lower()
+    # Spans from the lowered text map back onto the original unless lowercasing changed the
+    # length (a few non-ASCII characters); then the reasoning is returned lowercased.
+    source = text if len(lowered) == len(text) else lowered
+    match = _V4_RE.search(lowered)
+    if match:
+        decision = match.group("decision").capitalize()
+        if match.group("reason") is not None:
+            reasoning = source[match.start("reason"):match.end("reason")].strip()
     else:
-        logger.warning(f"Could not parse V4 Judge decision from: {text[:200]}...")
+        logger.warning("Could not parse V4 Judge decision from: %s...", text[:200])
         decision = "Error: Cannot Parse Decision" # More specific error
-        
-    reasoning_match = re.search(r"Reasoning:\s*(.*)", text, re.IGNORECASE | re.MULTILINE)
-    if reasoning_match:
-        reasoning = reasoning_match.group(1).strip()
+    if not reasoning:
+        reasoning_match = _V4_REASON_RE.search(lowered)
+        if reasoning_match:
+            reasoning = source[reasoning_match.start(1):reasoning_match.end(1)].strip()
         
     return decision, reasoning
 
 async def judge_quality_v4(
     synthesized_answer: str, 
-    question: str
+    question: str,
+    verbose: Optional[bool] = None
 ) -> Tuple[str, str, str]: # Returns: decision, reasoning, raw_response
     """
     Uses an LLM for an intrinsic quality check of the V4 synthesized answer.
@@ -180,6 +385,7 @@ async def judge_quality_v4(
     Args:
         synthesized_answer: The final answer produced by the V4 synthesis step.
         question: The original user question.
+        verbose: Print progress to the console. Defaults to the JUDGE_VERBOSE env setting.
 
     Returns:
         A tuple containing:
@@ -189,13 +395,18 @@ async def judge_quality_v4(
     """
     if not synthesized_answer:
         return "Error: Missing Answer", "", "Synthesized answer was empty."
+    if verbose is None:
+        verbose = _VERBOSE
         
-    prompt = JUDGE_V4_PROMPT_TEMPLATE.format(
-        question=question,
-        synthesized_answer=synthesized_answer
-    )
-    
-    logger.info("Calling V4 Judge Agent...")
+    prompt = render_judge_v4_prompt(question, synthesized_answer)
+    judge_task = asyncio.create_task(_query_judge(prompt, _v4_complete)) # In flight while we log
+    await asyncio.sleep(0) # Let the task send the request before we log
+
+    try:
+        logger.info("Calling V4 Judge Agent...")
+    except BaseException:
+        judge_task.cancel() # Don't leave the request running with nobody to await it
+        raise
     # logger.debug(f"V4 Judge Prompt:\n{prompt[:500]}...")
 
     raw_judge_response = "Error: Judge LLM query failed."
@@ -204,16 +415,18 @@ async def judge_quality_v4(
     
     try:
         # Assuming O4 is suitable for judging V4 as well
-        raw_judge_response = await query_o4(prompt)
-        logger.debug(f"V4 Judge Agent Raw Response:\n{raw_judge_response}")
-        console.print("[bold white][V4 Judge Agent Raw Response][/bold white]")
-        console.print(raw_judge_response)
+        raw_judge_response = await judge_task
+        logger.debug("V4 Judge Agent Raw Response:\n%s", raw_judge_response)
+        if verbose:
+            console.print("[bold white][V4 Judge Agent Raw Response][/bold white]")
+            console.print(raw_judge_response)
         
         decision, reasoning = _parse_judge_v4_decision(raw_judge_response)
-        logger.info(f"V4 Judge Parsed Decision: {decision}, Reasoning: {reasoning}")
-        console.print(f"[bold cyan][V4 Judge Parsed Decision]:[/bold cyan] {decision}")
-        if reasoning:
-             console.print(f"[bold cyan][V4 Judge Reasoning]:[/bold cyan] {reasoning}")
+        logger.info("V4 Judge Parsed Decision: %s, Reasoning: %s", decision, reasoning)
+        if verbose:
+            console.print(f"[bold cyan][V4 Judge Parsed Decision]:[/bold cyan] {decision}")
+            if reasoning:
+                 console.print(f"[bold cyan][V4 Judge Reasoning]:[/bold cyan] {reasoning}")
             
     except Exception as e:
         logger.error("Error during V4 judge query.", exc_info=True)
@@ -223,6 +436,94 @@ async def judge_quality_v4(
 
     return decision, reasoning, raw_judge_response
 
+async def judge_quality_v4_batch(
+    pairs: Sequence[Tuple[str, str]],
+    concurrency: int = 8
+) -> List[Union[Tuple[str, str, str], BaseException]]:
+    """Runs judge_quality_v4 over (synthesized_answer, question) pairs; same contract as judge_quality_batch."""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _one(pair: Tuple[str, str]):
+        async with sem:
+            return await judge_quality_v4(*pair, verbose=False)
+
+    return await asyncio.gather(*(_one(p) for p in pairs), return_exceptions=True)
+
+# --- Offline judging via the OpenAI Batch API ---
+# Judge runs only gate experiment reports, so they can trade the 24h batch turnaround for
+# half-price requests that don't count against the synchronous rate limits.
+
+BatchJudgeItem = Tuple[str, str, str, str] # (custom_id, baseline_answer, merged_answer, question)
+
+def build_judge_batch_jsonl(items: Iterable[BatchJudgeItem], llm: Any) -> bytes:
+    """
+    One Batch API request line per item, rendering the same judge prompt judge_quality sends.
+    `llm` is the LLMInterface whose model (and model-specific parameter rules) the batch targets.
+    """
+    renderers: Dict[str, Callable[[str, str], str]] = {}
+    lines = []
+    for custom_id, baseline_answer, merged_answer, question in items:
+        if question not in renderers:
+            renderers[question] = make_judge_renderer(question)
+        prompt = renderers[question](baseline_answer, merged_answer)
+        lines.append(json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": llm._chat_params(llm._prompt_messages(prompt)),
+        }))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+def parse_judge_batch_output(jsonl: str) -> Dict[str, Tuple[JudgeDecision, JudgeRatings, str]]:
+    """Maps custom_id -> (decision, ratings, raw response) for a Batch API output (or error) file."""
+    results = {}
+    for line in jsonl.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            error = record.get("error") or response.get("body")
+            results[record["custom_id"]] = ("Error", {}, f"Error: Batch judge request failed. {error}")
+            continue
+        raw = response["body"]["choices"][0]["message"]["content"] or ""
+        ratings = _parse_judge_ratings(raw)
+        results[record["custom_id"]] = (_decide(ratings), ratings, raw)
+    return results
+
+async def judge_quality_openai_batch(
+    items: Sequence[BatchJudgeItem],
+    poll_interval: float = 60.0
+) -> Dict[str, Tuple[JudgeDecision, JudgeRatings, str]]:
+    """
+    Judges items through the OpenAI Batch API (24h completion window) and waits for the result.
+    Returns custom_id -> (decision, ratings, raw response); items the batch didn't answer get an "Error" entry.
+    """
+    from llm_clients.o4_client import _get_client
+    llm = _get_client()
+    client = llm.client # Underlying OpenAI SDK client
+    payload = build_judge_batch_jsonl(items, llm)
+
+    batch_file = await asyncio.to_thread(client.files.create, file=("judge_batch.jsonl", payload), purpose="batch")
+    batch = await asyncio.to_thread(
+        client.batches.create,
+        input_file_id=batch_file.id, endpoint="/v1/chat/completions", completion_window="24h"
+    )
+    logger.info("Submitted judge batch %s (%d requests)", batch.id, len(items))
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        await asyncio.sleep(poll_interval)
+        batch = await asyncio.to_thread(client.batches.retrieve, batch.id)
+        logger.debug("Judge batch %s status: %s", batch.id, batch.status)
+
+    results: Dict[str, Tuple[JudgeDecision, JudgeRatings, str]] = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if file_id:
+            content = await asyncio.to_thread(client.files.content, file_id)
+            results.update(parse_judge_batch_output(content.text))
+    for custom_id, *_ in items:
+        results.setdefault(custom_id, ("Error", {}, f"Error: Judge batch {batch.id} ended with status '{batch.status}' without a result."))
+    return results
+
 # Example (for testing structure)
 # async def main_test():
 #     q = "What is the best language?"
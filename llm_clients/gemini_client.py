@@ -1,10 +1,14 @@
 import os
 import asyncio
+import concurrent.futures
+import functools
 import google.generativeai as genai
-from dotenv import load_dotenv
+from utils.env import ensure_env
+from utils.prompt_cache import PromptCache, prompt_key
+from utils.rate_limit import limiter_from_env
 
 # Load environment variables
-load_dotenv()
+ensure_env()
 
 # Configure the Gemini client from environment variables
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -19,36 +23,60 @@ else:
     # Initialize the specific model
     genai_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
 
-async def query_gemini(prompt: str, temperature: float = 0.7, max_tokens: int = 2000) -> str:
+# Dedicated pool for the blocking SDK calls so Gemini requests don't compete with
+# (or get capped by) everything else on the default to_thread executor
+_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_CONCURRENCY", "32")), thread_name_prefix="gemini"
+)
+
+# Optional request-rate cap (LLM_QPM requests/minute) shared by every Gemini fan-out
+_rate_limiter = limiter_from_env("LLM_QPM")
+
+# In-process (prompt, temperature) -> response cache, opt-in via LLM_CACHE=1
+_cache = PromptCache("gemini", cache_dir=None, memory_size=2048)
+
+@functools.lru_cache(maxsize=16)
+def _gen_config(temperature: float, max_tokens: int, json_mode: bool = False):
+    """Builds (once per setting) the generation config; the config is never mutated, so it is shared."""
+    return genai.types.GenerationConfig(
+        temperature=temperature,
+        # max_output_tokens=max_tokens # Uncomment if API supports this directly
+        response_mime_type="application/json" if json_mode else None,
+    )
+
+async def query_gemini(prompt: str, temperature: float = 0.7, max_tokens: int = 2000, json_mode: bool = False) -> str:
     """
     Query the configured Gemini model directly using the google-generativeai SDK.
     Reads API key and model name from .env variables.
-    Returns the raw text response.
+    Returns the raw text response (json_mode=True makes the model return bare JSON).
     """
     if not genai_model:
         return "Error: Gemini client not configured. Check GEMINI_API_KEY in .env."
 
+    cache_key = None
+    if os.getenv("LLM_CACHE") == "1":
+        cache_key = prompt_key(f"{temperature}\x00{json_mode}\x00{prompt}")
+        cached = _cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    if _rate_limiter is not None:
+        await _rate_limiter.acquire()
+
     try:
-        # Use run_async for non-blocking call if available, otherwise wrap sync call
-        # Note: google-generativeai SDK might have different async patterns.
-        # This example uses generate_content which might be synchronous.
-        # We wrap it in to_thread for safety in an async context.
-        
-        # Define generation config
-        generation_config = genai.types.GenerationConfig(
-            temperature=temperature,
-            # max_output_tokens=max_tokens # Uncomment if API supports this directly
-        )
-        
-        # Wrap the synchronous call in asyncio.to_thread
-        response = await asyncio.to_thread(
-            genai_model.generate_content, 
-            prompt,
-            generation_config=generation_config
+        # generate_content is synchronous; run it on the client's own thread pool.
+        # The GenerativeModel itself is shared across those threads (it keeps no per-request state).
+        generation_config = _gen_config(temperature, max_tokens, json_mode)
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            _executor,
+            functools.partial(genai_model.generate_content, prompt, generation_config=generation_config)
         )
         
         # Check for response content; structure may vary based on model/version
         if response and hasattr(response, 'text'):
+            if cache_key:
+                _cache.set(cache_key, response.text)
             return response.text
         else:
             # Log or handle cases where response might be empty or structured differently
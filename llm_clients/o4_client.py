@@ -1,15 +1,104 @@
 import os
 import asyncio
+import concurrent.futures
+import functools
+import json
+import threading
+from typing import Any, AsyncIterator, Dict, Optional
 from llm_interface import LLMInterface
+from utils.prompt_cache import PromptCache, prompt_key
+from utils.rate_limit import limiter_from_env
 
-# Initialize LLMInterface for O4-mini (default from env or fallback)
+# LLMInterface for O4-mini (default from env or fallback), created on first use rather than at
+# import so importing this module (e.g. via the judge) can't fail on config/proxy problems
 DEFAULT_MODEL = os.getenv("DEFAULT_LLM_MODEL", "gpt-o4-mini")
-llm_o4 = LLMInterface(model_key=DEFAULT_MODEL)
+_llm_o4: Optional[LLMInterface] = None
+_client_lock = threading.Lock()
 
-async def query_o4(prompt: str) -> str:
+def _get_client() -> LLMInterface:
+    """Returns the shared O4 LLMInterface, constructing it once (thread-safe)."""
+    global _llm_o4
+    if _llm_o4 is None:
+        with _client_lock:
+            if _llm_o4 is None:
+                _llm_o4 = LLMInterface(model_key=DEFAULT_MODEL)
+    return _llm_o4
+
+# LLM I/O gets its own pool (threads mostly sit blocked on the network), sized for the target
+# number of in-flight requests rather than sharing the default executor's min(32, cpu + 4) workers
+_LLM_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_CONCURRENCY", "32")), thread_name_prefix="o4"
+)
+
+# Optional request-rate cap (LLM_QPM requests/minute) shared by every O4 fan-out
+_rate_limiter = limiter_from_env("LLM_QPM")
+
+# In-process prompt -> response cache, opt-in via LLM_CACHE=1 (repeat probes/evals skip the API)
+_cache = PromptCache("o4", cache_dir=None, memory_size=2048)
+
+async def query_o4(prompt: str, response_format: Optional[Dict[str, Any]] = None) -> str:
     """
     Query the O4-mini model for a given prompt and return the raw text response.
+    response_format (e.g. utils.prompts.FACTOR_LIST_RESPONSE_FORMAT) asks the API for structured output.
     """
-    # Run blocking generate_response in thread pool
-    response = await asyncio.to_thread(llm_o4.generate_response, prompt)
-    return response 
\ No newline at end of file
+    use_cache = os.getenv("LLM_CACHE") == "1"
+    if use_cache:
+        key = prompt_key(prompt if response_format is None else f"{json.dumps(response_format, sort_keys=True)}\x00{prompt}")
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
+    client = _get_client()
+    if _rate_limiter is not None:
+        await _rate_limiter.acquire()
+    call = client.generate_response
+    if response_format is not None:
+        call = functools.partial(client.generate_response, response_format=response_format)
+    # Run blocking generate_response on the LLM thread pool
+    response = await asyncio.get_running_loop().run_in_executor(_LLM_EXECUTOR, call, prompt)
+    if use_cache and not response.startswith("Error:"):
+        _cache.set(key, response)
+    return response
+
+_STREAM_END = object()
+
+async def query_o4_stream(prompt: str) -> AsyncIterator[str]:
+    """
+    Stream the O4-mini response as text chunks.
+    Closing the iterator early (break / aclose) stops reading the HTTP stream.
+    """
+    client = _get_client()
+    if _rate_limiter is not None:
+        await _rate_limiter.acquire()
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def _put(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            pass # Loop already closed; consumer is gone
+
+    def _produce():
+        # Blocking iteration over the SDK stream runs in a worker thread
+        try:
+            for chunk in client.stream_response(prompt):
+                if stop.is_set():
+                    break # Leaving the loop closes the stream
+                _put(chunk)
+        except Exception as e:
+            _put(e)
+        finally:
+            _put(_STREAM_END)
+
+    loop.run_in_executor(_LLM_EXECUTOR, _produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _STREAM_END:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
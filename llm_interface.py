@@ -1,9 +1,11 @@
+import asyncio
+import logging
 import os
 import sys
 import json
-from typing import Dict, List, Optional, Any, Union
-from openai import OpenAI
-from dotenv import load_dotenv  # Import load_dotenv
+from typing import Dict, Iterator, List, Optional, Any, Union
+from openai import AsyncOpenAI, OpenAI
+from utils.env import ensure_env
 
 # Add the project root to the Python path if needed
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -15,7 +17,9 @@ if project_root not in sys.path:
 from model_manager import ModelManager
 
 # Load environment variables from .env file
-load_dotenv()
+ensure_env()
+
+logger = logging.getLogger(__name__)
 
 class LLMInterface:
     """
@@ -127,7 +131,8 @@ class LLMInterface:
             raise ValueError(f"Provider '{provider}' not supported by LLMInterface.")
 
     def generate_response(self, prompt: str, system_prompt: Optional[str] = None, 
-                         temperature: float = 0.7, max_tokens: Optional[int] = None) -> str:
+                         temperature: float = 0.7, max_tokens: Optional[int] = None,
+                         response_format: Optional[Dict[str, Any]] = None) -> str:
         """
         Generate a response from the LLM using a simple prompt.
         
@@ -140,10 +145,58 @@ class LLMInterface:
             temperature: Controls randomness (0.0 = deterministic, 1.0 = creative)
                          Note: Some models only support the default temperature of 1.0
             max_tokens: Maximum number of tokens to generate
+            response_format: Optional chat.completions response_format (e.g. a json_schema)
             
         Returns:
             The model's response as a string
         """
+        messages = self._prompt_messages(prompt, system_prompt)
+        return self.generate_chat_response(messages, temperature, max_tokens, response_format)
+
+    async def agenerate_response(self, prompt: str, system_prompt: Optional[str] = None,
+                                 temperature: float = 0.7, max_tokens: Optional[int] = None,
+                                 response_format: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Async version of generate_response (same arguments).
+        
+        OpenAI models are called through the SDK's native async client, so many concurrent
+        calls share the event loop instead of each occupying a worker thread. The client is
+        opened per call and closed on exit, so its connection pool never outlives the loop.
+        Other providers run generate_response in a thread.
+        """
+        if self.provider != "openai":
+            return await asyncio.to_thread(self.generate_response, prompt, system_prompt, temperature, max_tokens, response_format)
+        params = self._chat_params(self._prompt_messages(prompt, system_prompt), temperature, max_tokens, response_format)
+        logger.debug("Sending async request to OpenAI model %s...", self.model_name)
+        try:
+            async with AsyncOpenAI(api_key=self.client.api_key) as async_client:
+                response = await async_client.chat.completions.create(**params)
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            raise
+
+    def stream_response(self, prompt: str, system_prompt: Optional[str] = None,
+                        temperature: float = 0.7, max_tokens: Optional[int] = None) -> Iterator[str]:
+        """
+        Stream a response from the LLM as text chunks (same arguments as generate_response).
+        
+        Closing the iterator early (e.g. breaking out of the loop) closes the underlying
+        HTTP stream, so the rest of the completion is not downloaded.
+        """
+        params = self._chat_params(self._prompt_messages(prompt, system_prompt), temperature, max_tokens)
+        params["stream"] = True
+        print(f"Streaming request to model {self.model_name}...")
+        stream = self.client.chat.completions.create(**params)
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+
+    def _prompt_messages(self, prompt: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+        """Builds the message list for a single prompt (+ optional system prompt)."""
         messages = []
         
         if system_prompt:
@@ -154,12 +207,12 @@ class LLMInterface:
                 prompt = f"[System instruction: {system_prompt}]\n\n{prompt}"
         
         messages.append({"role": "user", "content": prompt})
-        
-        return self.generate_chat_response(messages, temperature, max_tokens)
+        return messages
     
     def generate_chat_response(self, messages: List[Dict[str, str]], 
                               temperature: float = 0.7, 
-                              max_tokens: Optional[int] = None) -> str:
+                              max_tokens: Optional[int] = None,
+                              response_format: Optional[Dict[str, Any]] = None) -> str:
         """
         Generate a response from the LLM using a conversation history.
         
@@ -172,45 +225,13 @@ class LLMInterface:
             temperature: Controls randomness (0.0 = deterministic, 1.0 = creative)
                          Note: Some models only support the default temperature of 1.0
             max_tokens: Maximum number of tokens to generate
+            response_format: Optional chat.completions response_format (e.g. a json_schema)
             
         Returns:
             The model's response as a string
         """
         try:
-            # For models without system role support, convert system messages to user messages
-            if not self.supports_system_role:
-                converted_messages = []
-                system_instructions = []
-                
-                for msg in messages:
-                    if msg["role"] == "system":
-                        system_instructions.append(msg["content"])
-                    else:
-                        converted_messages.append(msg)
-                
-                # If there were system messages, prepend them to the first user message
-                if system_instructions and converted_messages:
-                    for i, msg in enumerate(converted_messages):
-                        if msg["role"] == "user":
-                            system_text = "\n\n".join(system_instructions)
-                            converted_messages[i]["content"] = f"[System instructions: {system_text}]\n\n{msg['content']}"
-                            break
-                
-                messages = converted_messages
-            
-            # Prepare the request parameters
-            params: Dict[str, Any] = {
-                "model": self.model_name,
-                "messages": messages
-            }
-            
-            # Add temperature only for models that support it
-            if not self.has_fixed_temperature:
-                params["temperature"] = temperature
-            
-            # Add max_tokens if specified
-            if max_tokens is not None:
-                params["max_tokens"] = max_tokens
+            params = self._chat_params(messages, temperature, max_tokens, response_format)
             
             # Dispatch request based on provider set at init
             provider = getattr(self, 'provider', self.current_model_config.get("provider"))
@@ -228,6 +249,54 @@ class LLMInterface:
             print(f"Error generating response: {e}")
             raise
 
+    def _chat_params(self, messages: List[Dict[str, str]],
+                     temperature: float = 0.7,
+                     max_tokens: Optional[int] = None,
+                     response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Builds chat.completions.create parameters, adapting messages and parameters to model limitations.
+        """
+        # For models without system role support, convert system messages to user messages
+        if not self.supports_system_role:
+            converted_messages = []
+            system_instructions = []
+            
+            for msg in messages:
+                if msg["role"] == "system":
+                    system_instructions.append(msg["content"])
+                else:
+                    converted_messages.append(msg)
+            
+            # If there were system messages, prepend them to the first user message
+            if system_instructions and converted_messages:
+                for i, msg in enumerate(converted_messages):
+                    if msg["role"] == "user":
+                        system_text = "\n\n".join(system_instructions)
+                        converted_messages[i]["content"] = f"[System instructions: {system_text}]\n\n{msg['content']}"
+                        break
+            
+            messages = converted_messages
+        
+        # Prepare the request parameters
+        params: Dict[str, Any] = {
+            "model": self.model_name,
+            "messages": messages
+        }
+        
+        # Add temperature only for models that support it
+        if not self.has_fixed_temperature:
+            params["temperature"] = temperature
+        
+        # Add max_tokens if specified
+        if max_tokens is not None:
+            params["max_tokens"] = max_tokens
+
+        # Structured output (JSON mode / json_schema) if requested
+        if response_format is not None:
+            params["response_format"] = response_format
+        
+        return params
+
     def close(self):
         """
         Clean up resources when done with the interface.
@@ -8,8 +8,9 @@ This script verifies that the LLMInterface correctly:
 """
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
-from dotenv import load_dotenv
+from utils.env import ensure_env
 
 # Ensure the project root is in the path
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -20,7 +21,7 @@ if script_dir not in sys.path:
 from llm_interface import LLMInterface
 
 # Load environment variables from .env file
-load_dotenv()
+ensure_env()
 
 def test_basic_functionality():
     """Test the basic functionality of the LLMInterface."""
@@ -34,10 +35,23 @@ def test_basic_functionality():
         llm = LLMInterface()
         print(f"✅ Successfully initialized using default model: {llm.current_model_key}")
 
-        # Test sending a simple prompt
-        print("\nSending test prompt...")
+        # Both probes are independent network round-trips, so send them concurrently
+        # (this also exercises sharing one LLMInterface across threads)
+        print("\nSending test prompt and chat completion concurrently...")
         test_prompt = "Respond with 'Success' if you can read this message."
-        response = llm.generate_response(prompt=test_prompt, temperature=0.3)
+        chat_messages = [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": "What is 2+2?"},
+            {"role": "assistant", "content": "4"},
+            {"role": "user", "content": "Multiply that by 3."}
+        ]
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            response_future = pool.submit(llm.generate_response, prompt=test_prompt, temperature=0.3)
+            chat_future = pool.submit(llm.generate_chat_response, messages=chat_messages, temperature=0.3)
+            response = response_future.result()
+            chat_response = chat_future.result()
+
+        # Test sending a simple prompt
         print("\nResponse received:")
         print(f"'{response}'")
         if "success" in response.lower():
@@ -48,14 +62,6 @@ def test_basic_functionality():
             return False
 
         # Test chat completion functionality
-        print("\nTesting chat completion functionality...")
-        chat_messages = [
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": "What is 2+2?"},
-            {"role": "assistant", "content": "4"},
-            {"role": "user", "content": "Multiply that by 3."}
-        ]
-        chat_response = llm.generate_chat_response(messages=chat_messages, temperature=0.3)
         print("\nChat response received:")
         print(f"'{chat_response}'")
         if chat_response:
@@ -0,0 +1,22 @@
+"""Small helpers for asserting on Mock call lists without repeated linear scans."""
+
+from typing import Any, FrozenSet, Tuple
+
+
+def _freeze(value: Any) -> Any:
+    """Turn dicts/lists (e.g. progress payloads) into hashable equivalents."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def call_key(*args, **kwargs) -> Tuple[Any, Any]:
+    """Build the lookup key for one expected call, like unittest.mock.call(...)."""
+    return _freeze(args), _freeze(kwargs)
+
+
+def as_call_set(mock) -> FrozenSet[Tuple[Any, Any]]:
+    """Every call the mock received, as a set of call_key()s for O(1) membership checks."""
+    return frozenset(call_key(*c.args, **c.kwargs) for c in mock.call_args_list)
@@ -0,0 +1,63 @@
+import concurrent.futures
+import pathlib
+import sys
+
+import pytest
+
+# Make the project root importable ('core', 'utils', 'debate', ...) once for the whole test session,
+# instead of every test module patching sys.path itself
+ROOT = str(pathlib.Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Don't let collection walk bytecode caches
+collect_ignore_glob = ["**/__pycache__/**"]
+
+
+# Modules under test that print through a module-level Rich console
+_CONSOLE_MODULES = (
+    "core.debate_engine", "core.debate_engine_v4", "core.merge_logic",
+    "core.summarizer", "core.synthesizer", "judge.judge_agent", "utils.progress",
+)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _quiet_consoles():
+    """Silence the Rich consoles of already-imported modules for the whole session.
+
+    Tests that assert on output replace the module's `console` themselves, which still works.
+    """
+    quieted = []
+    for name in _CONSOLE_MODULES:
+        console = getattr(sys.modules.get(name), "console", None)
+        if console is not None and not console.quiet:
+            console.quiet = True
+            quieted.append(console)
+    yield
+    for console in quieted:
+        console.quiet = False
+
+
+class _InlineExecutor(concurrent.futures.Executor):
+    """Runs submitted calls immediately on the calling thread."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+@pytest.fixture
+def inline_llm_executors(monkeypatch):
+    """Make the o4/gemini clients run their (mocked) blocking calls in-loop instead of on a worker thread.
+
+    Don't use with query_o4_stream: its producer blocks on a queue the event loop drains.
+    """
+    from llm_clients import gemini_client, o4_client
+    executor = _InlineExecutor()
+    monkeypatch.setattr(o4_client, "_LLM_EXECUTOR", executor)
+    monkeypatch.setattr(gemini_client, "_executor", executor)
+    return executor
@@ -4,15 +4,11 @@ import sys
 import os
 from unittest.mock import patch, MagicMock, AsyncMock, call
 from typing import List, Dict, Optional
+from dataclasses import dataclass
 import json
 
-# Add project root to sys.path to allow importing 'core' and 'utils'
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
-
 # Modules to test
-from core.debate_engine import run_debate_rounds, _check_convergence, _parse_factor_list
+from core.debate_engine import run_debate_rounds, _check_convergence, _format_factors_for_prompt, _parse_factor_list
 from utils.models import Factor, AgentResponse
 
 # Mock agent responses for different scenarios
@@ -28,6 +24,15 @@ AGENT_2_R2_FACTORS_CONV = [Factor(name="A", justification="J_A2", confidence=4.8
 AGENT_1_R2_FACTORS_DIFF = [Factor(name="A", justification="J_A_revised", confidence=5), Factor(name="D", justification="J_D", confidence=4)] # Changed factors
 AGENT_2_R2_FACTORS_DIFF = [Factor(name="A", justification="J_A2", confidence=5), Factor(name="C", justification="J_C_new", confidence=1)] # Changed justification/confidence
 
+# Lightweight stand-in for feedback callbacks: only the call count is asserted, so no MagicMock needed
+class _Counter:
+    def __init__(self, ret=""):
+        self.ret, self.call_count = ret, 0
+
+    def __call__(self, *args, **kwargs):
+        self.call_count += 1
+        return self.ret
+
 # Helper to create mock raw text responses that _parse_factor_list can handle
 def _create_mock_response_text(factors: List[Factor]) -> str:
     lines = []
@@ -69,29 +74,60 @@ def test_convergence_check_stable_multi_agent():
 
 # --- Test run_debate_rounds --- 
 
+@dataclass
+class PatchedClients:
+    o4: AsyncMock
+    gemini: AsyncMock
+    parse: MagicMock
+
+@pytest.fixture(scope="module")
+def _module_patched_clients():
+    """ Patches both LLM clients and the factor parser once for the whole module. """
+    with patch('llm_clients.o4_client.query_o4', new_callable=AsyncMock) as o4, \
+         patch('llm_clients.gemini_client.query_gemini', new_callable=AsyncMock) as gemini, \
+         patch('core.debate_engine._parse_factor_list') as parse: # Mock parsing to control factors directly
+        yield PatchedClients(o4=o4, gemini=gemini, parse=parse)
+
+@pytest.fixture
+def patched_clients(_module_patched_clients):
+    """ Per test: hands out the shared mocks, then clears their calls/side effects. """
+    try:
+        yield _module_patched_clients
+    finally:
+        for mock in (_module_patched_clients.o4, _module_patched_clients.gemini, _module_patched_clients.parse):
+            mock.reset_mock(return_value=True, side_effect=True)
+
+# Fresh raw-response iterators per test (an exhausted iterator can't be reused)
+@pytest.fixture
+def o4_responses():
+    return iter(("O4_R1_RAW", "O4_R2_RAW"))
+
+@pytest.fixture
+def gemini_responses():
+    return iter(("G_R1_RAW", "G_R2_RAW"))
+
 @pytest.mark.asyncio
-@patch('llm_clients.o4_client.query_o4', new_callable=AsyncMock)
-@patch('llm_clients.gemini_client.query_gemini', new_callable=AsyncMock)
-@patch('core.debate_engine._parse_factor_list') # Mock parsing to control factors directly
-async def test_run_debate_rounds_max_rounds_reached(mock_parse, mock_query_gemini_patched, mock_query_o4_patched):
+async def test_run_debate_rounds_max_rounds_reached(patched_clients, o4_responses, gemini_responses):
     """ Test debate runs for max_rounds when no convergence happens. """
+    mock_parse, mock_query_gemini_patched, mock_query_o4_patched = patched_clients.parse, patched_clients.gemini, patched_clients.o4
     max_rounds = 2
     # Mock responses for 2 rounds (agent 1 changes, agent 2 doesn't)
-    mock_query_o4_patched.side_effect = ["O4_R1_RAW", "O4_R2_RAW"] 
-    mock_query_gemini_patched.side_effect = ["G_R1_RAW", "G_R2_RAW"]
+    mock_query_o4_patched.side_effect = o4_responses
+    mock_query_gemini_patched.side_effect = gemini_responses
     # Mock parsing results
-    mock_parse.side_effect = [AGENT_1_R1_FACTORS, AGENT_2_R1_FACTORS, AGENT_1_R2_FACTORS_DIFF, AGENT_2_R1_FACTORS] 
+    mock_parse.side_effect = iter((AGENT_1_R1_FACTORS, AGENT_2_R1_FACTORS, AGENT_1_R2_FACTORS_DIFF, AGENT_2_R1_FACTORS))
 
     initial_responses = {
         "O4-mini": AgentResponse(agent_name="O4-mini", factors=[], raw_response="Initial O4"),
         "Gemini-2.5": AgentResponse(agent_name="Gemini-2.5", factors=[], raw_response="Initial Gemini")
     }
-    mock_feedback_callback = MagicMock(return_value="") # No feedback
+    mock_feedback_callback = _Counter("") # No feedback
 
     history = await run_debate_rounds(
         initial_responses=initial_responses, 
         question="Test Question Max Rounds", # Pass a string question
         max_rounds=max_rounds, 
+        progress_callback=None,
         human_feedback_callback=mock_feedback_callback
     )
 
@@ -104,27 +140,26 @@ async def test_run_debate_rounds_max_rounds_reached(mock_parse, mock_query_gemin
     # mock_secho.assert_any_call(f"\n--- Debate completed after {max_rounds} rounds --- \n", fg='green')
 
 @pytest.mark.asyncio
-@patch('llm_clients.o4_client.query_o4', new_callable=AsyncMock)
-@patch('llm_clients.gemini_client.query_gemini', new_callable=AsyncMock)
-@patch('core.debate_engine._parse_factor_list')
-async def test_run_debate_rounds_convergence(mock_parse, mock_query_gemini_patched, mock_query_o4_patched):
+async def test_run_debate_rounds_convergence(patched_clients, o4_responses, gemini_responses):
     """ Test debate stops early due to convergence. """
+    mock_parse, mock_query_gemini_patched, mock_query_o4_patched = patched_clients.parse, patched_clients.gemini, patched_clients.o4
     max_rounds = 3
     # R1 -> R2: No change. Convergence should happen after R2.
-    mock_query_o4_patched.side_effect = ["O4_R1_RAW", "O4_R2_RAW"] 
-    mock_query_gemini_patched.side_effect = ["G_R1_RAW", "G_R2_RAW"]
-    mock_parse.side_effect = [AGENT_1_R1_FACTORS, AGENT_2_R1_FACTORS, AGENT_1_R2_FACTORS_CONV, AGENT_2_R2_FACTORS_CONV]
+    mock_query_o4_patched.side_effect = o4_responses
+    mock_query_gemini_patched.side_effect = gemini_responses
+    mock_parse.side_effect = iter((AGENT_1_R1_FACTORS, AGENT_2_R1_FACTORS, AGENT_1_R2_FACTORS_CONV, AGENT_2_R2_FACTORS_CONV))
 
     initial_responses = {
         "O4-mini": AgentResponse(agent_name="O4-mini", factors=[]),
         "Gemini-2.5": AgentResponse(agent_name="Gemini-2.5", factors=[])
     }
-    mock_feedback_callback = MagicMock(return_value="")
+    mock_feedback_callback = _Counter("")
 
     history = await run_debate_rounds(
         initial_responses=initial_responses, 
         question="Test Question Convergence", # Pass a string question
         max_rounds=max_rounds, 
+        progress_callback=None,
         human_feedback_callback=mock_feedback_callback
     )
 
@@ -137,51 +172,52 @@ async def test_run_debate_rounds_convergence(mock_parse, mock_query_gemini_patch
     # mock_secho.assert_any_call("\n--- Debate completed after 2 rounds --- \n", fg='green') # Completed after round 2
 
 @pytest.mark.asyncio
-@patch('llm_clients.o4_client.query_o4', new_callable=AsyncMock)
-@patch('llm_clients.gemini_client.query_gemini', new_callable=AsyncMock)
-@patch('core.debate_engine.CRITIQUE_PROMPT_TEMPLATE') # Patch the template string itself
-@patch('core.debate_engine._parse_factor_list')
-async def test_run_debate_rounds_human_feedback(mock_parse, mock_template, mock_query_gemini_patched, mock_query_o4_patched):
+@patch('core.debate_engine.render_critique_prompt') # Patch the compiled critique renderer
+async def test_run_debate_rounds_human_feedback(mock_render, patched_clients, o4_responses, gemini_responses):
     """ Test that human feedback is collected and included in the prompt. """
+    mock_parse, mock_query_gemini_patched, mock_query_o4_patched = patched_clients.parse, patched_clients.gemini, patched_clients.o4
     max_rounds = 2
     human_input = "Consider factor Z."
     # Mock responses for 2 rounds
-    mock_query_o4_patched.side_effect = ["O4_R1_RAW", "O4_R2_RAW"]
-    mock_query_gemini_patched.side_effect = ["G_R1_RAW", "G_R2_RAW"]
-    mock_parse.side_effect = [AGENT_1_R1_FACTORS, AGENT_2_R1_FACTORS, AGENT_1_R2_FACTORS_DIFF, AGENT_2_R1_FACTORS]
-    # Mock the template format method to capture args
-    mock_template.format = MagicMock()
+    mock_query_o4_patched.side_effect = o4_responses
+    mock_query_gemini_patched.side_effect = gemini_responses
+    mock_parse.side_effect = iter((AGENT_1_R1_FACTORS, AGENT_2_R1_FACTORS, AGENT_1_R2_FACTORS_DIFF, AGENT_2_R1_FACTORS))
+    # The mocked renderer captures the prompt fields
+    mock_render.return_value = "CRITIQUE PROMPT"
 
     initial_responses = {
         "O4-mini": AgentResponse(agent_name="O4-mini", factors=[]),
         "Gemini-2.5": AgentResponse(agent_name="Gemini-2.5", factors=[])
     }
     # Mock callback to return specific input
-    mock_feedback_callback = MagicMock(return_value=human_input)
+    mock_feedback_callback = _Counter(human_input)
 
     await run_debate_rounds(
         initial_responses=initial_responses, 
         question="Test Question Feedback", # Pass a string question
         max_rounds=max_rounds, 
+        progress_callback=None,
         human_feedback_callback=mock_feedback_callback
     )
 
     assert mock_feedback_callback.call_count == 1 # Called once before round 2
     
-    # Check the arguments passed to the prompt template's format method in Round 2
+    # Check the fields passed to the critique renderer in Round 2
     # It's called once per agent per round (2 agents * 2 rounds)
-    assert mock_template.format.call_count == max_rounds * len(initial_responses) # 2 * 2 = 4
-    # Get the keyword arguments from the *last* call to format (doesn't matter which agent for this check)
-    format_kwargs = mock_template.format.call_args.kwargs
+    assert mock_render.call_count == max_rounds * len(initial_responses) # 2 * 2 = 4
+    # Get the keyword arguments from the *last* call to the renderer (doesn't matter which agent for this check)
+    format_kwargs = mock_render.call_args.kwargs
     # print(f"Format kwargs: {format_kwargs}") # Debug
     assert format_kwargs['human_feedback'] == human_input
 
 # --- Test Cases for _parse_factor_list --- 
 
 # Define test data needed for the original list parser tests
-def create_json_string(data) -> str:
-    "Helper to create a valid JSON string from a Python list/dict."
-    return json.dumps(data, indent=2)
+def create_json_string(data, indent: Optional[int] = None) -> str:
+    "Helper to create a valid JSON string from a Python list/dict (compact unless indent is given)."
+    if indent is None:
+        return json.dumps(data, separators=(",", ":")) # Compact output stays on the C encoder
+    return json.dumps(data, indent=indent)
 
 VALID_JSON_DATA = [
   {
@@ -222,7 +258,8 @@ JSON_WITH_EXTRA_WHITESPACE_DATA = [
     "confidence": 1.0
   }
 ]
-JSON_WITH_EXTRA_WHITESPACE = f"  \n\n{create_json_string(JSON_WITH_EXTRA_WHITESPACE_DATA)}\n\n  \n"
+# Keep this one indented so the parser still sees multi-line, padded JSON
+JSON_WITH_EXTRA_WHITESPACE = f"  \n\n{create_json_string(JSON_WITH_EXTRA_WHITESPACE_DATA, indent=2)}\n\n  \n"
 
 JSON_MISSING_FIELDS_DATA = [
   {
@@ -299,45 +336,67 @@ Justification: Some text.
 Confidence: 3
 '''
 
+# Trailing comma and smart quotes - repaired rather than re-requested
+SLOPPY_JSON_STRING = '[{\u201cfactor_name\u201d: "Sloppy Factor", "justification": "Trailing comma.", "confidence": 3,},]'
+
+# Structured-output shape, with a bracket inside a justification string
+FACTORS_OBJECT_WITH_BRACKETS = create_json_string({"factors": [
+    {"factor_name": "A", "justification": "see [1]", "confidence": 3},
+    {"factor_name": "B", "justification": "Plain.", "confidence": 4},
+]})
+
 EMPTY_STRING = ""
 EMPTY_JSON_ARRAY = "[]"
 
-@pytest.mark.parametrize(
-    "input_text, expected_factors",
-    [
-        # Happy Paths
-        (VALID_JSON_STRING, [
-            Factor(name="Factor One", justification="Justification 1.", confidence=5.0),
-            Factor(name="Factor Two", justification="Justification 2.", confidence=3.5)
-        ]),
-        (JSON_WITH_MARKDOWN, [
-            Factor(name="Markdown Factor", justification="Wrapped in markdown.", confidence=4.0)
-        ]),
-        # Handling variations
-        (JSON_WITH_SURROUNDING_TEXT, [
-            Factor(name="Surrounded Factor", justification="Text before and after.", confidence=2.0)
-        ]),
-        (JSON_WITH_EXTRA_WHITESPACE, [
-             Factor(name="Whitespace Factor", justification="Lots of space.", confidence=1.0)
-        ]),
-         (EMPTY_JSON_ARRAY, []), # Empty list is valid
-        # Error Handling & Edge Cases
-        (JSON_MISSING_FIELDS, [ # Only the first factor is valid - others lack required fields
-            Factor(name="Good Factor", justification="Complete.", confidence=5.0)
-        ]),
-        (JSON_INVALID_CONFIDENCE_TYPE, [ # First factor confidence is parsed from string "4", second ("high") is skipped
-             Factor(name="String Confidence", justification="Should be number.", confidence=4.0)
-        ]),
-        (JSON_CONFIDENCE_OUT_OF_RANGE, [ # Confidences should be clamped
-            Factor(name="Too High", justification="Confidence > 5", confidence=5.0),
-            Factor(name="Too Low", justification="Confidence < 1", confidence=1.0)
-        ]),
-        (INVALID_JSON_STRUCTURE, []), # Not a list
-        (MALFORMED_JSON_STRING, []), # JSONDecodeError due to missing comma
-        (NO_JSON_STRING, []), # No JSON found
-        (EMPTY_STRING, []), # Empty input
-    ]
-)
+# Inputs and expected results for _parse_factor_list, built once at import
+_CASES = [
+    # Happy Paths
+    (VALID_JSON_STRING, [
+        Factor(name="Factor One", justification="Justification 1.", confidence=5.0),
+        Factor(name="Factor Two", justification="Justification 2.", confidence=3.5)
+    ]),
+    (JSON_WITH_MARKDOWN, [
+        Factor(name="Markdown Factor", justification="Wrapped in markdown.", confidence=4.0)
+    ]),
+    # Handling variations
+    (JSON_WITH_SURROUNDING_TEXT, [
+        Factor(name="Surrounded Factor", justification="Text before and after.", confidence=2.0)
+    ]),
+    (JSON_WITH_EXTRA_WHITESPACE, [
+        Factor(name="Whitespace Factor", justification="Lots of space.", confidence=1.0)
+    ]),
+    (EMPTY_JSON_ARRAY, []), # Empty list is valid
+    (FACTORS_OBJECT_WITH_BRACKETS, [
+        Factor(name="A", justification="see [1]", confidence=3.0),
+        Factor(name="B", justification="Plain.", confidence=4.0)
+    ]),
+    (SLOPPY_JSON_STRING, [
+        Factor(name="Sloppy Factor", justification="Trailing comma.", confidence=3.0)
+    ]),
+    # Error Handling & Edge Cases
+    (JSON_MISSING_FIELDS, [ # Only the first factor is valid - others lack required fields
+        Factor(name="Good Factor", justification="Complete.", confidence=5.0)
+    ]),
+    (JSON_INVALID_CONFIDENCE_TYPE, [ # First factor confidence is parsed from string "4", second ("high") is skipped
+        Factor(name="String Confidence", justification="Should be number.", confidence=4.0)
+    ]),
+    (JSON_CONFIDENCE_OUT_OF_RANGE, [ # Confidences should be clamped
+        Factor(name="Too High", justification="Confidence > 5", confidence=5.0),
+        Factor(name="Too Low", justification="Confidence < 1", confidence=1.0)
+    ]),
+    (INVALID_JSON_STRUCTURE, []), # Not a list
+    (MALFORMED_JSON_STRING, []), # JSONDecodeError due to missing comma
+    (NO_JSON_STRING, []), # No JSON found
+    (EMPTY_STRING, []), # Empty input
+]
+
+# Short ids so node ids/-k don't carry the JSON blobs
+_CASE_IDS = [
+    "valid", "markdown", "surrounding", "whitespace", "empty_array", "factors_object", "sloppy", "missing_fields",
+    "invalid_conf_type", "out_of_range", "invalid_structure", "malformed", "no_json", "empty",
+]
+
+@pytest.mark.parametrize("input_text, expected_factors", _CASES, ids=_CASE_IDS)
 def test_parse_factor_list(input_text, expected_factors):
     """Tests the _parse_factor_list function with various inputs."""
     parsed_factors = _parse_factor_list(input_text)
@@ -347,4 +406,42 @@ def test_parse_factor_list(input_text, expected_factors):
         assert parsed.name == expected.name
         assert parsed.justification == expected.justification
         # Use pytest.approx for float comparison
-        assert parsed.confidence == pytest.approx(expected.confidence)
\ No newline at end of file
+        assert parsed.confidence == pytest.approx(expected.confidence)
+
+def test_format_factors_for_prompt_is_compact_and_round_trips():
+    factors = [Factor(name="Café pricing", justification="Costs rise.", confidence=4.0)]
+    text = _format_factors_for_prompt(factors)
+    assert '": ' not in text and '", ' not in text # no separator whitespace
+    assert "Café" in text # non-ASCII not escaped
+    assert _parse_factor_list(text) == factors
+
+def test_parse_factor_list_batch():
+    """Runs every case through _parse_factor_list in one test, reporting the failing case id."""
+    for i, (input_text, expected_factors) in zip(_CASE_IDS, _CASES):
+        parsed_factors = _parse_factor_list(input_text)
+        if len(parsed_factors) != len(expected_factors):
+            pytest.fail(f"case {i}: expected {len(expected_factors)} factors, got {len(parsed_factors)}")
+        for parsed, expected in zip(parsed_factors, expected_factors):
+            if (parsed.name, parsed.justification) != (expected.name, expected.justification) \
+                    or parsed.confidence != pytest.approx(expected.confidence):
+                pytest.fail(f"case {i}: {parsed!r} != {expected!r}")
+@pytest.mark.asyncio
+async def test_run_baseline_batch_splits_and_orders():
+    """Questions are sent batch_size per request; factor lists come back in input order."""
+    import re
+    from core.debate_engine import run_baseline_batch
+    prompts = []
+
+    async def fake_query(prompt):
+        prompts.append(prompt)
+        if "Q boom" in prompt:
+            return "Error: rate limited"
+        # Echo each labelled question back as its single factor
+        labelled = re.findall(r"^(Q\d+): (.*)$", prompt, re.MULTILINE)
+        return json.dumps({label: [{"factor_name": q, "justification": "J", "confidence": 3}] for label, q in labelled})
+
+    questions = ["Q a", "Q b", "Q c", "Q boom", "Q e"]
+    results = await run_baseline_batch(questions, top_k=1, batch_size=2, query_func=fake_query)
+
+    assert len(prompts) == 3
+    assert [[f.name for f in factors] for factors in results] == [["Q a"], ["Q b"], [], [], ["Q e"]]
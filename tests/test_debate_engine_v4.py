@@ -5,26 +5,40 @@ import asyncio
 from unittest.mock import patch, AsyncMock, MagicMock, call
 from typing import Dict, Any, List, Optional, Callable
 
-# Make sure the path allows importing from core and utils
-import sys
-import os
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.dirname(current_dir)
-sys.path.insert(0, project_root)
-
 from core.debate_engine_v4 import run_freeform_critique_round
 from utils.prompts import FREEFORM_CRITIQUE_PROMPT_TEMPLATE
+from utils.progress import MAX_CB_PAYLOAD, get_progress_payload
+from _mockutil import as_call_set, call_key
 
 # --- Test Fixtures --- 
 
-@pytest.fixture
+TEST_QUESTION = "Test question?"
+
+@pytest.fixture(scope="session")
 def mock_initial_baselines() -> Dict[str, str]:
+    # Shared, read-only: tests that need a different set must copy it first
     return {
         "O4-mini": "O4 baseline text.",
         "Gemini-2.5": "Gemini baseline text.",
         "Grok-3": "Grok baseline text."
     }
 
+@pytest.fixture(scope="module")
+def expected_prompts(mock_initial_baselines) -> Dict[str, str]:
+    """Critique prompt each agent should receive for TEST_QUESTION, formatted once per module."""
+    prompts = {}
+    for agent_name, baseline in mock_initial_baselines.items():
+        other_baselines_formatted = "\n\n".join(
+            f"--- Baseline from Agent: {other} ---\n{text}\n--- End Baseline from Agent: {other} ---"
+            for other, text in mock_initial_baselines.items() if other != agent_name
+        )
+        prompts[agent_name] = FREEFORM_CRITIQUE_PROMPT_TEMPLATE.format(
+            question=TEST_QUESTION,
+            your_baseline=baseline,
+            other_baselines_formatted=other_baselines_formatted
+        )
+    return prompts
+
 @pytest.fixture
 def mock_progress_callback() -> MagicMock:
     return MagicMock()
@@ -33,7 +47,7 @@ def mock_progress_callback() -> MagicMock:
 
 @pytest.mark.asyncio
 @patch('core.debate_engine_v4.AGENT_QUERY_FUNCTIONS')
-async def test_run_freeform_critique_round_success(mock_query_funcs, mock_initial_baselines, mock_progress_callback):
+async def test_run_freeform_critique_round_success(mock_query_funcs, mock_initial_baselines, expected_prompts, mock_progress_callback):
     """Test successful execution with mock LLM responses."""
     # Arrange
     mock_query_funcs.keys.return_value = list(mock_initial_baselines.keys())
@@ -42,18 +56,18 @@ async def test_run_freeform_critique_round_success(mock_query_funcs, mock_initia
     mock_grok_response = "Grok critique text."
     
     # Configure mocks for each agent - IMPORTANT: Use AsyncMock for async functions
-    mock_query_funcs.__getitem__.side_effect = lambda key: {
+    # Built once so every lookup returns the same mock the engine actually awaits
+    agent_mocks = {
         "O4-mini": AsyncMock(return_value=mock_o4_response),
         "Gemini-2.5": AsyncMock(return_value=mock_gemini_response),
         "Grok-3": AsyncMock(return_value=mock_grok_response)
-    }[key]
-    
-    question = "Test question?"
+    }
+    mock_query_funcs.__getitem__.side_effect = agent_mocks.__getitem__
 
     # Act
     results = await run_freeform_critique_round(
         initial_baselines=mock_initial_baselines,
-        question=question,
+        question=TEST_QUESTION,
         progress_callback=mock_progress_callback
     )
 
@@ -64,31 +78,46 @@ async def test_run_freeform_critique_round_success(mock_query_funcs, mock_initia
     assert results["Grok-3"] == mock_grok_response
 
     # Check if query functions were called with correctly formatted prompts
-    o4_mock = mock_query_funcs.__getitem__("O4-mini")
-    gemini_mock = mock_query_funcs.__getitem__("Gemini-2.5")
-    grok_mock = mock_query_funcs.__getitem__("Grok-3")
+    o4_mock = agent_mocks["O4-mini"]
+    gemini_mock = agent_mocks["Gemini-2.5"]
+    grok_mock = agent_mocks["Grok-3"]
 
     o4_mock.assert_called_once()
     gemini_mock.assert_called_once()
     grok_mock.assert_called_once()
 
     # Verify prompt content for one agent (e.g., O4-mini)
-    expected_o4_prompt = FREEFORM_CRITIQUE_PROMPT_TEMPLATE.format(
-        question=question,
-        your_baseline=mock_initial_baselines["O4-mini"],
-        other_baselines_formatted=(
-            f"--- Baseline from Agent: Gemini-2.5 ---\n{mock_initial_baselines['Gemini-2.5']}\n--- End Baseline from Agent: Gemini-2.5 ---\n\n"
-            f"--- Baseline from Agent: Grok-3 ---\n{mock_initial_baselines['Grok-3']}\n--- End Baseline from Agent: Grok-3 ---"
-        )
-    )
-    o4_mock.assert_called_with(expected_o4_prompt)
+    o4_mock.assert_called_with(expected_prompts["O4-mini"])
 
-    # Check progress callback calls (simplified check)
-    mock_progress_callback.assert_any_call("status", "Starting free-form critique round...", use_console=True)
-    mock_progress_callback.assert_any_call("agent_status", "Critique received from O4-mini.", use_console=True)
-    mock_progress_callback.assert_any_call("freeform_critique_result", {"agent_name": "O4-mini", "critique_text": mock_o4_response}, use_console=False)
+    # Check progress callback calls; the callback gets (update_type, data), use_console never reaches it
+    progress_calls = as_call_set(mock_progress_callback)
+    assert call_key("status", "Starting free-form critique round...") in progress_calls
+    assert call_key("agent_status", "Critique received from O4-mini.") in progress_calls
+    assert call_key("freeform_critique", {"agent_name": "O4-mini", "critique_text": mock_o4_response}) in progress_calls
     # ... (add similar checks for other agents and status messages)
-    mock_progress_callback.assert_any_call("status", "Free-form critique round complete.", use_console=True)
+    assert call_key("status", "Free-form critique round complete.") in progress_calls
+
+
+@pytest.mark.asyncio
+@patch('core.debate_engine_v4.AGENT_QUERY_FUNCTIONS')
+async def test_run_freeform_critique_round_caps_long_critiques(mock_query_funcs, mock_initial_baselines):
+    """A plain (web UI style) callback gets long critiques as a preview + ref, not the full text."""
+    mock_query_funcs.keys.return_value = ["O4-mini"]
+    long_critique = "x" * (MAX_CB_PAYLOAD + 1)
+    mock_query_funcs.__getitem__.return_value = AsyncMock(return_value=long_critique)
+    events = []
+
+    await run_freeform_critique_round(
+        initial_baselines=mock_initial_baselines,
+        question=TEST_QUESTION,
+        progress_callback=lambda update_type, data: events.append((update_type, data))
+    )
+
+    critique = next(data for update_type, data in events if update_type == "freeform_critique")
+    capped = critique["critique_text"]
+    assert capped["len"] == len(long_critique)
+    assert len(capped["preview"]) < len(long_critique)
+    assert get_progress_payload(capped["_ref"]) == long_critique
 
 
 @pytest.mark.asyncio
@@ -101,11 +130,12 @@ async def test_run_freeform_critique_round_one_agent_fails(mock_query_funcs, moc
     mock_gemini_exception = ValueError("Gemini API Error")
     mock_grok_response = "Grok critique text."
 
-    mock_query_funcs.__getitem__.side_effect = lambda key: {
+    agent_mocks = {
         "O4-mini": AsyncMock(return_value=mock_o4_response),
         "Gemini-2.5": AsyncMock(side_effect=mock_gemini_exception),
         "Grok-3": AsyncMock(return_value=mock_grok_response)
-    }[key]
+    }
+    mock_query_funcs.__getitem__.side_effect = agent_mocks.__getitem__
     
     question = "Test question?"
 
@@ -123,7 +153,8 @@ async def test_run_freeform_critique_round_one_agent_fails(mock_query_funcs, moc
     assert results["Grok-3"] == mock_grok_response
 
     # Check progress callback for error reporting
-    mock_progress_callback.assert_any_call("agent_error", {"agent_name": "Gemini-2.5", "error": f"Error during free-form critique from Gemini-2.5: {mock_gemini_exception}"}, use_console=True)
+    progress_calls = as_call_set(mock_progress_callback)
+    assert call_key("agent_error", {"agent_name": "Gemini-2.5", "error": f"Error during free-form critique from Gemini-2.5: {mock_gemini_exception}"}) in progress_calls
 
 
 @pytest.mark.asyncio
@@ -131,24 +162,26 @@ async def test_run_freeform_critique_round_one_agent_fails(mock_query_funcs, moc
 async def test_run_freeform_critique_round_missing_baseline(mock_query_funcs, mock_initial_baselines, mock_progress_callback):
     """Test when one agent is missing an initial baseline."""
     # Arrange
-    del mock_initial_baselines["Grok-3"] # Simulate Grok failing baseline gen
+    baselines = dict(mock_initial_baselines) # The session fixture is shared; don't mutate it
+    del baselines["Grok-3"] # Simulate Grok failing baseline gen
     mock_query_funcs.keys.return_value = ["O4-mini", "Gemini-2.5", "Grok-3"] # Engine still knows about Grok
     
     mock_o4_response = "O4 critique text."
     mock_gemini_response = "Gemini critique text."
 
     # Only O4 and Gemini should be called
-    mock_query_funcs.__getitem__.side_effect = lambda key: {
+    agent_mocks = {
         "O4-mini": AsyncMock(return_value=mock_o4_response),
         "Gemini-2.5": AsyncMock(return_value=mock_gemini_response),
         # Grok mock shouldn't be called
-    }[key]
+    }
+    mock_query_funcs.__getitem__.side_effect = agent_mocks.__getitem__
     
     question = "Test question?"
 
     # Act
     results = await run_freeform_critique_round(
-        initial_baselines=mock_initial_baselines,
+        initial_baselines=baselines,
         question=question,
         progress_callback=mock_progress_callback
     )
@@ -166,4 +199,5 @@ async def test_run_freeform_critique_round_missing_baseline(mock_query_funcs, mo
     # assert not mock_query_funcs.__getitem__("Grok-3").called
 
     # Check status messages
-    mock_progress_callback.assert_any_call("status", f"Querying 2 agents for free-form critique...", use_console=False) 
\ No newline at end of file
+    progress_calls = as_call_set(mock_progress_callback)
+    assert call_key("status", "Querying 2 agents for free-form critique...") in progress_calls
\ No newline at end of file
@@ -1,25 +1,26 @@
+import json
+
 import pytest
-import asyncio
-import sys
-import os
-from unittest.mock import patch, MagicMock, AsyncMock, call
-import typer # Used for type hints and potentially mocking
+from unittest.mock import patch, AsyncMock
 
-# Add project root to sys.path to allow importing 'debate'
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
+from utils.prompts import BASELINE_PROMPT_TEMPLATE, FACTOR_LIST_RESPONSE_FORMAT
 
 # Import the async function to test
 from debate import run_debate_logic
 
+def _flow_patches():
+    """Stops the flow after the baseline fan-out: no debate rounds, no real judge call."""
+    return (
+        # autospec keeps the real signature, so a missing progress_callback still fails the test
+        patch('debate.run_debate_rounds', autospec=True, return_value=[]),
+        patch('debate.judge_quality', new_callable=AsyncMock, return_value=("Accept Merged", {}, "")),
+    )
+
 # Since run_debate_logic imports clients inside, we patch them there
 @pytest.mark.asyncio
 @patch('llm_clients.o4_client.query_o4', new_callable=AsyncMock)
 @patch('llm_clients.gemini_client.query_gemini', new_callable=AsyncMock)
-@patch('debate.typer.secho') # Mock typer output
-@patch('debate.typer.echo')  # Mock typer output
-async def test_run_baseline_success(mock_echo, mock_secho, mock_query_gemini, mock_query_o4):
+async def test_run_baseline_success(mock_query_gemini, mock_query_o4, tmp_path):
     """ Test the baseline fan-out logic successfully queries O4 and Gemini """
     # Mock return values for the client queries
     mock_o4_response = "O4 Factors: A, B, C"
@@ -29,45 +30,40 @@ async def test_run_baseline_success(mock_echo, mock_secho, mock_query_gemini, mo
 
     test_question = "Test question?"
     test_top_k = 3
+    output = tmp_path / "test.json"
 
     # Run the logic
-    await run_debate_logic(
-        question=test_question, 
-        top_k=test_top_k, 
-        max_rounds=3, 
-        output="test.json", 
-        verbose=False
-    )
+    rounds_patch, judge_patch = _flow_patches()
+    with rounds_patch as mock_rounds, judge_patch:
+        await run_debate_logic(
+            question=test_question, 
+            top_k=test_top_k, 
+            max_rounds=3, 
+            output=str(output), 
+            verbose=False
+        )
 
     # --- Assertions --- #
-    # 1. Check prompt construction (implicitly checked by calls below)
-    expected_prompt = (
-        f"Q: {test_question}\n"
-        f"List top {test_top_k} factors with 1–2 sentence justification and self-rated confidence (1–5)."
-    )
+    # 1. Prompt construction, from the current template
+    expected_prompt = BASELINE_PROMPT_TEMPLATE.format(question=test_question, top_k=test_top_k)
 
-    # 2. Check that client queries were called correctly
-    mock_query_o4.assert_awaited_once_with(expected_prompt)
-    mock_query_gemini.assert_awaited_once_with(expected_prompt)
+    # 2. Check that client queries were called correctly, with provider-enforced JSON output
+    mock_query_o4.assert_awaited_once_with(expected_prompt, response_format=FACTOR_LIST_RESPONSE_FORMAT)
+    mock_query_gemini.assert_awaited_once_with(expected_prompt, json_mode=True)
+    assert "progress_callback" in mock_rounds.call_args.kwargs
 
-    # 3. Check that typer.secho was called to print results
-    # Note: Call order might vary slightly due to asyncio.gather, focus on content
-    # print(f"secho calls: {mock_secho.call_args_list}") # Debug print
-    secho_calls = mock_secho.call_args_list
-    assert call("\nQuerying baseline models...", fg=typer.colors.YELLOW) in secho_calls
-    assert call("\n[Baseline Results]", fg=typer.colors.YELLOW) in secho_calls
-    assert call(f"[O4-mini] {mock_o4_response}", fg=typer.colors.BLUE) in secho_calls
-    assert call(f"[Gemini-2.5] {mock_gemini_response}", fg=typer.colors.BLUE) in secho_calls
-
-    # 4. Check that the TODO echo was called
-    mock_echo.assert_any_call("\n[TODO] Implement Debate Rounds, Merge, Summarize, Judge...")
+    # 3. Both baseline responses land in the transcript
+    transcript = json.loads(output.read_text())
+    assert transcript["baseline_prompt"] == expected_prompt
+    assert [(r["agent_name"], r["raw_response"], r["error"]) for r in transcript["baseline_responses"]] == [
+        ("O4-mini", mock_o4_response, None),
+        ("Gemini-2.5", mock_gemini_response, None),
+    ]
 
 @pytest.mark.asyncio
 @patch('llm_clients.o4_client.query_o4', new_callable=AsyncMock)
 @patch('llm_clients.gemini_client.query_gemini', new_callable=AsyncMock)
-@patch('debate.typer.secho') # Mock typer output
-@patch('debate.typer.echo')  # Mock typer output
-async def test_run_baseline_one_client_fails(mock_echo, mock_secho, mock_query_gemini, mock_query_o4):
+async def test_run_baseline_one_client_fails(mock_query_gemini, mock_query_o4, tmp_path):
     """ Test baseline fan-out when one client query raises an exception """
     mock_o4_response = "O4 Factors: A, B, C"
     mock_gemini_exception = ValueError("Gemini API Error")
@@ -76,31 +72,30 @@ async def test_run_baseline_one_client_fails(mock_echo, mock_secho, mock_query_g
 
     test_question = "Test question where Gemini fails?"
     test_top_k = 5
+    output = tmp_path / "test.json"
 
     # Run the logic (should not raise an error due to return_exceptions=True)
-    await run_debate_logic(
-        question=test_question, 
-        top_k=test_top_k, 
-        max_rounds=3, 
-        output="test.json", 
-        verbose=False
-    )
+    rounds_patch, judge_patch = _flow_patches()
+    with rounds_patch, judge_patch:
+        await run_debate_logic(
+            question=test_question, 
+            top_k=test_top_k, 
+            max_rounds=3, 
+            output=str(output), 
+            verbose=False
+        )
 
     # --- Assertions --- #
-    expected_prompt = (
-        f"Q: {test_question}\n"
-        f"List top {test_top_k} factors with 1–2 sentence justification and self-rated confidence (1–5)."
-    )
-    mock_query_o4.assert_awaited_once_with(expected_prompt)
-    mock_query_gemini.assert_awaited_once_with(expected_prompt)
-
-    # Check that typer.secho prints the success and the error
-    secho_calls = mock_secho.call_args_list
-    assert call(f"[O4-mini] {mock_o4_response}", fg=typer.colors.BLUE) in secho_calls
-    assert call(f"[Gemini-2.5] Error: {mock_gemini_exception}", fg=typer.colors.RED) in secho_calls
-    
-    # Check that the TODO echo was still called
-    mock_echo.assert_any_call("\n[TODO] Implement Debate Rounds, Merge, Summarize, Judge...")
+    expected_prompt = BASELINE_PROMPT_TEMPLATE.format(question=test_question, top_k=test_top_k)
+    mock_query_o4.assert_awaited_once_with(expected_prompt, response_format=FACTOR_LIST_RESPONSE_FORMAT)
+    mock_query_gemini.assert_awaited_once_with(expected_prompt, json_mode=True)
+
+    # The success and the error are both recorded
+    transcript = json.loads(output.read_text())
+    assert [(r["agent_name"], r["raw_response"], r["error"]) for r in transcript["baseline_responses"]] == [
+        ("O4-mini", mock_o4_response, None),
+        ("Gemini-2.5", None, str(mock_gemini_exception)),
+    ]
 
 # Potential future test: Mocking the Grok import successfully
 # @pytest.mark.asyncio
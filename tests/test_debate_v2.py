@@ -0,0 +1,58 @@
+import json
+
+import pytest
+from unittest.mock import patch, AsyncMock
+
+import debate_v2
+from utils.models import Factor
+from utils.prompts import CRITIQUE_AND_MERGE_PROSE_BASELINE_TEMPLATE, FACTOR_LIST_RESPONSE_FORMAT
+
+QUESTION = "Should we expand?"
+PROSE_BASELINE = "Expanding is good because..."
+# Four factors so top_k=3 has something to cut
+FUSED_RESPONSE = json.dumps({"factors": [
+    {"factor_name": f"Factor {i}", "justification": f"Reason {i}.", "confidence": 5 - i} for i in range(4)
+]})
+
+@pytest.mark.asyncio
+async def test_fused_critique_merge_single_call_and_top_k():
+    query = AsyncMock(return_value=FUSED_RESPONSE)
+    transcript = {}
+
+    factors = await debate_v2._fused_critique_merge("O4-mini", query, QUESTION, PROSE_BASELINE, 3, transcript)
+
+    expected_prompt = CRITIQUE_AND_MERGE_PROSE_BASELINE_TEMPLATE.format(
+        question=QUESTION, prose_baseline=PROSE_BASELINE, top_k=3
+    )
+    query.assert_awaited_once_with(expected_prompt, response_format=FACTOR_LIST_RESPONSE_FORMAT)
+    assert factors == [Factor(name=f"Factor {i}", justification=f"Reason {i}.", confidence=5 - i) for i in range(3)]
+    assert transcript["merged_factors"] == [f.to_dict() for f in factors]
+    assert transcript["baseline_responses"] == [{
+        "agent_name": "O4-mini", "raw_response": FUSED_RESPONSE, "error": None,
+        "factors": transcript["merged_factors"], "prompt_used": expected_prompt,
+    }]
+
+@pytest.mark.asyncio
+async def test_fused_critique_merge_query_error_returns_empty():
+    query = AsyncMock(side_effect=RuntimeError("API down"))
+    transcript = {}
+
+    factors = await debate_v2._fused_critique_merge("Gemini-2.5", query, QUESTION, PROSE_BASELINE, 3, transcript)
+
+    assert factors == []
+    assert query.await_args.kwargs == {"json_mode": True}
+    assert transcript["merged_factors"] == []
+    assert transcript["baseline_responses"][0]["error"] == "API down"
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_rounds, fused", [(0, True), (2, False)])
+async def test_fuse_flag_only_applies_without_rounds(max_rounds, fused, tmp_path):
+    with patch('llm_clients.o4_client.query_o4', new_callable=AsyncMock, return_value=PROSE_BASELINE), \
+         patch.object(debate_v2, "_fused_critique_merge", new_callable=AsyncMock, return_value=[]) as fused_mock, \
+         patch.object(debate_v2, "_critique_debate_and_merge", new_callable=AsyncMock, return_value=[]) as split_mock, \
+         patch.object(debate_v2, "judge_quality", new_callable=AsyncMock, return_value=("Accept Merged", {}, "")):
+        await debate_v2.run_debate_logic(
+            QUESTION, 3, max_rounds, str(tmp_path / "t.json"), False, fuse_critique_merge=True
+        )
+    assert fused_mock.await_count == int(fused)
+    assert split_mock.await_count == int(not fused)
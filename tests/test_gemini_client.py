@@ -5,8 +5,13 @@ from unittest.mock import patch, MagicMock, AsyncMock, ANY
 import unittest
 
 # Import the function to test
+from llm_clients import gemini_client as gc
 from llm_clients.gemini_client import query_gemini
 
+# Gemini and O4 client tests share one xdist worker (--dist loadgroup);
+# the mocked blocking calls run inline rather than on the client thread pools
+pytestmark = [pytest.mark.xdist_group(name="llm_clients"), pytest.mark.usefixtures("inline_llm_executors")]
+
 # Mock response object structure expected from google.generativeai
 class MockGeminiResponse:
     def __init__(self, text):
@@ -21,7 +26,7 @@ async def test_query_gemini_success():
 
     # Patch the generate_content method of the genai_model instance
     # Since query_gemini uses asyncio.to_thread, we mock the underlying sync method
-    with patch('llm_clients.gemini_client.genai_model.generate_content', return_value=mock_response_obj) as mock_generate:
+    with patch.object(gc.genai_model, 'generate_content', return_value=mock_response_obj) as mock_generate:
         response = await query_gemini(mock_prompt)
 
         # Assertions
@@ -40,7 +45,7 @@ async def test_query_gemini_no_api_key():
     mock_prompt = "Test prompt, no API key"
 
     # Patch the genai_model to simulate it being None
-    with patch('llm_clients.gemini_client.genai_model', None):
+    with patch.object(gc, 'genai_model', None):
         response = await query_gemini(mock_prompt)
 
         # Assertions
@@ -53,7 +58,7 @@ async def test_query_gemini_api_error():
     mock_exception = Exception("Simulated Gemini API Error")
 
     # Patch generate_content to raise an exception
-    with patch('llm_clients.gemini_client.genai_model.generate_content', side_effect=mock_exception) as mock_generate:
+    with patch.object(gc.genai_model, 'generate_content', side_effect=mock_exception) as mock_generate:
         response = await query_gemini(mock_prompt)
         
         # Assertions
@@ -66,9 +71,9 @@ async def test_query_gemini_bad_response_format():
     """ Test Gemini wrapper when the response object lacks the .text attribute """
     mock_prompt = "Test prompt for bad response"
     # Create a mock object that doesn't have a .text attribute
-    mock_bad_response_obj = MagicMock(spec=[]) 
+    mock_bad_response_obj = object()
 
-    with patch('llm_clients.gemini_client.genai_model.generate_content', return_value=mock_bad_response_obj) as mock_generate:
+    with patch.object(gc.genai_model, 'generate_content', return_value=mock_bad_response_obj) as mock_generate:
         response = await query_gemini(mock_prompt)
 
         # Assertions
@@ -85,7 +90,7 @@ async def test_query_gemini_custom_config():
     custom_temp = 0.9
     custom_max_tokens = 100
 
-    with patch('llm_clients.gemini_client.genai_model.generate_content', return_value=mock_response_obj) as mock_generate:
+    with patch.object(gc.genai_model, 'generate_content', return_value=mock_response_obj) as mock_generate:
         response = await query_gemini(mock_prompt, temperature=custom_temp, max_tokens=custom_max_tokens)
 
         # Assertions
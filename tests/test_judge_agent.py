@@ -1,18 +1,34 @@
 import pytest
 import asyncio
-import sys
-import os
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock, AsyncMock, call
 
-# Add project root to sys.path
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
-
 # Modules to test
-from judge.judge_agent import judge_quality, _parse_judge_ratings
+from judge.judge_agent import judge_quality, _parse_judge_ratings, _parse_judge_v4_decision, _v4_complete
 from utils.prompts import JUDGE_PROMPT_TEMPLATE
 
+# Keep this module's tests on one xdist worker (--dist loadgroup)
+pytestmark = pytest.mark.xdist_group(name="judge")
+
+# One AsyncMock for the whole module, reset after each test, instead of building a new one per @patch
+_FAKE_QUERY_O4 = AsyncMock()
+
+@pytest.fixture
+def mock_query_o4():
+    try:
+        with patch('judge.judge_agent.query_o4', new=_FAKE_QUERY_O4):
+            yield _FAKE_QUERY_O4
+    finally:
+        _FAKE_QUERY_O4.reset_mock(return_value=True, side_effect=True)
+
+@pytest.fixture
+def judge_mocks(mock_query_o4, monkeypatch):
+    """ query_o4 plus a mocked ratings parser and console, set with monkeypatch rather than @patch stacks. """
+    parse, console = MagicMock(), MagicMock()
+    monkeypatch.setattr("judge.judge_agent._parse_judge_ratings", parse)
+    monkeypatch.setattr("judge.judge_agent.console", console)
+    return SimpleNamespace(q4=mock_query_o4, parse=parse, console=console)
+
 # --- Test _parse_judge_ratings --- 
 
 def test_parse_ratings_well_formed():
@@ -45,81 +61,87 @@ def test_parse_ratings_empty_or_malformed():
     assert _parse_judge_ratings(text1) == expected
     assert _parse_judge_ratings(text2) == expected
 
+def test_parse_ratings_trailing_text_and_tight_brackets():
+    text = "Completeness: Rating:[Better] - covers more\nCorrectness: Worse, one error\nClarity: Rating: [Equal]."
+    expected = {"Completeness": "Better", "Correctness": "Worse", "Clarity": "Equal"}
+    assert _parse_judge_ratings(text) == expected
+
+def test_parse_ratings_first_line_wins():
+    text = "Completeness: Worse\nCorrectness: Better\nClarity: Equal\nCompleteness: Better"
+    expected = {"Completeness": "Worse", "Correctness": "Better", "Clarity": "Equal"}
+    assert _parse_judge_ratings(text) == expected
+
+@pytest.mark.parametrize("line", [
+    "Completeness of the answer is poor: it is worse", # Colon must directly follow the dimension
+    "Completeness: not better than baseline, it is worse", # Rating word must come first
+    "Completeness (coverage): Worse",
+])
+def test_parse_ratings_ignores_non_rating_lines(line):
+    # Same lines the old anchored regex skipped: Completeness is missing, so it defaults to Equal
+    ratings = _parse_judge_ratings(line + "\nCorrectness: Better\nClarity: Better")
+    assert ratings == {"Completeness": "Equal", "Correctness": "Better", "Clarity": "Better"}
+
+@pytest.mark.parametrize("text, expected", [
+    ("Overall Decision: Accept", ("Accept", "")),
+    ("Overall Decision: [reject]\nReasoning: Misses the core factors.\nExtra line", ("Reject", "Misses the core factors.")),
+    ("Reasoning: no decision given", ("Error: Cannot Parse Decision", "no decision given")),
+    ("Overall Decision: Reject\nReasoning:\nThe answer misses X.", ("Reject", "The answer misses X.")),
+    ("Reasoning: Misses X.\nOverall Decision: Reject", ("Reject", "Misses X.")),
+])
+def test_parse_judge_v4_decision(text, expected):
+    assert _parse_judge_v4_decision(text) == expected
+
+@pytest.mark.parametrize("text, expected", [
+    ("Overall Decision: Accept\n", True),
+    ("Overall Decision: Reject\nReasoning:\n", False), # Reasoning text hasn't arrived yet
+    ("Overall Decision: Reject\nReasoning:\nMisses X.\n", True),
+])
+def test_v4_complete_waits_for_reject_reasoning(text, expected):
+    assert _v4_complete(text) is expected
+
 # --- Test judge_quality --- 
 
+# Inputs shared by the judge_quality decision cases and the prompt they should produce, formatted once
+JUDGE_BASELINE = "Base answer."
+JUDGE_MERGED = "Merged answer, much better."
+JUDGE_QUESTION = "Test question?"
+JUDGE_EXPECTED_PROMPT = JUDGE_PROMPT_TEMPLATE.format(
+    question=JUDGE_QUESTION, baseline_answer=JUDGE_BASELINE, merged_answer=JUDGE_MERGED
+)
+
 @pytest.mark.asyncio
-@patch('judge.judge_agent.query_o4', new_callable=AsyncMock)
-@patch('judge.judge_agent._parse_judge_ratings') # Mock parsing
-@patch('judge.judge_agent.typer.secho') 
-@patch('judge.judge_agent.typer.echo')
-async def test_judge_accept_merged(mock_echo, mock_secho, mock_parse, mock_query_o4):
-    """ Test judge accepts merged answer (Better/Equal ratings). """
-    mock_raw_response = "Ratings: Better, Equal, Better"
-    mock_parsed_ratings = {"Completeness": "Better", "Correctness": "Equal", "Clarity": "Better"}
-    mock_query_o4.return_value = mock_raw_response
-    mock_parse.return_value = mock_parsed_ratings
+@pytest.mark.parametrize("raw, parsed, expected_decision, expected_print", [
+    # Better/Equal ratings -> accept
+    ("Ratings: Better, Equal, Better", {"Completeness": "Better", "Correctness": "Equal", "Clarity": "Better"},
+     "Accept Merged", "[green]Judge Decision: Accept Merged[/green]"),
+    # Any Worse rating -> fallback
+    ("Ratings: Better, Worse, Equal", {"Completeness": "Better", "Correctness": "Worse", "Clarity": "Equal"},
+     "Fallback to Baseline", "[red]Judge Decision: Fallback to Baseline (found 'Worse' rating)[/red]"),
+    # Parser reports an "Error" rating -> parsing error
+    ("Something went wrong, no ratings here.", {"Completeness": "Better", "Correctness": "Error", "Clarity": "Equal"},
+     "Error during parsing", "[red]Judge Decision: Error during parsing[/red]"),
+], ids=["accept_merged", "fallback_to_baseline", "parsing_error"])
+async def test_judge_decision(judge_mocks, raw, parsed, expected_decision, expected_print):
+    """ Test judge_quality's decision for parsed ratings, plus the prompt it sends. """
+    mock_query_o4, mock_parse, mock_console = judge_mocks.q4, judge_mocks.parse, judge_mocks.console
+    mock_query_o4.return_value = raw
+    mock_parse.return_value = parsed
     
-    baseline = "Base answer."
-    merged = "Merged answer, much better."
-    question = "Test question?"
+    decision, ratings, raw_out = await judge_quality(JUDGE_BASELINE, JUDGE_MERGED, JUDGE_QUESTION, verbose=True)
     
-    decision, ratings, raw = await judge_quality(baseline, merged, question)
-    
-    assert decision == "Accept Merged"
-    assert ratings == mock_parsed_ratings
-    assert raw == mock_raw_response
+    assert decision == expected_decision
+    assert ratings == parsed
+    assert raw_out == raw
     mock_query_o4.assert_awaited_once() # Check LLM called
-    mock_parse.assert_called_once_with(mock_raw_response) # Check parser called
+    mock_parse.assert_called_once_with(raw) # Check parser called
     # Check prompt formatting (optional but good)
-    expected_prompt = JUDGE_PROMPT_TEMPLATE.format(question=question, baseline_answer=baseline, merged_answer=merged)
-    assert mock_query_o4.call_args[0][0] == expected_prompt
-    mock_secho.assert_any_call("Judge Decision: Accept Merged", fg='green')
-
-@pytest.mark.asyncio
-@patch('judge.judge_agent.query_o4', new_callable=AsyncMock)
-@patch('judge.judge_agent._parse_judge_ratings')
-@patch('judge.judge_agent.typer.secho') 
-@patch('judge.judge_agent.typer.echo')
-async def test_judge_fallback_to_baseline(mock_echo, mock_secho, mock_parse, mock_query_o4):
-    """ Test judge recommends fallback (Worse rating found). """
-    mock_raw_response = "Ratings: Better, Worse, Equal"
-    mock_parsed_ratings = {"Completeness": "Better", "Correctness": "Worse", "Clarity": "Equal"}
-    mock_query_o4.return_value = mock_raw_response
-    mock_parse.return_value = mock_parsed_ratings
-    
-    decision, ratings, raw = await judge_quality("Base", "Merged", "Q")
-    
-    assert decision == "Fallback to Baseline"
-    assert ratings == mock_parsed_ratings
-    mock_query_o4.assert_awaited_once()
-    mock_parse.assert_called_once_with(mock_raw_response)
-    mock_secho.assert_any_call("Judge Decision: Fallback to Baseline (found 'Worse' rating)", fg='red')
+    assert mock_query_o4.call_args[0][0] == JUDGE_EXPECTED_PROMPT
+    mock_console.print.assert_any_call(expected_print)
 
 @pytest.mark.asyncio
-@patch('judge.judge_agent.query_o4', new_callable=AsyncMock)
-@patch('judge.judge_agent._parse_judge_ratings')
-@patch('judge.judge_agent.typer.secho') 
-@patch('judge.judge_agent.typer.echo')
-async def test_judge_parsing_error(mock_echo, mock_secho, mock_parse, mock_query_o4):
-    """ Test judge handles parsing errors. """
-    mock_raw_response = "Something went wrong, no ratings here."
-    # Simulate parsing failure by returning a dict containing "Error"
-    mock_parsed_ratings = {"Completeness": "Better", "Correctness": "Error", "Clarity": "Equal"} 
-    mock_query_o4.return_value = mock_raw_response
-    mock_parse.return_value = mock_parsed_ratings # Return the error dict
-    
-    decision, ratings, raw = await judge_quality("Base", "Merged", "Q")
-    
-    assert decision == "Error during parsing"
-    assert ratings == mock_parsed_ratings # Returns the dict with error
-    mock_secho.assert_any_call("Judge Decision: Error during parsing", fg='red')
-
-@pytest.mark.asyncio
-@patch('judge.judge_agent.query_o4', new_callable=AsyncMock)
-@patch('judge.judge_agent.typer.secho') 
-@patch('judge.judge_agent.typer.echo')
-async def test_judge_llm_query_error(mock_echo, mock_secho, mock_query_o4):
+async def test_judge_llm_query_error(judge_mocks):
     """ Test judge handles errors during the LLM call. """
+    mock_query_o4 = judge_mocks.q4
     mock_exception = Exception("LLM Unavailable")
     mock_query_o4.side_effect = mock_exception
     
@@ -139,4 +161,121 @@ async def test_judge_missing_input():
     
     decision, ratings, raw = await judge_quality("Base", "", "Q")
     assert decision == "Error"
-    assert "Missing baseline or merged answer" in raw 
\ No newline at end of file
+    assert "Missing baseline or merged answer" in raw 
+
+@pytest.mark.asyncio
+async def test_judge_cache_skips_repeat_llm_call(mock_query_o4, tmp_path, monkeypatch):
+    """ With JUDGE_CACHE=1 a repeated prompt is answered from the cache. """
+    from judge import judge_agent
+    from utils.prompt_cache import PromptCache
+    monkeypatch.setenv("JUDGE_CACHE", "1")
+    monkeypatch.setattr(judge_agent, "_judge_cache", PromptCache("judge", cache_dir=str(tmp_path)))
+    mock_query_o4.return_value = "Completeness: Better\nCorrectness: Equal\nClarity: Equal"
+
+    first = await judge_quality("Base", "Merged", "Q")
+    second = await judge_quality("Base", "Merged", "Q")
+
+    assert first == second
+    assert first[0] == "Accept Merged"
+    mock_query_o4.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_judge_quality_batch_bounded_and_ordered(mock_query_o4):
+    """ Batch judging keeps input order and never exceeds the concurrency bound. """
+    from judge.judge_agent import judge_quality_batch
+    in_flight = 0
+    peak = 0
+
+    async def fake_query(prompt):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        rating = "Worse" if "Merged 1" in prompt else "Better"
+        return f"Completeness: {rating}\nCorrectness: Equal\nClarity: Equal"
+    mock_query_o4.side_effect = fake_query
+
+    triples = [("Base", f"Merged {i}", "Q") for i in range(5)]
+    results = await judge_quality_batch(triples, concurrency=2)
+
+    assert [r[0] for r in results] == ["Accept Merged", "Fallback to Baseline", "Accept Merged", "Accept Merged", "Accept Merged"]
+    assert peak <= 2
+    assert mock_query_o4.await_count == 5
+
+@pytest.mark.asyncio
+async def test_judge_quiet_by_default(mock_query_o4, monkeypatch):
+    """ Without verbose/JUDGE_VERBOSE the judge does not print to the console. """
+    mock_console = MagicMock()
+    monkeypatch.setattr("judge.judge_agent.console", mock_console)
+    mock_query_o4.return_value = "Completeness: Better\nCorrectness: Equal\nClarity: Equal"
+    decision, _, _ = await judge_quality("Base", "Merged", "Q")
+    assert decision == "Accept Merged"
+    mock_console.print.assert_not_called()
+
+def test_encode_ratings_and_accepted_flags():
+    from judge.judge_agent import encode_ratings, accepted_flags
+    ratings_list = [
+        {"Completeness": "Better", "Correctness": "Equal", "Clarity": "Better"},
+        {"Completeness": "Better", "Correctness": "Worse", "Clarity": "Equal"},
+        {"Completeness": "Equal", "Correctness": "Error", "Clarity": "Equal"},
+    ]
+    codes = encode_ratings(ratings_list)
+    assert list(codes) == [1, 0, 1, 1, -1, 0, 0, -2, 0]
+    assert list(accepted_flags(codes)) == [1, 0, 0]
+
+def test_judge_batch_result_columns():
+    from judge.judge_agent import JudgeBatchResult
+    results = [
+        ("Accept Merged", {"Completeness": "Better", "Correctness": "Equal", "Clarity": "Equal"}, "raw"),
+        ("Fallback to Baseline", {"Completeness": "Worse", "Correctness": "Equal", "Clarity": "Better"}, "raw"),
+        Exception("LLM Unavailable"),
+    ]
+    batch = JudgeBatchResult.from_results(results)
+    assert len(batch) == 3
+    assert list(batch.completeness) == [1, -1, -2]
+    assert batch.decisions == ["Accept Merged", "Fallback to Baseline", "Error"]
+    assert batch.accept_rate() == pytest.approx(1 / 3)
+    assert '"clarity":[0,1,-2]' in batch.to_json()
+
+@pytest.mark.asyncio
+async def test_judge_v4_stream_stops_after_decision(mock_query_o4, monkeypatch):
+    """ With JUDGE_STREAM=1 the V4 judge stops reading once an Accept line is complete. """
+    from judge import judge_agent
+    monkeypatch.setenv("JUDGE_STREAM", "1")
+    consumed = []
+
+    async def fake_stream(prompt):
+        for chunk in ["Overall Decision: ", "Accept\n", "Reasoning: long tail\n", "more tail\n"]:
+            consumed.append(chunk)
+            yield chunk
+    monkeypatch.setattr(judge_agent, "query_o4_stream", fake_stream)
+
+    decision, reasoning, raw = await judge_agent.judge_quality_v4("Answer", "Q")
+
+    assert decision == "Accept"
+    assert raw == "Overall Decision: Accept\n"
+    assert len(consumed) == 2
+    mock_query_o4.assert_not_awaited()
+
+def test_judge_openai_batch_jsonl_roundtrip():
+    """ Batch request lines carry the judge prompt; output lines parse into judge_quality-style results. """
+    import json
+    from judge.judge_agent import build_judge_batch_jsonl, parse_judge_batch_output
+    from utils.prompts import render_judge_prompt
+    llm = MagicMock()
+    llm._prompt_messages.side_effect = lambda prompt: [{"role": "user", "content": prompt}]
+    llm._chat_params.side_effect = lambda messages: {"model": "m", "messages": messages}
+
+    payload = build_judge_batch_jsonl([("q1", "Base", "Merged", "Q?"), ("q2", "B2", "M2", "Q?")], llm)
+    lines = [json.loads(line) for line in payload.decode().splitlines()]
+    assert [line["custom_id"] for line in lines] == ["q1", "q2"]
+    assert lines[0]["url"] == "/v1/chat/completions"
+    assert lines[0]["body"]["messages"][0]["content"] == render_judge_prompt("Q?", "Base", "Merged")
+
+    ok = {"custom_id": "q1", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "Completeness: Better\nCorrectness: Equal\nClarity: Equal"}}]}}}
+    failed = {"custom_id": "q2", "response": None, "error": {"code": "rate_limit"}}
+    results = parse_judge_batch_output("\n".join(json.dumps(r) for r in (ok, failed)))
+    assert results["q1"][0] == "Accept Merged"
+    assert results["q1"][1]["Completeness"] == "Better"
+    assert results["q2"][0] == "Error"
@@ -6,29 +6,55 @@ import json # Add json import
 from utils.models import Factor, AgentResponse
 # Adjust path if merge_factors was moved or needs different imports
 from core.merge_logic import merge_factors # Assuming merge_factors is still here
-from llm_interface import LLMInterface # For patching
 from utils.prompts import MERGE_FACTORS_PROMPT # For checking prompt format
 
-# --- Test Data Setup --- 
+# Keep this module's tests on one xdist worker (--dist loadgroup)
+pytestmark = pytest.mark.xdist_group(name="merge")
+
+# Plain stand-in for LLMInterface: records prompts instead of building spec'd MagicMock children
+class _FakeLLM:
+    def __init__(self, ret=None, exc=None):
+        self._ret, self._exc = ret, exc
+        self.prompts = []
 
-# Basic factors
-F_A = Factor(name="A", justification="Justification A", confidence=4)
-F_B = Factor(name="B", justification="Justification B", confidence=5)
-F_C = Factor(name="C", justification="Justification C", confidence=3)
-F_D = Factor(name="D", justification="Justification D", confidence=5)
+    def generate_response(self, prompt, *args, **kwargs):
+        self.prompts.append(prompt)
+        if self._exc:
+            raise self._exc
+        return self._ret
 
-# Agent responses for testing
-RESP_1 = AgentResponse(agent_name="Agent1", factors=[F_A, F_B, F_D])
-RESP_2 = AgentResponse(agent_name="Agent2", factors=[F_A, F_C])
+@pytest.fixture
+def mock_llm_class(monkeypatch):
+    """ Stand-in for the LLMInterface class used by merge_factors; tests set .return_value to a _FakeLLM. """
+    cls = MagicMock()
+    monkeypatch.setattr("core.merge_logic.LLMInterface", cls)
+    return cls
 
-FINAL_RESPONSES_BASIC = {"Agent1": RESP_1, "Agent2": RESP_2}
+# --- Test Data Setup --- 
+# Built lazily, once per worker session; merge_factors only reads its inputs
+
+@pytest.fixture(scope="session")
+def basic_factors():
+    return {
+        "A": Factor(name="A", justification="Justification A", confidence=4),
+        "B": Factor(name="B", justification="Justification B", confidence=5),
+        "C": Factor(name="C", justification="Justification C", confidence=3),
+        "D": Factor(name="D", justification="Justification D", confidence=5),
+    }
+
+@pytest.fixture(scope="session")
+def final_responses_basic(basic_factors):
+    f = basic_factors
+    return {
+        "Agent1": AgentResponse(agent_name="Agent1", factors=[f["A"], f["B"], f["D"]]),
+        "Agent2": AgentResponse(agent_name="Agent2", factors=[f["A"], f["C"]]),
+    }
 
 # --- Test Cases --- 
 
 # Use pytest.mark.asyncio for async functions
 @pytest.mark.asyncio
-@patch('core.merge_logic.LLMInterface') # Patch LLMInterface where it's used
-async def test_merge_llm_basic(MockLLMInterface):
+async def test_merge_llm_basic(mock_llm_class, final_responses_basic, basic_factors):
     """ Test LLM-based merge logic with a successful mock response. """
     # Arrange
     mock_question = "Test question for merge?"
@@ -39,13 +65,12 @@ async def test_merge_llm_basic(MockLLMInterface):
         {"name": "Synthesized B", "justification": "Merged Justification B", "confidence": 5.0},
         {"name": "Synthesized D", "justification": "Merged Justification D", "confidence": 5.0}
     ])
-    mock_llm_instance = MagicMock(spec=LLMInterface)
-    mock_llm_instance.generate_response.return_value = mock_llm_json_output
-    MockLLMInterface.return_value = mock_llm_instance
+    mock_llm_instance = _FakeLLM(ret=mock_llm_json_output)
+    mock_llm_class.return_value = mock_llm_instance
 
     # Act
     merged = await merge_factors(
-        final_responses=FINAL_RESPONSES_BASIC,
+        final_responses=final_responses_basic,
         question=mock_question,
         top_k=mock_top_k
     )
@@ -58,22 +83,20 @@ async def test_merge_llm_basic(MockLLMInterface):
     assert merged[2].name == "Synthesized D"
 
     # Check that LLMInterface was initialized and called
-    MockLLMInterface.assert_called_once()
-    mock_llm_instance.generate_response.assert_called_once()
+    mock_llm_class.assert_called_once()
+    assert len(mock_llm_instance.prompts) == 1
     
     # Optionally check the prompt format
-    call_args, _ = mock_llm_instance.generate_response.call_args
-    prompt_arg = call_args[0]
+    prompt_arg = mock_llm_instance.prompts[0]
     assert mock_question in prompt_arg
     assert f"top {mock_top_k}" in prompt_arg
     assert "Factors from Agent1:" in prompt_arg
     assert "Factors from Agent2:" in prompt_arg
-    assert F_A.name in prompt_arg
-    assert F_C.name in prompt_arg
+    assert basic_factors["A"].name in prompt_arg
+    assert basic_factors["C"].name in prompt_arg
 
 @pytest.mark.asyncio
-@patch('core.merge_logic.LLMInterface')
-async def test_merge_llm_top_k_trimming(MockLLMInterface):
+async def test_merge_llm_top_k_trimming(mock_llm_class, final_responses_basic):
     """ Test that merge_factors trims results if LLM returns more than top_k. """
     # Arrange
     mock_question = "Test question for merge?"
@@ -84,13 +107,12 @@ async def test_merge_llm_top_k_trimming(MockLLMInterface):
         {"name": "Factor 2", "justification": "J2", "confidence": 4.0},
         {"name": "Factor 3", "justification": "J3", "confidence": 3.0}
     ])
-    mock_llm_instance = MagicMock(spec=LLMInterface)
-    mock_llm_instance.generate_response.return_value = mock_llm_json_output
-    MockLLMInterface.return_value = mock_llm_instance
+    mock_llm_instance = _FakeLLM(ret=mock_llm_json_output)
+    mock_llm_class.return_value = mock_llm_instance
 
     # Act
     merged = await merge_factors(
-        final_responses=FINAL_RESPONSES_BASIC,
+        final_responses=final_responses_basic,
         question=mock_question,
         top_k=mock_top_k
     )
@@ -101,19 +123,17 @@ async def test_merge_llm_top_k_trimming(MockLLMInterface):
     assert merged[1].name == "Factor 2"
 
 @pytest.mark.asyncio
-@patch('core.merge_logic.LLMInterface')
-async def test_merge_llm_json_parse_error(MockLLMInterface):
+async def test_merge_llm_json_parse_error(mock_llm_class, final_responses_basic):
     """ Test handling of invalid JSON from the LLM. """
     # Arrange
     mock_question = "Test question for merge?"
     mock_llm_bad_json = 'This is not JSON [{"name": "Bad"}]'
-    mock_llm_instance = MagicMock(spec=LLMInterface)
-    mock_llm_instance.generate_response.return_value = mock_llm_bad_json
-    MockLLMInterface.return_value = mock_llm_instance
+    mock_llm_instance = _FakeLLM(ret=mock_llm_bad_json)
+    mock_llm_class.return_value = mock_llm_instance
 
     # Act
     merged = await merge_factors(
-        final_responses=FINAL_RESPONSES_BASIC,
+        final_responses=final_responses_basic,
         question=mock_question,
         top_k=5
     )
@@ -122,18 +142,16 @@ async def test_merge_llm_json_parse_error(MockLLMInterface):
     assert merged == [] # Should return empty list on parse error
 
 @pytest.mark.asyncio
-@patch('core.merge_logic.LLMInterface')
-async def test_merge_llm_api_error(MockLLMInterface):
+async def test_merge_llm_api_error(mock_llm_class, final_responses_basic):
     """ Test handling of an exception during the LLM API call. """
     # Arrange
     mock_question = "Test question for merge?"
-    mock_llm_instance = MagicMock(spec=LLMInterface)
-    mock_llm_instance.generate_response.side_effect = Exception("API Failure")
-    MockLLMInterface.return_value = mock_llm_instance
+    mock_llm_instance = _FakeLLM(exc=Exception("API Failure"))
+    mock_llm_class.return_value = mock_llm_instance
 
     # Act
     merged = await merge_factors(
-        final_responses=FINAL_RESPONSES_BASIC,
+        final_responses=final_responses_basic,
         question=mock_question,
         top_k=5
     )
@@ -142,16 +160,15 @@ async def test_merge_llm_api_error(MockLLMInterface):
     assert merged == [] # Should return empty list on API error
 
 @pytest.mark.asyncio
-@patch('core.merge_logic.LLMInterface')
-async def test_merge_no_input_factors(MockLLMInterface):
+async def test_merge_no_input_factors(mock_llm_class):
     """ Test merging when the input responses contain no factors. """
     # Arrange
     mock_question = "Test question for merge?"
     resp_empty1 = AgentResponse(agent_name="Empty1", factors=[])
     resp_empty2 = AgentResponse(agent_name="Empty2", factors=[])
     empty_responses = {"E1": resp_empty1, "E2": resp_empty2}
-    mock_llm_instance = MagicMock(spec=LLMInterface) # Mock instance needed for patch
-    MockLLMInterface.return_value = mock_llm_instance
+    mock_llm_instance = _FakeLLM() # Instance needed for patch
+    mock_llm_class.return_value = mock_llm_instance
 
     # Act
     merged = await merge_factors(
@@ -163,7 +180,7 @@ async def test_merge_no_input_factors(MockLLMInterface):
     # Assert
     assert merged == [] # Should return empty list
     # Crucially, the LLM should NOT have been called
-    mock_llm_instance.generate_response.assert_not_called()
+    assert mock_llm_instance.prompts == []
 
 # Remove old algorithmic tests or adapt them significantly if needed.
 # The following tests are removed as they tested the old non-LLM logic:
@@ -0,0 +1,12 @@
+from utils.models import Factor
+
+
+def test_factor_equality_and_hash_ignore_case_and_whitespace():
+    a = Factor(name=" Battery Tech ", justification="J1", confidence=4)
+    b = Factor(name="battery tech", justification="J2", confidence=2)
+    assert a == b
+    assert len({a, b}) == 1
+
+def test_factor_to_dict_keeps_transcript_shape():
+    assert Factor("A", "J", 3).to_dict() == {"name": "A", "justification": "J", "confidence": 3}
+    assert Factor("A", "J", 3, endorsement_count=2).to_dict()["endorsement_count"] == 2
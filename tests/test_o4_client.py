@@ -3,17 +3,24 @@ import asyncio
 from unittest.mock import patch, MagicMock
 
 # Import the function to test
+from llm_clients import o4_client
 from llm_clients.o4_client import query_o4
 
+# Gemini and O4 client tests share one xdist worker (--dist loadgroup);
+# the mocked blocking calls run inline rather than on the client thread pools
+pytestmark = [pytest.mark.xdist_group(name="llm_clients"), pytest.mark.usefixtures("inline_llm_executors")]
+
 @pytest.mark.asyncio
 async def test_query_o4_success():
     """ Test successful query to O4 wrapper """
     mock_prompt = "Test prompt for O4"
     mock_response = "Successful O4 response"
 
-    # Patch the generate_response method of the llm_o4 instance within the o4_client module
-    # Since query_o4 uses asyncio.to_thread, we mock the underlying sync method
-    with patch('llm_clients.o4_client.llm_o4.generate_response', return_value=mock_response) as mock_generate:
+    # Patch the lazily created client; query_o4 runs its sync generate_response on a worker thread
+    mock_client = MagicMock()
+    with patch.object(o4_client, '_get_client', return_value=mock_client):
+        mock_generate = mock_client.generate_response
+        mock_generate.return_value = mock_response
         response = await query_o4(mock_prompt)
 
         # Assertions
@@ -28,11 +35,50 @@ async def test_query_o4_api_error():
     mock_exception = Exception("Simulated API Error")
 
     # Patch generate_response to raise an exception
-    with patch('llm_clients.o4_client.llm_o4.generate_response', side_effect=mock_exception) as mock_generate:
+    mock_client = MagicMock()
+    mock_client.generate_response.side_effect = mock_exception
+    with patch.object(o4_client, '_get_client', return_value=mock_client):
+        mock_generate = mock_client.generate_response
         # Expect the exception raised by generate_response to propagate
         with pytest.raises(Exception, match="Simulated API Error"):
             await query_o4(mock_prompt)
         
         mock_generate.assert_called_once_with(mock_prompt)
 
-# Add more tests for different scenarios if needed (e.g., specific error types) 
\ No newline at end of file
+@pytest.mark.asyncio
+async def test_query_o4_passes_response_format():
+    """ Structured-output requests forward response_format to generate_response """
+    from utils.prompts import FACTOR_LIST_RESPONSE_FORMAT
+    mock_client = MagicMock()
+    mock_client.generate_response.return_value = '{"factors": []}'
+    with patch.object(o4_client, '_get_client', return_value=mock_client):
+        response = await query_o4("Factor prompt", response_format=FACTOR_LIST_RESPONSE_FORMAT)
+
+    assert response == '{"factors": []}'
+    mock_client.generate_response.assert_called_once_with("Factor prompt", response_format=FACTOR_LIST_RESPONSE_FORMAT)
+
+# Add more tests for different scenarios if needed (e.g., specific error types) 
+@pytest.mark.asyncio
+async def test_query_o4_cache_reuses_response(monkeypatch):
+    """ With LLM_CACHE=1 an identical prompt is served without a second API call """
+    from utils.prompt_cache import PromptCache
+    monkeypatch.setenv("LLM_CACHE", "1")
+    monkeypatch.setattr(o4_client, "_cache", PromptCache("o4", cache_dir=None))
+
+    mock_client = MagicMock()
+    mock_client.generate_response.return_value = "Cached O4 response"
+    with patch.object(o4_client, '_get_client', return_value=mock_client):
+        mock_generate = mock_client.generate_response
+        first = await query_o4("Repeated prompt")
+        second = await query_o4("Repeated prompt")
+
+    assert first == second == "Cached O4 response"
+    mock_generate.assert_called_once_with("Repeated prompt")
+
+def test_o4_client_is_created_lazily_once():
+    """ Importing the module doesn't build the LLMInterface; the first use builds it once """
+    with patch.object(o4_client, '_llm_o4', None), patch.object(o4_client, 'LLMInterface') as mock_interface:
+        first = o4_client._get_client()
+        second = o4_client._get_client()
+    assert first is second
+    mock_interface.assert_called_once_with(model_key=o4_client.DEFAULT_MODEL)
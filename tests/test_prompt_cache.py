@@ -0,0 +1,34 @@
+from utils.prompt_cache import PromptCache, prompt_key
+
+def test_prompt_key_stable_and_distinct():
+    assert prompt_key("same prompt") == prompt_key("same prompt")
+    assert prompt_key("prompt a") != prompt_key("prompt b")
+    assert len(prompt_key("x")) == 32
+
+def test_cache_roundtrip_and_persistence(tmp_path):
+    cache = PromptCache("judge", cache_dir=str(tmp_path))
+    key = prompt_key("Q")
+    assert cache.get(key) is None
+    cache.set(key, "Overall Decision: Accept")
+    assert cache.get(key) == "Overall Decision: Accept"
+    cache.close()
+
+    # A fresh instance (empty memory layer) reads it back from disk
+    reopened = PromptCache("judge", cache_dir=str(tmp_path))
+    assert reopened.get(key) == "Overall Decision: Accept"
+    reopened.close()
+
+def test_memory_layer_is_bounded(tmp_path):
+    cache = PromptCache("judge", cache_dir=str(tmp_path), memory_size=2)
+    for i in range(3):
+        cache.set(f"k{i}", f"v{i}")
+    assert list(cache._memory) == ["k1", "k2"]
+    assert cache.get("k0") == "v0" # Evicted from memory, still on disk
+    cache.close()
+
+def test_memory_only_cache_never_touches_disk():
+    cache = PromptCache("probe", cache_dir=None)
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    assert cache.get("missing") is None
+    assert cache.path is None
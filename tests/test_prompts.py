@@ -0,0 +1,105 @@
+import pytest
+
+from utils.prompts import (
+    compile_template, render_judge_prompt, render_judge_v4_prompt, make_judge_renderer,
+    JUDGE_PROMPT_TEMPLATE, JUDGE_V4_PROMPT_TEMPLATE, CRITIQUE_PROMPT_TEMPLATE
+)
+
+def test_render_judge_prompts_match_format():
+    assert render_judge_prompt("Q?", "Base {x}", "Merged") == JUDGE_PROMPT_TEMPLATE.format(
+        question="Q?", baseline_answer="Base {x}", merged_answer="Merged")
+    assert render_judge_v4_prompt("Q?", "Answer") == JUDGE_V4_PROMPT_TEMPLATE.format(
+        question="Q?", synthesized_answer="Answer")
+
+def test_compile_template_handles_escaped_braces():
+    # CRITIQUE_PROMPT_TEMPLATE contains {{ }} escapes for its JSON example
+    fields = dict(question="Q", previous_factors="[]", other_agents_factors="{}", human_feedback="")
+    assert compile_template(CRITIQUE_PROMPT_TEMPLATE)(**fields) == CRITIQUE_PROMPT_TEMPLATE.format(**fields)
+
+def test_compile_template_matches_format_on_all_templates():
+    import string
+    import utils.prompts as prompts
+    for name in dir(prompts):
+        template = getattr(prompts, name)
+        if not name.endswith(("_TEMPLATE", "_PROMPT")) or not isinstance(template, str):
+            continue
+        fields = {f: f"<{f} {{x}} \"q\">" for _, f, _, _ in string.Formatter().parse(template) if f is not None}
+        assert compile_template(template)(**fields, unused="ignored") == template.format(**fields), name
+
+def test_compile_template_missing_field_raises_key_error():
+    with pytest.raises(KeyError):
+        compile_template("Q: {question}")()
+
+def test_compile_template_rejects_format_specs():
+    with pytest.raises(ValueError):
+        compile_template("{value:>10}")
+
+def test_make_judge_renderer_matches_full_render():
+    question = "Why {braces} matter?"
+    render = make_judge_renderer(question)
+    assert render("Base", "Merged {x}") == render_judge_prompt(question, "Base", "Merged {x}")
+
+def test_compiled_renderers_match_format():
+    from utils.prompts import (
+        render_baseline_prompt, render_critique_prompt, render_summarization_prompt,
+        render_freeform_critique_prompt, render_synthesis_user_prompt,
+        BASELINE_PROMPT_TEMPLATE, SUMMARIZATION_PROMPT_TEMPLATE,
+        FREEFORM_CRITIQUE_PROMPT_TEMPLATE, SYNTHESIS_USER_PROMPT_TEMPLATE,
+    )
+    cases = [
+        (render_baseline_prompt, BASELINE_PROMPT_TEMPLATE, dict(question="Q {x}?", top_k=3)),
+        (render_critique_prompt, CRITIQUE_PROMPT_TEMPLATE, dict(question="Q", previous_factors="P", other_agents_factors="O", human_feedback="")),
+        (render_summarization_prompt, SUMMARIZATION_PROMPT_TEMPLATE, dict(consensus_factors_details="C", all_justifications="J")),
+        (render_freeform_critique_prompt, FREEFORM_CRITIQUE_PROMPT_TEMPLATE, dict(question="Q", your_baseline="Y", other_baselines_formatted="O")),
+        (render_synthesis_user_prompt, SYNTHESIS_USER_PROMPT_TEMPLATE, dict(question="Q", initial_baselines_formatted="B", critique_texts_formatted="C")),
+    ]
+    for render, template, fields in cases:
+        assert render(**fields) == template.format(**fields)
+
+@pytest.mark.parametrize("top_k", [3, 10, 4, 5.0, "6"])
+def test_top_k_specialized_renderers_match_format(top_k):
+    from utils.prompts import (
+        BASELINE_PROMPT_TEMPLATE, MERGE_FACTORS_PROMPT, render_baseline_prompt, render_merge_factors_prompt
+    )
+    assert render_baseline_prompt(question="Q {x}?", top_k=top_k) == BASELINE_PROMPT_TEMPLATE.format(question="Q {x}?", top_k=top_k)
+    fields = dict(question="Q", formatted_factors="- {a}")
+    assert render_merge_factors_prompt(top_k=top_k, **fields) == MERGE_FACTORS_PROMPT.format(top_k=top_k, **fields)
+
+def test_factor_prompts_share_schema_preamble():
+    # Same leading bytes on every factor-list prompt, so provider prefix caches carry across calls
+    import utils.prompts as prompts
+    fields = dict(question="Q", top_k=3, previous_factors="[]", other_agents_factors="", human_feedback="", prose_baseline="B")
+    for name in ("BASELINE_PROMPT_TEMPLATE", "CRITIQUE_PROMPT_TEMPLATE", "CRITIQUE_PROSE_BASELINE_TEMPLATE",
+                 "CRITIQUE_AND_MERGE_PROSE_BASELINE_TEMPLATE"):
+        assert getattr(prompts, name).format(**fields).startswith(prompts.FACTOR_JSON_SCHEMA_PREAMBLE), name
+
+def test_synthesis_system_prompt_is_static():
+    # The system message must be byte-identical across calls for provider-side prefix caching
+    from utils.prompts import SYNTHESIS_SYSTEM_PROMPT, SYNTHESIS_USER_PROMPT_TEMPLATE
+    assert "{" not in SYNTHESIS_SYSTEM_PROMPT
+    assert SYNTHESIS_USER_PROMPT_TEMPLATE.rstrip().endswith("{question}")
+
+def test_prompt_constants_defined_once():
+    # A second definition would silently shadow the first (and double the module's string data)
+    import ast
+    import collections
+    import utils.prompts as prompts
+    with open(prompts.__file__, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    names = collections.Counter(
+        target.id
+        for node in tree.body if isinstance(node, ast.Assign)
+        for target in node.targets if isinstance(target, ast.Name)
+    )
+    assert [name for name, count in names.items() if count > 1] == []
+
+@pytest.mark.parametrize("name", [
+    "CRITIQUE_PROMPT_TEMPLATE", "CRITIQUE_PROSE_BASELINE_TEMPLATE", "MERGE_FACTORS_PROMPT", "REFINE_PROMPT_TEMPLATE",
+    "CRITIQUE_AND_MERGE_PROSE_BASELINE_TEMPLATE",
+])
+def test_templates_keep_placeholders_after_static_prefix(name):
+    import string
+    import utils.prompts as prompts
+    template = getattr(prompts, name)
+    prefix = template[:template.index("--- INPUT ---")]
+    assert all(field is None for _, field, _, _ in string.Formatter().parse(prefix))
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from utils import rate_limit
+from utils.rate_limit import RateLimiter, limiter_from_env
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_concurrent_acquires(monkeypatch):
+    delays = []
+
+    async def fake_sleep(seconds):
+        delays.append(seconds)
+
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", fake_sleep)
+
+    limiter = RateLimiter(per_minute=60)
+    await asyncio.gather(*(limiter.acquire() for _ in range(3)))
+
+    # First caller goes immediately, the others get the next one-second slots
+    assert delays == [pytest.approx(1.0, abs=0.1), pytest.approx(2.0, abs=0.1)]
+
+def test_rate_limiter_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        RateLimiter(per_minute=0)
+
+@pytest.mark.parametrize("value", ["fast", "0", "-5", "nan"])
+def test_limiter_from_env_ignores_bad_values(monkeypatch, value):
+    monkeypatch.setenv("LLM_QPM", value)
+    assert limiter_from_env("LLM_QPM") is None
+
+def test_limiter_from_env(monkeypatch):
+    monkeypatch.delenv("LLM_QPM", raising=False)
+    assert limiter_from_env("LLM_QPM") is None
+    monkeypatch.setenv("LLM_QPM", "30")
+    assert limiter_from_env("LLM_QPM").interval == pytest.approx(2.0)
@@ -1,35 +1,45 @@
 import pytest
 import asyncio
-import sys
-import os
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock, AsyncMock, call
 
-# Add project root to sys.path
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
-
 # Modules to test
 from core.summarizer import generate_summary
 from utils.models import Factor
-from utils.prompts import SUMMARIZATION_PROMPT_TEMPLATE # To check formatting
+
+# Keep this module's tests on one xdist worker (--dist loadgroup)
+pytestmark = pytest.mark.xdist_group(name="summary")
 
 # --- Test Data --- 
 
-MERGED_FACTOR_A = Factor(name="A", justification="(Agent1): JA1\n(Agent2): JA2", confidence=4.5)
-setattr(MERGED_FACTOR_A, 'endorsement_count', 2)
+MERGED_FACTOR_A = Factor(name="A", justification="(Agent1): JA1\n(Agent2): JA2", confidence=4.5, endorsement_count=2)
 
-MERGED_FACTOR_B = Factor(name="B", justification="(Agent1): JB1\n(Agent2): JB2", confidence=4.0)
-setattr(MERGED_FACTOR_B, 'endorsement_count', 2)
+MERGED_FACTOR_B = Factor(name="B", justification="(Agent1): JB1\n(Agent2): JB2", confidence=4.0, endorsement_count=2)
 
 MERGED_FACTORS_BASIC = [MERGED_FACTOR_A, MERGED_FACTOR_B]
 
+# One AsyncMock for the whole module, reset after each test, instead of building a new one per @patch
+_FAKE_QUERY_O4 = AsyncMock()
+
+@pytest.fixture
+def mock_query_o4():
+    try:
+        with patch('core.summarizer.query_o4', new=_FAKE_QUERY_O4):
+            yield _FAKE_QUERY_O4
+    finally:
+        _FAKE_QUERY_O4.reset_mock(return_value=True, side_effect=True)
+
+@pytest.fixture
+def printed(monkeypatch):
+    """ Records what the summarizer prints instead of patching each print call. """
+    lines = []
+    monkeypatch.setattr("core.summarizer.console", SimpleNamespace(print=lambda *args, **kwargs: lines.append(args)))
+    return lines
+
 # --- Test Cases --- 
 
 @pytest.mark.asyncio
-@patch('core.summarizer.query_o4', new_callable=AsyncMock) # Mock the LLM call
-@patch('core.summarizer.typer.secho') # Mock printing
-async def test_generate_summary_success(mock_secho, mock_query_o4):
+async def test_generate_summary_success(mock_query_o4, printed):
     """ Test successful summary generation and prompt formatting. """
     mock_llm_summary = "This is the final summary based on factors A and B."
     mock_query_o4.return_value = mock_llm_summary
@@ -37,28 +47,18 @@ async def test_generate_summary_success(mock_secho, mock_query_o4):
     summary = await generate_summary(MERGED_FACTORS_BASIC)
     
     assert summary == mock_llm_summary
-    mock_secho.assert_any_call("\nGenerating final summary...", fg='yellow')
+    assert any("Factors Sent to Summarizer" in str(args[0]) for args in printed)
     
     # Verify prompt formatting
     mock_query_o4.assert_awaited_once() 
     call_args, call_kwargs = mock_query_o4.call_args
     generated_prompt = call_args[0]
     
-    # Reconstruct expected prompt parts
-    expected_consensus_details = (
-        f"1. A (Endorsements: 2, Mean Confidence: 4.50)\n"
-        f"2. B (Endorsements: 2, Mean Confidence: 4.00)"
-    )
-    expected_justifications = (
-        f"Factor: A\n(Agent1): JA1\n(Agent2): JA2\n\n"
-        f"Factor: B\n(Agent1): JB1\n(Agent2): JB2\n"
-    )
-    expected_full_prompt = SUMMARIZATION_PROMPT_TEMPLATE.format(
-        consensus_factors_details=expected_consensus_details,
-        all_justifications=expected_justifications
-    )
-    
-    assert generated_prompt == expected_full_prompt
+    # Check the distinctive pieces rather than rebuilding the whole template
+    assert "1. A (Endorsements: 2, Mean Confidence: 4.50)" in generated_prompt
+    assert "2. B (Endorsements: 2, Mean Confidence: 4.00)" in generated_prompt
+    assert "Factor: A\n(Agent1): JA1\n(Agent2): JA2\n" in generated_prompt
+    assert "Factor: B\n(Agent1): JB1\n(Agent2): JB2\n" in generated_prompt
 
 @pytest.mark.asyncio
 async def test_generate_summary_no_factors():
@@ -67,9 +67,7 @@ async def test_generate_summary_no_factors():
     assert summary == "No consensus factors were identified to generate a summary."
 
 @pytest.mark.asyncio
-@patch('core.summarizer.query_o4', new_callable=AsyncMock) # Mock the LLM call
-@patch('core.summarizer.typer.secho') # Mock printing
-async def test_generate_summary_llm_error(mock_secho, mock_query_o4):
+async def test_generate_summary_llm_error(mock_query_o4, printed):
     """ Test summary generation when the LLM call raises an error. """
     mock_exception = Exception("Simulated LLM Error during summary")
     mock_query_o4.side_effect = mock_exception
@@ -79,4 +77,4 @@ async def test_generate_summary_llm_error(mock_secho, mock_query_o4):
     assert "Error: Failed to generate summary" in summary
     assert "Simulated LLM Error during summary" in summary
     mock_query_o4.assert_awaited_once() # Ensure it was called
-    mock_secho.assert_any_call("\nGenerating final summary...", fg='yellow') 
\ No newline at end of file
+    assert any("Factors Sent to Summarizer" in str(args[0]) for args in printed)
\ No newline at end of file
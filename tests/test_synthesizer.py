@@ -1,20 +1,15 @@
 # tests/test_synthesizer.py
 
+import copy
+
 import pytest
 import asyncio
 from unittest.mock import patch, AsyncMock, MagicMock, call
 from typing import Dict, Any, List, Optional, Callable
 
-# Make sure the path allows importing from core and utils
-import sys
-import os
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.dirname(current_dir)
-sys.path.insert(0, project_root)
-
+from core import synthesizer
 from core.synthesizer import synthesize_final_answer, _format_dict_for_prompt, _format_debate_rounds_for_prompt
-from utils.prompts import SYNTHESIS_PROMPT_TEMPLATE
-from llm_interface import LLMInterface # Need this for patching
+from utils.prompts import SYNTHESIS_SYSTEM_PROMPT, SYNTHESIS_USER_PROMPT_TEMPLATE
 
 # --- Test Fixtures --- 
 
@@ -42,6 +37,23 @@ def mock_debate_rounds() -> List[Dict[str, Any]]:
 def mock_progress_callback() -> MagicMock:
     return MagicMock()
 
+@pytest.fixture(scope="module")
+def _llm_proto() -> MagicMock:
+    # spec= introspects LLMInterface, so build the spec'd mock once per module; imported here so
+    # collecting this file doesn't pull in the LLM client stack on its own
+    from llm_interface import LLMInterface
+    return MagicMock(spec=LLMInterface)
+
+@pytest.fixture
+def mock_llm(_llm_proto) -> MagicMock:
+    """Per-test copy of the spec'd LLMInterface mock with fresh call-tracking attributes."""
+    m = copy.copy(_llm_proto)
+    # Shallow copies share child mocks, so always replace the ones the tests use
+    m.agenerate_response = AsyncMock()
+    m.close = MagicMock()
+    m.model_name = "mock-model"
+    return m
+
 # --- Test Helper Functions --- 
 
 def test_format_dict_for_prompt():
@@ -52,6 +64,14 @@ def test_format_dict_for_prompt():
     )
     assert _format_dict_for_prompt(data, "TestPrefix") == expected
 
+def test_format_dict_for_prompt_other_sizes():
+    # Sizes other than two take the generic join path
+    assert _format_dict_for_prompt({}, "P") == ""
+    assert _format_dict_for_prompt({"A": "x"}, "P") == "--- P from Agent: A ---\nx\n--- End P from Agent: A ---"
+    three = _format_dict_for_prompt({"A": "x", "B": "y", "C": "z"}, "P")
+    assert three.count("--- End P from Agent:") == 3
+    assert three.startswith("--- P from Agent: A ---") and three.endswith("--- End P from Agent: C ---")
+
 def test_format_debate_rounds_for_prompt(mock_debate_rounds):
     expected = (
         "=== Debate Round 1 ===\n\n"
@@ -61,20 +81,29 @@ def test_format_debate_rounds_for_prompt(mock_debate_rounds):
     )
     assert _format_debate_rounds_for_prompt(mock_debate_rounds) == expected
 
+def test_format_debate_rounds_for_prompt_multi_round():
+    rounds = [
+        {"round": 1, "responses": {"Agent1": "R1"}},
+        {"round": 2, "responses": {"Agent1": "R2"}},
+    ]
+    expected = (
+        "=== Debate Round 1 ===\n\n"
+        "--- Response from Agent: Agent1 ---\nR1\n--- End Response from Agent: Agent1 ---\n\n"
+        "=== Debate Round 2 ===\n\n"
+        "--- Response from Agent: Agent1 ---\nR2\n--- End Response from Agent: Agent1 ---"
+    )
+    assert _format_debate_rounds_for_prompt(rounds) == expected
+
 # --- Test Cases for synthesize_final_answer --- 
 
 @pytest.mark.asyncio
-@patch('core.synthesizer.LLMInterface') # Patch the LLMInterface class
-async def test_synthesize_final_answer_success(MockLLMInterface, mock_baselines, mock_debate_rounds, mock_progress_callback):
+@patch('core.synthesizer._get_llm') # Patch the pooled LLMInterface lookup
+async def test_synthesize_final_answer_success(mock_get_llm, mock_llm, mock_baselines, mock_debate_rounds, mock_progress_callback):
     """Test successful synthesis with a mock LLM response."""
     # Arrange
     mock_synthesizer_response = "This is the synthesized final answer."
-    mock_llm_instance = MagicMock(spec=LLMInterface)
-    # Mock the async behavior properly for generate_response called via to_thread
-    mock_llm_instance.generate_response = MagicMock(return_value=mock_synthesizer_response)
-    mock_llm_instance.close = MagicMock()
-    mock_llm_instance.model_name = "mock-model"
-    MockLLMInterface.return_value = mock_llm_instance
+    mock_llm.agenerate_response.return_value = mock_synthesizer_response
+    mock_get_llm.return_value = mock_llm
     
     question = "Synthesize this?"
 
@@ -89,39 +118,42 @@ async def test_synthesize_final_answer_success(MockLLMInterface, mock_baselines,
     # Assert
     assert result == mock_synthesizer_response
     
-    # Check LLMInterface initialization
-    MockLLMInterface.assert_called_once_with(model_key="gpt-o4-mini")
+    # Check the synthesizer client lookup
+    mock_get_llm.assert_called_once_with("gpt-o4-mini")
 
     # Check prompt formatting
     baselines_formatted = _format_dict_for_prompt(mock_baselines, "Baseline")
     critiques_formatted = _format_debate_rounds_for_prompt(mock_debate_rounds)
-    expected_prompt = SYNTHESIS_PROMPT_TEMPLATE.format(
+    expected_prompt = SYNTHESIS_USER_PROMPT_TEMPLATE.format(
         question=question,
         initial_baselines_formatted=baselines_formatted,
         critique_texts_formatted=critiques_formatted
     )
     
-    # Verify generate_response call arguments
-    mock_llm_instance.generate_response.assert_called_once_with(
+    # Verify agenerate_response call arguments
+    mock_llm.agenerate_response.assert_awaited_once_with(
         prompt=expected_prompt,
+        system_prompt=SYNTHESIS_SYSTEM_PROMPT,
         temperature=0.5
     )
     
-    mock_llm_instance.close.assert_called_once()
+    mock_llm.close.assert_not_called() # Pooled client is kept for the next call
 
-    # Check progress callback calls (simplified)
-    mock_progress_callback.assert_any_call("status", "Starting final answer synthesis...", use_console=True)
-    mock_progress_callback.assert_any_call("status", "Querying synthesizer model (mock-model)...", use_console=False)
-    mock_progress_callback.assert_any_call("status", "Synthesis complete.", use_console=True)
+    # report_progress forwards (update_type, data); use_console only affects its own printing
+    assert mock_progress_callback.call_args_list == [
+        call("status", "Starting final answer synthesis..."),
+        call("status", "Querying synthesizer model (mock-model)..."),
+        call("status", "Synthesis complete."),
+    ]
 
 
 @pytest.mark.asyncio
-@patch('core.synthesizer.LLMInterface')
-async def test_synthesize_final_answer_llm_init_fails(MockLLMInterface, mock_baselines, mock_debate_rounds, mock_progress_callback):
+@patch('core.synthesizer._get_llm')
+async def test_synthesize_final_answer_llm_init_fails(mock_get_llm, mock_baselines, mock_debate_rounds, mock_progress_callback):
     """Test when LLMInterface initialization fails."""
     # Arrange
     init_exception = ValueError("Invalid API Key")
-    MockLLMInterface.side_effect = init_exception
+    mock_get_llm.side_effect = init_exception
     
     question = "Synthesize this?"
 
@@ -136,21 +168,20 @@ async def test_synthesize_final_answer_llm_init_fails(MockLLMInterface, mock_bas
     # Assert
     expected_error = f"Error: Could not initialize synthesizer model. {init_exception}"
     assert result == expected_error
-    MockLLMInterface.assert_called_once_with(model_key="gpt-o4-mini")
-    mock_progress_callback.assert_any_call("error", f"Error initializing synthesizer LLM (gpt-o4-mini): {init_exception}", use_console=True)
+    mock_get_llm.assert_called_once_with("gpt-o4-mini")
+    assert mock_progress_callback.call_args_list == [
+        call("status", "Starting final answer synthesis..."),
+        call("error", f"Error initializing synthesizer LLM (gpt-o4-mini): {init_exception}"),
+    ]
 
 @pytest.mark.asyncio
-@patch('core.synthesizer.LLMInterface')
-async def test_synthesize_final_answer_llm_call_fails(MockLLMInterface, mock_baselines, mock_debate_rounds, mock_progress_callback):
-    """Test when the generate_response call fails."""
+@patch('core.synthesizer._get_llm')
+async def test_synthesize_final_answer_llm_call_fails(mock_get_llm, mock_llm, mock_baselines, mock_debate_rounds, mock_progress_callback):
+    """Test when the agenerate_response call fails."""
      # Arrange
     call_exception = Exception("API Timeout")
-    mock_llm_instance = MagicMock(spec=LLMInterface)
-    # Mock the async behavior properly for generate_response called via to_thread
-    mock_llm_instance.generate_response = MagicMock(side_effect=call_exception)
-    mock_llm_instance.close = MagicMock()
-    mock_llm_instance.model_name = "mock-model"
-    MockLLMInterface.return_value = mock_llm_instance
+    mock_llm.agenerate_response.side_effect = call_exception
+    mock_get_llm.return_value = mock_llm
     
     question = "Synthesize this?"
 
@@ -165,5 +196,55 @@ async def test_synthesize_final_answer_llm_call_fails(MockLLMInterface, mock_bas
     # Assert
     expected_error = f"Error: Synthesis failed due to LLM error: {call_exception}"
     assert result == expected_error
-    mock_progress_callback.assert_any_call("error", f"Error during synthesis call: {call_exception}", use_console=True)
-    mock_llm_instance.close.assert_called_once() # Close should still be called 
\ No newline at end of file
+    assert mock_progress_callback.call_args_list[-1] == call("error", f"Error during synthesis call: {call_exception}")
+    mock_llm.close.assert_not_called() # Pooled client survives a failed call
+
+@pytest.mark.asyncio
+@patch('core.synthesizer._get_llm')
+async def test_synthesis_cache_skips_repeat_llm_call(mock_get_llm, mock_llm, mock_baselines, mock_debate_rounds, tmp_path, monkeypatch):
+    """With SYNTHESIS_CACHE=1 a repeated synthesis is answered from the cache."""
+    from utils.prompt_cache import PromptCache
+    monkeypatch.setenv("SYNTHESIS_CACHE", "1")
+    monkeypatch.setattr(synthesizer, "_synthesis_cache", PromptCache("synthesis", cache_dir=str(tmp_path)))
+    mock_llm.agenerate_response.return_value = "Cached answer."
+    mock_get_llm.return_value = mock_llm
+
+    first = await synthesize_final_answer("Q?", mock_baselines, mock_debate_rounds, None, show_spinner=False)
+    second = await synthesize_final_answer("Q?", mock_baselines, mock_debate_rounds, None, show_spinner=False)
+
+    assert first == second == "Cached answer."
+    mock_llm.agenerate_response.assert_called_once()
+
+def test_get_llm_reuses_client_per_model_key(monkeypatch):
+    """The synthesizer builds one LLMInterface per model key and reuses it."""
+    monkeypatch.setattr(synthesizer, "_LLM_CACHE", {})
+    with patch('core.synthesizer.LLMInterface', side_effect=lambda model_key: MagicMock()) as mock_interface:
+        first = synthesizer._get_llm("gpt-o4-mini")
+        second = synthesizer._get_llm("gpt-o4-mini")
+        other = synthesizer._get_llm("other-model")
+    assert first is second
+    assert other is not first
+    assert mock_interface.call_count == 2
+    mock_interface.assert_any_call(model_key="gpt-o4-mini")
+
+@pytest.mark.asyncio
+async def test_synthesize_many_bounded_and_ordered(monkeypatch):
+    """synthesize_many keeps input order, never exceeds the concurrency bound and runs without spinners."""
+    in_flight = peak = 0
+
+    async def fake_synthesize(question, initial_baselines, debate_rounds, progress_callback, show_spinner=True):
+        nonlocal in_flight, peak
+        assert not show_spinner
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return f"answer to {question}"
+
+    monkeypatch.setattr(synthesizer, "synthesize_final_answer", fake_synthesize)
+    items = [{"question": f"Q{i}", "initial_baselines": {}, "debate_rounds": []} for i in range(6)]
+
+    results = await synthesizer.synthesize_many(items, concurrency=2)
+
+    assert results == [f"answer to Q{i}" for i in range(6)]
+    assert peak <= 2
@@ -0,0 +1,10 @@
+from dotenv import load_dotenv
+
+_loaded = False
+
+def ensure_env():
+    """Loads .env into os.environ once per process; every module calls this instead of load_dotenv()."""
+    global _loaded
+    if not _loaded:
+        load_dotenv()
+        _loaded = True
@@ -0,0 +1,52 @@
+import json
+import re
+
+try:
+    import orjson # Optional C parser, noticeably faster on the small JSON arrays the agents return
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError subclasses this, so callers can keep catching json.JSONDecodeError
+JSONDecodeError = json.JSONDecodeError
+
+def loads(text: str):
+    """json.loads, using orjson when it's installed."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def dumps_compact(obj) -> str:
+    """
+    Compact JSON for prompt interpolation: no whitespace, non-ASCII left as-is (an escaped
+    "\\u00e9" is several tokens for one character). Uses orjson when it's installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+_FENCE_RE = re.compile(r"^```[A-Za-z]*\s*|\s*```$")
+_TRAILING_COMMA_RE = re.compile(r",\s*([\]}])")
+_SMART_QUOTES = str.maketrans({"\u201c": '"', "\u201d": '"', "\u2018": "'", "\u2019": "'"})
+
+def repair(text: str) -> str:
+    """
+    Best-effort cleanup of the usual LLM JSON slips: ```json fences, intro/outro text around
+    the JSON, smart quotes and trailing commas. Doesn't try to fix anything structural.
+    """
+    text = _FENCE_RE.sub("", text.strip())
+    start = min((i for i in (text.find("["), text.find("{")) if i != -1), default=0)
+    end = max(text.rfind("]"), text.rfind("}"))
+    if end > start:
+        text = text[start:end + 1]
+    text = text.translate(_SMART_QUOTES)
+    return _TRAILING_COMMA_RE.sub(r"\1", text)
+
+def loads_lenient(text: str):
+    """
+    loads(), retrying once on repair(text) when the strict parse fails, so well-formed
+    responses cost nothing extra. Raises JSONDecodeError if the repaired text doesn't parse either.
+    """
+    try:
+        return loads(text)
+    except JSONDecodeError:
+        return loads(repair(text))
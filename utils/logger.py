@@ -1,11 +1,56 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
-from rich.logging import RichHandler
 
 LOG_FILE = "debate.log"
+LOG_FILE_BUFFER_SIZE = 64 * 1024
 
-def setup_logger(level=logging.INFO, log_file=LOG_FILE):
-    """Configures the root logger for the application."""
+# Background listener that owns the real (console/file) handlers; see setup_logger
+_listener = None
+
+class _BufferedFileHandler(logging.StreamHandler):
+    """
+    Writes to a block-buffered file and only flushes for WARNING and above (and on close),
+    so routine INFO/DEBUG lines are coalesced into a few large writes.
+    """
+
+    def __init__(self, filename, mode='a', buffer_size=LOG_FILE_BUFFER_SIZE):
+        super().__init__(open(filename, mode, buffering=buffer_size, encoding='utf-8'))
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.WARNING:
+                self.stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self.acquire()
+        try:
+            try:
+                self.flush()
+                self.stream.close()
+            finally:
+                super().close()
+        finally:
+            self.release()
+
+def _stop_listener():
+    """Drains the log queue and closes the real handlers."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(_stop_listener)
+
+def setup_logger(level=logging.INFO, log_file=LOG_FILE, rich=False):
+    """Configures the root logger for the application (rich=True logs to the console via RichHandler)."""
     log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     date_format = "%Y-%m-%d %H:%M:%S"
     
@@ -19,37 +64,48 @@ def setup_logger(level=logging.INFO, log_file=LOG_FILE):
     # (Though ideally it should only be called once)
     if logger.hasHandlers():
         logger.handlers.clear()
+    _stop_listener() # Flush/close the handlers from a previous call
 
-    # --- Console Handler (Rich) --- 
-    # Only add handler if running interactively (not imported for tests?)
-    # For simplicity, let's always add it for now.
-    console_handler = RichHandler(
-        rich_tracebacks=True, 
-        markup=True, # Allow rich markup in log messages
-        level=level # Set level for this handler
-    )
-    console_handler.setFormatter(formatter) # Use basic format for console too?
-                                            # RichHandler does its own formatting, 
-                                            # but setting formatter might be needed for levelname/name?
-                                            # Let's try without setFormatter first for console.
-    # logger.addHandler(console_handler)
-    # Let's use a basic StreamHandler for console for now to match file format
-    # and avoid potential double formatting with Rich console in main script.
-    console_handler_basic = logging.StreamHandler(sys.stdout)
-    console_handler_basic.setLevel(level)
-    console_handler_basic.setFormatter(formatter)
-    logger.addHandler(console_handler_basic)
+    # --- Console Handler --- 
+    if rich:
+        # Imported here so the plain-stdout default doesn't pay for loading rich/pygments
+        from rich.logging import RichHandler
+        # RichHandler does its own time/level formatting, so no formatter here
+        console_handler = RichHandler(
+            rich_tracebacks=True, 
+            markup=True, # Allow rich markup in log messages
+            level=level # Set level for this handler
+        )
+    else:
+        # Plain StreamHandler matches the file format and avoids double formatting
+        # with the Rich console in the main scripts
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(level)
+        console_handler.setFormatter(formatter)
+    handlers = [console_handler]
 
     # --- File Handler --- 
+    file_error = None
     try:
-        file_handler = logging.FileHandler(log_file, mode='a') # Append mode
+        file_handler = _BufferedFileHandler(log_file, mode='a') # Append mode
         file_handler.setLevel(level) # Log everything at INFO level or above to file
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
     except Exception as e:
-        logging.error(f"Failed to set up file handler for {log_file}: {e}", exc_info=True)
+        file_error = e
+
+    # Callers only enqueue records; a background thread does the formatting and the writes
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    global _listener
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    if file_error is not None:
+        logging.error("Failed to set up file handler for %s: %s", log_file, file_error, exc_info=file_error)
 
-    logging.info(f"Logger configured. Level: {logging.getLevelName(level)}. Log file: {log_file}")
+    # %-style args: the message is only formatted if a handler actually emits it
+    logging.info("Logger configured. Level: %s. Log file: %s", logging.getLevelName(level), log_file)
 
 # Example usage:
 # if __name__ == '__main__':
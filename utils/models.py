@@ -1,22 +1,40 @@
+import sys
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import List, Optional, Union
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Factor:
     """Represents a single factor identified by an LLM agent."""
     name: str
     justification: str
     confidence: float # Store mean confidence after merge
+    endorsement_count: Optional[int] = field(default=None, compare=False) # Set by merges that track it
+    # Normalized name and its hash, computed once for the set/dict-heavy merge code
+    _key: str = field(init=False, repr=False, compare=False)
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Interned: the same few names recur across agents and rounds, so equal keys share one object
+        key = sys.intern(self.name.strip().lower())
+        object.__setattr__(self, "_key", key)
+        object.__setattr__(self, "_hash", hash(key))
 
     def __hash__(self):
         # Allow factors to be used in sets/dictionaries based on name
-        return hash(self.name.strip().lower())
+        return self._hash
 
     def __eq__(self, other):
         # Factors are considered equal if their names match (case-insensitive)
         if not isinstance(other, Factor):
             return NotImplemented
-        return self.name.strip().lower() == other.name.strip().lower()
+        return self._key == other._key
+
+    def to_dict(self) -> dict:
+        """Plain dict for transcripts/progress payloads (slots dataclasses have no __dict__)."""
+        data = {"name": self.name, "justification": self.justification, "confidence": self.confidence}
+        if self.endorsement_count is not None:
+            data["endorsement_count"] = self.endorsement_count
+        return data
 
 @dataclass
 class AgentResponse:
@@ -26,6 +44,21 @@ class AgentResponse:
     critique: Optional[str] = None # Critique of others' factors from previous round
     raw_response: Optional[str] = None # Store the raw LLM output for debugging/logging
 
+    def __post_init__(self):
+        self.agent_name = sys.intern(self.agent_name) # Handful of agent names, reused as dict keys everywhere
+
+@dataclass(frozen=True, slots=True)
+class Ok:
+    """Successful text output from an LLM step."""
+    value: str
+
+@dataclass(frozen=True, slots=True)
+class Err:
+    """Failed LLM step, carrying the error message instead of an "Error: ..." string."""
+    msg: str
+
+Result = Union[Ok, Err]
+
 # Example Usage:
 # factor1 = Factor(name="Battery Tech", justification="Key enabler", confidence=5)
 # factor2 = Factor(name=" Charging Infrastructure ", justification="Range anxiety", confidence=4)
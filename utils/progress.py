@@ -0,0 +1,53 @@
+import itertools
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from rich.console import Console
+
+console = Console()
+logger = logging.getLogger(__name__)
+
+# Long strings in dict payloads are sent to the callback as a preview + ref instead of in full
+MAX_CB_PAYLOAD = 8 * 1024
+CB_PREVIEW_CHARS = 512
+MAX_PAYLOAD_REFS = 256 # Oldest full texts are dropped past this
+
+_payload_refs: "OrderedDict[int, str]" = OrderedDict()
+_payload_ref_ids = itertools.count(1)
+_payload_refs_lock = threading.Lock() # Web UI fetches refs from Flask request threads
+
+def _cap_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Replaces oversized string values with {"_ref", "preview", "len"}; the full text stays retrievable by ref."""
+    capped = {}
+    for key, value in data.items():
+        if isinstance(value, str) and len(value) > MAX_CB_PAYLOAD:
+            with _payload_refs_lock:
+                ref = next(_payload_ref_ids)
+                _payload_refs[ref] = value
+                while len(_payload_refs) > MAX_PAYLOAD_REFS:
+                    _payload_refs.popitem(last=False)
+            value = {"_ref": ref, "preview": value[:CB_PREVIEW_CHARS], "len": len(value)}
+        capped[key] = value
+    return capped
+
+def get_progress_payload(ref: int) -> Optional[str]:
+    """Returns the full text behind a capped progress payload, or None if it has been evicted."""
+    with _payload_refs_lock:
+        return _payload_refs.get(ref)
+
+def report_progress(callback: Optional[Callable[[str, Any], None]], update_type: str, data: Any, use_console: bool = True):
+    """Safely calls the progress callback (capping large dict fields) or prints to console."""
+    if callback:
+        # Callbacks that just print (CLI) set full_payload and get the text inline
+        if isinstance(data, dict) and not getattr(callback, "full_payload", False):
+            data = _cap_payload(data)
+        try:
+            callback(update_type, data)
+        except Exception as e:
+            logger.error("Error in progress callback: %s", e, exc_info=True)
+            if use_console:
+                console.print(f"[Callback Error] [{update_type.upper()}] {data}")
+    elif use_console:
+        console.print(f"[{update_type.upper()}] {data}")
@@ -0,0 +1,79 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "llmdebate2")
+
+def prompt_key(prompt: str) -> str:
+    """Stable cache key for a fully formatted prompt."""
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+
+class PromptCache:
+    """
+    Prompt-hash -> LLM response cache: a small in-memory LRU in front of a sqlite file.
+
+    Hot keys are served from memory without touching disk; the sqlite layer makes
+    responses survive across runs. Disk errors are logged and treated as misses.
+    Pass cache_dir=None for a memory-only cache.
+    """
+
+    def __init__(self, name: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, memory_size: int = 1024):
+        self.path = os.path.join(cache_dir, f"{name}.sqlite") if cache_dir else None
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock() # Clients call in from worker threads too
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL)")
+        return self._conn
+
+    def _remember(self, key: str, response: str):
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            if self.path is None:
+                return None
+            try:
+                row = self._connect().execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                logger.warning("Prompt cache read failed (%s): %s", self.path, e)
+                return None
+            if row is None:
+                return None
+            self._remember(key, row[0])
+            return row[0]
+
+    def set(self, key: str, response: str):
+        with self._lock:
+            self._remember(key, response)
+            if self.path is None:
+                return
+            try:
+                conn = self._connect()
+                conn.execute("INSERT OR REPLACE INTO responses (key, response) VALUES (?, ?)", (key, response))
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("Prompt cache write failed (%s): %s", self.path, e)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
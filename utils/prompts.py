@@ -1,44 +1,73 @@
 # utils/prompts.py
 
-BASELINE_PROMPT_TEMPLATE = """
-Q: {question}
+import string
+from typing import Callable, Sequence
 
-Identify the top {top_k} factors relevant to the question.
-Format your response as a JSON array, where each object represents a factor and has the following keys:
+# Byte-identical opening of every factor-list prompt (baseline, round critique, prose critique), so
+# within an agent's session the provider's prefix cache carries over from one of these calls to the next.
+# Task-specific instructions and the INPUT section follow it.
+FACTOR_JSON_SCHEMA_PREAMBLE = """Respond with factors as JSON: a JSON object of the form {"factors": [...]}, where each element of "factors" is a factor object with the following keys:
 - "factor_name": A string containing the descriptive name of the factor.
 - "justification": A string containing 1-2 sentences explaining the factor's relevance.
 - "confidence": A number (integer or float) between 1 and 5 (inclusive), with 5 being the highest confidence.
+Output only that JSON object.
+"""
+_FACTOR_JSON_PREAMBLE_FMT = FACTOR_JSON_SCHEMA_PREAMBLE.replace("{", "{{").replace("}", "}}") # For use inside format templates
+
+BASELINE_PROMPT_TEMPLATE = _FACTOR_JSON_PREAMBLE_FMT + """
+Identify the top {top_k} factors relevant to the question in the INPUT section below.
 
-Example format:
-[
-  {{
-    "factor_name": "Example Factor 1",
-    "justification": "This is why factor 1 is relevant.",
-    "confidence": 4.5
-  }},
-  {{
-    "factor_name": "Example Factor 2",
-    "justification": "This is why factor 2 is relevant.",
-    "confidence": 3
-  }}
-]
-
-CRITICAL: Output ONLY the JSON array. Do not include any introductory text, explanations, or markdown formatting like ```json before or after the JSON array.
+--- INPUT ---
+Q: {question}
 """
 
-# REPLACE the existing critique prompt with the improved version
-CRITIQUE_PROMPT_TEMPLATE = """
-Context:
-Original Question: {question}
+# Batched variant for dataset runs: one request answers several questions, so the instructions
+# are paid for once per batch. Parsed by core.debate_engine._parse_factor_batch.
+BASELINE_BATCH_PROMPT_TEMPLATE = """
+You will be given {batch_size} questions labelled Q1..Q{batch_size}.
+For each question, identify the top {top_k} factors relevant to it.
+Return a JSON object mapping each label to that question's factor array, e.g. {{"Q1": [...], "Q2": [...]}}. Each factor object has the following keys:
+- "factor_name": A string containing the descriptive name of the factor.
+- "justification": A string containing 1-2 sentences explaining the factor's relevance.
+- "confidence": A number (integer or float) between 1 and 5 (inclusive), with 5 being the highest confidence.
 
-Your previous factors/justifications (Round N-1):
-{previous_factors}
+Questions:
+{questions_block}
+"""
 
-Other agents' factors/justifications this round (Round N):
-{other_agents_factors}
+# Output contract for the factor-list prompts (baseline/critique), enforced by the provider (structured outputs /
+# JSON mode) instead of worked examples in the prompt. OpenAI strict schemas need an object at the top
+# level, so the array is wrapped in {"factors": [...]}; _parse_factor_list picks the array out.
+FACTOR_LIST_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "factors": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "factor_name": {"type": "string"},
+                    "justification": {"type": "string"},
+                    "confidence": {"type": "number"},
+                },
+                "required": ["factor_name", "justification", "confidence"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["factors"],
+    "additionalProperties": False,
+}
+FACTOR_LIST_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "factors", "strict": True, "schema": FACTOR_LIST_SCHEMA},
+}
 
-Human feedback for this round (if any):
-{human_feedback}
+# REPLACE the existing critique prompt with the improved version
+# Templates keep their static instructions/examples first and the per-call fields in a
+# trailing INPUT section, so providers' automatic prefix caching can reuse the shared prefix.
+CRITIQUE_PROMPT_TEMPLATE = _FACTOR_JSON_PREAMBLE_FMT + """
+You are one of several agents in a multi-round factor debate. The original question, your previous factors, the other agents' factors and any human feedback are given in the INPUT section at the end.
 
 Instructions for Generating Your Response for Round N+1:
 You MUST perform the following steps:
@@ -56,28 +85,19 @@ You MUST perform the following steps:
     *   Your justifications should reflect the critique process. If you adopt a factor from another agent, mention it. If you modify a factor based on disagreement, explain the change. If you drop a factor, explain why based on step 2.
 
 Output Format:
-Your final output for this round MUST be ONLY a single JSON array containing your revised factors. Each object must have keys "factor_name", "justification", and "confidence" (float 1.0-5.0).
-
-Example format:
-[
-  {{
-    "factor_name": "Revised Factor A",
-    "justification": "Initially similar to Agent X's factor, but refined confidence based on their justification regarding Y.",
-    "confidence": 4.5
-  }},
-  {{
-    "factor_name": "New Factor B (from Agent Z)",
-    "justification": "Adopted from Agent Z as it highlights the crucial aspect of [detail], which my previous list missed.",
-    "confidence": 4.0
-  }},
-  {{
-    "factor_name": "Disagreeing Factor C",
-    "justification": "Retained despite Agent X flagging it; their critique overlooks the importance of [counter-argument].",
-    "confidence": 5.0
-  }}
-]
-
-CRITICAL: Output ONLY the JSON array `[...]`. Do not include the critique text (steps 1 & 2), introductory sentences, explanations, or markdown formatting like ```json before or after the JSON array itself. The critique happens internally to produce the final JSON.
+Return your revised factors in the JSON object described above. The critique (steps 1 & 2) happens internally to produce the final JSON; do not output it.
+
+--- INPUT ---
+Original Question: {question}
+
+Your previous factors/justifications (Round N-1):
+{previous_factors}
+
+Other agents' factors/justifications this round (Round N):
+{other_agents_factors}
+
+Human feedback for this round (if any):
+{human_feedback}
 """
 
 # Note: This prompt is defined in core/merge_logic.py, not here.
@@ -129,12 +149,8 @@ Q: {question}
 Please provide a comprehensive, well-reasoned answer to the question above. Structure your answer clearly.
 """
 
-CRITIQUE_PROSE_BASELINE_TEMPLATE = """
-Context:
-Original Question: {question}
-
-Provided Baseline Answer:
-{prose_baseline}
+CRITIQUE_PROSE_BASELINE_TEMPLATE = _FACTOR_JSON_PREAMBLE_FMT + """
+You will critique a baseline answer to a question. The Original Question and the Provided Baseline Answer are given in the INPUT section at the end.
 
 Your Task:
 1. Critically evaluate the Provided Baseline Answer in response to the Original Question.
@@ -142,35 +158,21 @@ Your Task:
 3. Based on your critique, extract or formulate the most important factors (around 5-7) that should be considered for a comprehensive answer.
 
 Output Format:
-Format your extracted/formulated factors STRICTLY as a JSON array. Each object in the array must have the following keys:
-- "factor_name": A string containing the descriptive name of the factor.
-- "justification": A string containing 1-2 sentences explaining the factor's relevance *based on your critique of the baseline*. Mention how it addresses a strength, weakness, or omission.
-- "confidence": A number (integer or float) between 1 and 5 (inclusive), reflecting your confidence in the factor's importance for answering the original question after considering the baseline.
-
-Example:
-[
-  {{
-    "factor_name": "Baseline Strength X",
-    "justification": "The baseline correctly identified X, which is crucial because...",
-    "confidence": 5
-  }},
-  {{
-    "factor_name": "Missing Factor Y",
-    "justification": "The baseline omitted Y, which is important for considering the aspect of...",
-    "confidence": 4
-  }}
-]
-
-CRITICAL: Output ONLY the JSON array. Do not include your critique text, introductory sentences, explanations, or markdown formatting like ```json before or after the JSON array.
-"""
+Return the factors in the JSON object described above. Each justification should explain the factor's relevance *based on your critique of the baseline*: mention how it addresses a strength, weakness, or omission. Confidence reflects the factor's importance for answering the original question after considering the baseline.
+
+--- INPUT ---
+Original Question: {question}
 
+Provided Baseline Answer:
+{prose_baseline}
+"""
 # Optional: Could be used for the anchor agent's self-critique, or reuse the main critique prompt.
 # SELF_CRITIQUE_PROSE_BASELINE_TEMPLATE = CRITIQUE_PROSE_BASELINE_TEMPLATE 
 
 # --- V2/V3 Merge Factors Prompt --- 
 MERGE_FACTORS_PROMPT = """
 You are an expert synthesis AI tasked with merging factors from a multi-agent debate.
-You will be given a list of factors related to the question: "{question}"
+You will be given a list of factors related to a question (both are in the INPUT section at the end).
 Each factor includes a name, justification, confidence score (1-5), and the proposing agent.
 
 Your Goal: Synthesize the collective insights into a concise, comprehensive, and ranked list of the *most important and distinct* factors, reflecting the nuances of the debate.
@@ -184,12 +186,13 @@ Your Task:
     *   The synthesized `confidence` score (float 1.0-5.0) must reflect the overall support (number of agents discussing the concept) and average certainty for the concept based on original confidences.
 4.  **Ensure Breadth and Criticality:** When selecting concepts for synthesis, consider not only how frequently they were mentioned but also their *importance* to answering the original question. Ensure critical aspects (e.g., potential risks, financial considerations, regulatory impacts) are represented if discussed, even if only by one or two agents.
 5.  **Rank Synthesized Factors:** Rank the final list of synthesized factors based on their overall importance, strength of support/confidence, and relevance to the original question.
-6.  **Return Top K:** Return **only** the top {top_k} highest-ranked synthesized factors.
+6.  **Return Top K:** Return **only** the top K highest-ranked synthesized factors, where K is given at the end of the input.
 
 Output Format:
 Output the result as a single, valid JSON list containing the synthesized factor objects. Each object in the list must have the keys "name", "justification", and "confidence".
 
-CRITICAL: You MUST output ONLY the JSON list `[...]`. Ensure the JSON is strictly valid. Do NOT include any introductory text, explanations, summaries, or markdown formatting like ```json before or after the JSON list.
+--- INPUT ---
+Question: "{question}"
 
 Factors from the debate:
 {formatted_factors}
@@ -197,12 +200,43 @@ Factors from the debate:
 Please provide the top {top_k} synthesized factors in JSON list format:
 """
 
+# --- V2 Fused Critique + Merge Prompt (zero-round runs) ---
+# One call instead of a critique per agent followed by MERGE_FACTORS_PROMPT
+CRITIQUE_AND_MERGE_PROSE_BASELINE_TEMPLATE = _FACTOR_JSON_PREAMBLE_FMT + """
+You will critique a baseline answer to a question and produce the final ranked list of factors for a comprehensive answer. The Original Question, the Provided Baseline Answer and K are given in the INPUT section at the end.
+
+Your Task:
+1. Critically evaluate the Provided Baseline Answer: its key strengths and weaknesses, considering completeness, correctness, potential biases and missing perspectives.
+2. From that critique, formulate the important factors for a comprehensive answer, merging any that describe the same underlying concept.
+3. Rank them by importance to the original question and keep only the top K.
+
+Output Format:
+Return the factors in the JSON object described above, most important first. Each justification should refer to what the baseline got right, wrong or left out.
+
+--- INPUT ---
+Original Question: {question}
+
+Provided Baseline Answer:
+{prose_baseline}
+
+Return the top {top_k} factors:
+"""
 # --- V3 Refinement Prompt --- 
 REFINE_PROMPT_TEMPLATE = """
 You are an expert editor AI. You will be given an original baseline answer (prose) to a question, and a summary of key insights derived from a multi-agent debate on the same question.
 
-Your task is to **integrate** the key insights from the debate summary into the original baseline answer to produce a refined, comprehensive final answer.
+Your task is to **integrate** the key insights from the debate summary into the original baseline answer to produce a refined, comprehensive final answer. The question, baseline and summary are given in the INPUT section at the end.
+
+**Instructions:**
+1.  Thoroughly understand both the original baseline and the debate summary.
+2.  Rewrite the baseline answer, incorporating the valid points, stronger arguments, specific examples, or refined perspectives mentioned in the debate summary.
+3.  **Preserve the structure, scope, and level of detail** of the original baseline answer as much as possible. Do *not* simply replace the baseline with the summary.
+4.  Ensure the final refined answer is coherent, well-structured, and addresses the original question comprehensively, benefiting from both the initial analysis and the debate's refinements.
+5.  If the debate summary contradicts the baseline on a factual point, prioritize the likely correct information, potentially noting the discrepancy subtly if appropriate.
+
+Output **only** the final refined prose answer. Do not include introductory phrases like "Here is the refined answer:".
 
+--- INPUT ---
 **Original Question:** {question}
 
 **Original Baseline Answer:**
@@ -214,15 +248,6 @@ Your task is to **integrate** the key insights from the debate summary into the
 ```
 {debate_summary}
 ```
-
-**Instructions:**
-1.  Thoroughly understand both the original baseline and the debate summary.
-2.  Rewrite the baseline answer, incorporating the valid points, stronger arguments, specific examples, or refined perspectives mentioned in the debate summary.
-3.  **Preserve the structure, scope, and level of detail** of the original baseline answer as much as possible. Do *not* simply replace the baseline with the summary.
-4.  Ensure the final refined answer is coherent, well-structured, and addresses the original question comprehensively, benefiting from both the initial analysis and the debate's refinements.
-5.  If the debate summary contradicts the baseline on a factual point, prioritize the likely correct information, potentially noting the discrepancy subtly if appropriate.
-
-Output **only** the final refined prose answer. Do not include introductory phrases like "Here is the refined answer:".
 """
 
 # Optional: Could be used for the anchor agent's self-critique, or reuse the main critique prompt.
@@ -253,26 +278,15 @@ Output Format:
 Provide your critique and refined stance as clear, structured prose. Use headings or bullet points if helpful. Do NOT output JSON.
 """
 
-# --- V4 Free-Form Debate Round Prompt (Placeholder) ---
-# TODO: Define this prompt for subsequent free-form rounds if implementing multi-round V4 debate.
-FREEFORM_DEBATE_ROUND_PROMPT_TEMPLATE = """(Placeholder)"""
-
 # --- V4 Synthesis Prompt --- 
-SYNTHESIS_PROMPT_TEMPLATE = """
-You are an expert AI tasked with synthesizing a final, comprehensive answer based on a multi-agent discussion. You will receive the original question, several initial baseline answers generated independently by different AI agents, and the subsequent free-form critique/debate text from those agents.
+# Synthesis prompt split for the chat API: the instructions go out as a byte-identical system
+# message on every call (so provider-side prompt caching can reuse that prefix), and only the
+# materials vary. The question comes last so the cacheable prefix is as long as possible.
+SYNTHESIS_SYSTEM_PROMPT = """
+You are an expert AI tasked with synthesizing a final, comprehensive answer based on a multi-agent discussion. You will receive several initial baseline answers generated independently by different AI agents, the subsequent free-form critique/debate text from those agents, and the original question.
 
 Your Goal: Produce the best possible single prose answer to the original question, leveraging the diverse perspectives, critiques, and arguments presented in the provided materials.
 
-Input Materials:
-
-1.  **Original Question:** {question}
-
-2.  **Initial Baseline Answers:**
-{initial_baselines_formatted}
-
-3.  **Free-Form Critique/Debate Text (Round 1):**
-{critique_texts_formatted}
-
 Your Task:
 1.  **Understand the Landscape:** Carefully read and analyze all provided baselines and the critique texts. Identify the core themes, key points of agreement, significant disagreements, unique perspectives, and strongest arguments.
 2.  **Synthesize Holistically:** Construct a single, coherent, and well-structured prose answer that addresses the original question comprehensively.
@@ -284,6 +298,18 @@ Output Format:
 Output ONLY the final synthesized prose answer. Do not include introductory phrases like "Here is the synthesized answer:", summaries of the input, or meta-commentary on the process.
 """
 
+SYNTHESIS_USER_PROMPT_TEMPLATE = """
+Input Materials:
+
+1.  **Initial Baseline Answers:**
+{initial_baselines_formatted}
+
+2.  **Free-Form Critique/Debate Text (Round 1):**
+{critique_texts_formatted}
+
+3.  **Original Question:** {question}
+"""
+
 # --- V4 Intrinsic Judge Prompt ---
 JUDGE_V4_PROMPT_TEMPLATE = """
 Evaluate the quality of the following answer in response to the question: "{question}"
@@ -314,4 +340,103 @@ Overall Decision: Accept
 Example 2 (Reject):
 Overall Decision: Reject
 Reasoning: The answer failed to address the core economic factors mentioned in the question.
-"""
\ No newline at end of file
+"""
+
+
+# --- Pre-compiled template renderers ---
+# str.format re-parses the whole template on every call; these parse it once at import and
+# generate a function whose body is a single f-string over the literal fragments and fields.
+
+def compile_template(template: str) -> Callable[..., str]:
+    """Returns render(**fields) equivalent to template.format(**fields) for plain {name} placeholders."""
+    # Literals and field names go in via the namespace, never into the generated source,
+    # so neither braces in the template nor odd field names need escaping
+    namespace = {}
+    pieces = []
+    for i, (literal, field_name, format_spec, conversion) in enumerate(string.Formatter().parse(template)):
+        if format_spec or conversion:
+            raise ValueError(f"compile_template only supports plain placeholders, got {{{field_name}!{conversion}:{format_spec}}}")
+        if literal:
+            namespace[f"_l{i}"] = literal
+            pieces.append(f"{{_l{i}}}")
+        if field_name is not None:
+            namespace[f"_k{i}"] = field_name
+            pieces.append(f"{{fields[_k{i}]}}") # Missing fields raise KeyError, like .format
+
+    source = 'def render(**fields):\n    return f"' + "".join(pieces) + '"\n'
+    exec(source, namespace)
+    return namespace["render"]
+
+def _escape_braces(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+def partial_template(template: str, **fixed: str) -> str:
+    """
+    Partially evaluates a template: the given fields are substituted in (brace-escaped), the
+    other placeholders are left for a later .format / compile_template render.
+    """
+    parts = []
+    for literal, field_name, format_spec, conversion in string.Formatter().parse(template):
+        parts.append(_escape_braces(literal))
+        if field_name is None:
+            continue
+        if field_name in fixed:
+            parts.append(_escape_braces(str(fixed[field_name])))
+        else:
+            parts.append("{" + field_name + (f"!{conversion}" if conversion else "") + (f":{format_spec}" if format_spec else "") + "}")
+    return "".join(parts)
+
+# Templates rendered on hot paths are parsed once here; each render_* returns the same text as
+# the corresponding TEMPLATE.format(...) call
+_render_judge = compile_template(JUDGE_PROMPT_TEMPLATE)
+_render_judge_v4 = compile_template(JUDGE_V4_PROMPT_TEMPLATE)
+render_critique_prompt = compile_template(CRITIQUE_PROMPT_TEMPLATE)
+render_summarization_prompt = compile_template(SUMMARIZATION_PROMPT_TEMPLATE)
+render_freeform_critique_prompt = compile_template(FREEFORM_CRITIQUE_PROMPT_TEMPLATE)
+render_synthesis_user_prompt = compile_template(SYNTHESIS_USER_PROMPT_TEMPLATE)
+_render_baseline_batch = compile_template(BASELINE_BATCH_PROMPT_TEMPLATE)
+
+# top_k comes from a tiny set in practice, so those values are substituted in once here and a
+# render only fills the per-question fields; any other top_k goes through the general renderer
+_COMMON_TOP_K = (3, 5, 7, 10)
+
+def _specialize_top_k(template: str) -> Callable[..., str]:
+    """Like compile_template(template), with renderers pre-specialized for the _COMMON_TOP_K values."""
+    general = compile_template(template)
+    by_k = {k: compile_template(partial_template(template, top_k=k)) for k in _COMMON_TOP_K}
+
+    def render(*, top_k, **fields) -> str:
+        specialized = by_k.get(top_k) if type(top_k) is int else None # 5.0 must still render as "5.0"
+        if specialized is None:
+            return general(top_k=top_k, **fields)
+        return specialized(**fields)
+
+    return render
+
+render_baseline_prompt = _specialize_top_k(BASELINE_PROMPT_TEMPLATE)
+render_merge_factors_prompt = _specialize_top_k(MERGE_FACTORS_PROMPT)
+
+def render_baseline_batch_prompt(questions: Sequence[str], top_k: int) -> str:
+    """BASELINE_BATCH_PROMPT_TEMPLATE for the given questions, labelled Q1..QN in order."""
+    questions_block = "\n".join(f"Q{i}: {q}" for i, q in enumerate(questions, 1))
+    return _render_baseline_batch(batch_size=len(questions), top_k=top_k, questions_block=questions_block)
+
+def render_judge_prompt(question: str, baseline_answer: str, merged_answer: str) -> str:
+    """Same text as JUDGE_PROMPT_TEMPLATE.format(...)."""
+    return _render_judge(question=question, baseline_answer=baseline_answer, merged_answer=merged_answer)
+
+def render_judge_v4_prompt(question: str, synthesized_answer: str) -> str:
+    """Same text as JUDGE_V4_PROMPT_TEMPLATE.format(...)."""
+    return _render_judge_v4(question=question, synthesized_answer=synthesized_answer)
+
+def make_judge_renderer(question: str) -> Callable[[str, str], str]:
+    """
+    Judge prompt renderer with `question` baked in, for batches that judge many answers to the
+    same question: render(baseline_answer, merged_answer) only joins the remaining fragments.
+    """
+    render = compile_template(partial_template(JUDGE_PROMPT_TEMPLATE, question=question))
+
+    def render_for_question(baseline_answer: str, merged_answer: str) -> str:
+        return render(baseline_answer=baseline_answer, merged_answer=merged_answer)
+
+    return render_for_question
@@ -0,0 +1,51 @@
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Spaces requests evenly to stay under a requests-per-minute limit.
+
+    Each acquire() reserves the next free slot and sleeps until it; concurrent callers
+    (gathered agent queries) queue up one interval apart instead of bursting.
+    Uses a threading.Lock rather than an asyncio one, so a single limiter works across event loops.
+    """
+
+    def __init__(self, per_minute: float):
+        if per_minute <= 0:
+            raise ValueError(f"per_minute must be positive, got {per_minute}")
+        self.interval = 60.0 / per_minute
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+def limiter_from_env(var: str = "LLM_QPM") -> Optional[RateLimiter]:
+    """
+    RateLimiter for the requests/minute in env var `var`, or None when it's unset. Called at
+    client import time, so a bad value logs a warning and disables limiting instead of raising.
+    """
+    raw = os.getenv(var)
+    if not raw:
+        return None
+    try:
+        per_minute = float(raw)
+    except ValueError:
+        per_minute = math.nan
+    if not math.isfinite(per_minute) or per_minute <= 0:
+        logger.warning("Ignoring %s=%r: expected a positive number of requests per minute; rate limiting is off", var, raw)
+        return None
+    return RateLimiter(per_minute)